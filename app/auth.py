@@ -7,12 +7,15 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from .database import get_db
-from .models import User
+from .models import User, UserRole
+from .queries import get_user_by_username
 
 # Настройки безопасности
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Токены вида demo_token_<username> выдаёт /auth/login в app/main.py
+DEMO_TOKEN_PREFIX = "demo_token_"
 
 # Контекст для хеширования паролей
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -40,7 +43,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[str]:
-    """Проверка JWT токена"""
+    """Проверка JWT токена (или demo токена); возвращает username"""
+    if token.startswith(DEMO_TOKEN_PREFIX):
+        return token[len(DEMO_TOKEN_PREFIX):] or None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -52,7 +57,7 @@ def verify_token(token: str) -> Optional[str]:
 
 def get_user(db: Session, username: str) -> Optional[User]:
     """Получение пользователя по username"""
-    return db.query(User).filter(User.username == username).first()
+    return get_user_by_username(db, username)
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Аутентификация пользователя"""
@@ -98,9 +103,13 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def is_staff(user: User) -> bool:
+    """Сотрудник кинотеатра: администратор или менеджер"""
+    return user.role in (UserRole.ADMIN, UserRole.MANAGER)
+
 async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Проверка прав администратора"""
-    if current_user.role != "admin":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -0,0 +1,113 @@
+"""
+Подбор лучших свободных мест рядом ("дайте 4 места вместе").
+
+Свободные места ряда - сдвиг битовой карты занятых мест сеанса
+(app/seat_inventory.py) на номер первого места ряда; маски заблокированных
+мест, типов и соседства (места через проход не соседние) считаются один раз
+на схему зала (HallLayout.row_masks). Начала N соседних свободных мест - это
+биты mask & (mask >> 1) & ... & (mask >> N-1) с учётом соседства, так что ряд
+проверяется несколькими операциями над целым числом без цикла по местам.
+
+Из найденных окон выбирается ближайшее к центру зала: сначала по удалённости
+ряда от среднего ряда, затем по удалённости середины окна от середины ряда.
+Окна запрошенного типа мест всегда лучше окон другого типа; если нужного типа
+рядом нет, предлагаются места другого типа.
+
+Подбор с бронью для одного сеанса выполняется под hold_lock: иначе
+параллельные покупатели получают одни и те же лучшие места и все, кроме
+одного, упираются в конфликт. Между воркерами конфликты остаются и
+обрабатываются повтором подбора.
+"""
+
+import asyncio
+import os
+from typing import List, NamedTuple, Optional
+
+from .hall_layout import SEAT_TYPES, HallLayout
+
+# Больше мест за раз не подбирается
+BEST_AVAILABLE_MAX_SEATS = int(os.getenv("BEST_AVAILABLE_MAX_SEATS", "10"))
+# Попыток подобрать и забронировать места, если их успели занять
+HOLD_ATTEMPTS = 3
+
+# Штраф за место не того типа: больше любого штрафа за положение в зале
+TYPE_MISMATCH_PENALTY = 10.0
+# Вес удалённости ряда от центра относительно удалённости от середины ряда
+ROW_WEIGHT = 2.0
+
+# Блокировки подбора с бронью: сеанс попадает в одну из HOLD_LOCK_STRIPES
+HOLD_LOCK_STRIPES = 64
+_hold_locks = [asyncio.Lock() for _ in range(HOLD_LOCK_STRIPES)]
+
+
+def hold_lock(session_id: int) -> asyncio.Lock:
+    return _hold_locks[session_id % HOLD_LOCK_STRIPES]
+
+
+class BestSeats(NamedTuple):
+    seats: List[int]
+    row: int
+    seat_type: str
+    score: float
+
+
+def _window_starts(mask: int, adjacent: int, count: int) -> int:
+    """Биты мест ряда, с которых начинаются count подряд свободных соседних мест"""
+    starts = mask
+    for shift in range(1, count):
+        starts &= (mask >> shift) & (adjacent >> (shift - 1))
+        if not starts:
+            break
+    return starts
+
+
+def _best_start(layout: HallLayout, first: int, starts: int, count: int, row_center: float):
+    """Начало окна, середина которого ближе всего к середине ряда"""
+    best = best_distance = None
+    while starts:
+        low = starts & -starts
+        seat = first + low.bit_length() - 1
+        distance = abs(layout.column_of[seat] + (count - 1) / 2 - row_center)
+        if best is None or distance < best_distance:
+            best, best_distance = seat, distance
+        starts ^= low
+    return best, best_distance
+
+
+def find_best_seats(layout: HallLayout, seat_map, count: int, seat_type: str = None) -> Optional[BestSeats]:
+    """Лучшие count соседних свободных мест; None - таких мест нет"""
+    type_code = SEAT_TYPES.index(seat_type) if seat_type else None
+    # Бит n - место n: маска ряда - сдвиг на номер первого места ряда
+    taken = int.from_bytes(seat_map.taken, "little")
+    row_masks = layout.row_masks()
+    center_row = (layout.row_count + 1) / 2
+    best = None
+    # От центральных рядов к крайним: дальше ряды, которые уже не могут быть лучше
+    for row in sorted(range(1, layout.row_count + 1), key=lambda row: abs(row - center_row)):
+        row_score = ROW_WEIGHT * abs(row - center_row) / layout.row_count
+        if best is not None and row_score >= best[0]:
+            break
+        first, size, adjacent, blocked, by_type = row_masks[row - 1]
+        if size < count:
+            continue
+        first_column = layout.column_of[first]
+        last_column = layout.column_of[first + size - 1]
+        row_center = (first_column + last_column) / 2
+        row_width = max(1, last_column - first_column)
+
+        free = ~(taken >> first) & ((1 << size) - 1) & ~blocked
+        matching = free if type_code is None else free & by_type[type_code]
+        for mask, penalty in ((matching, 0.0), (free, TYPE_MISMATCH_PENALTY)):
+            seat, distance = _best_start(layout, first, _window_starts(mask, adjacent, count), count, row_center)
+            if seat is not None:
+                score = penalty + row_score + distance / row_width
+                if best is None or score < best[0]:
+                    best = (score, row, seat)
+                break
+
+    if best is None:
+        return None
+    score, row, seat = best
+    chosen = list(range(seat, seat + count))
+    types = {layout.seat_type(seat) for seat in chosen}
+    return BestSeats(chosen, row, types.pop() if len(types) == 1 else "mixed", round(score, 4))
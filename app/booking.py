@@ -0,0 +1,347 @@
+"""
+Атомарное бронирование мест.
+
+Бронирование нескольких мест - одна транзакция:
+
+1. условный UPDATE сеанса: available_seats уменьшается, только если свободных
+   мест хватает (WHERE available_seats >= :count). UPDATE берёт блокировку строки
+   сеанса, поэтому параллельные бронирования одного сеанса выстраиваются в
+   очередь на уровне БД, а счётчик не уходит в минус и не расходится с билетами;
+2. вставка всех билетов; уникальный индекс uq_tickets_session_seat не даёт
+   продать место дважды. Если хотя бы одно место уже занято, транзакция
+   откатывается целиком - ни одного билета и ни одного изменения счётчика.
+
+Счётчики сеанса и их сверка с билетами - app/session_counters.py.
+
+Конфликт (мест не хватает или место занято) - HTTP 409. Предварительная
+проверка по карте мест в памяти (app/seat_inventory.py) лишь отсекает заведомо
+занятые места, источник истины - транзакция.
+
+Для синхронной Session - book_seats, для AsyncSession - book_seats_async.
+Отмена, оплата и изменение билета (cancel_ticket, pay_ticket, unpay_ticket) -
+такие же пары; HTTP обработчики выполняют *_async варианты через очередь
+единственного писателя (app/write_queue.py), как и бронирования.
+Групповое бронирование нескольких сеансов (book_batch_async) - та же схема:
+условный UPDATE каждого сеанса и bulk insert всех билетов одной транзакцией.
+"""
+
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+from .checkin import checkin
+from .hall_layout import HallLayout, hall_layouts
+from .models import Ticket, Session
+from .seat_inventory import seat_inventory
+from .schedule import sync_availability, sync_availability_async
+from .session_counters import RESERVE_SEATS, mark_sold, mark_sold_async, release_seats, release_seats_async
+
+logger = logging.getLogger(__name__)
+
+# Ограничение группового бронирования (POST /tickets/batch)
+BATCH_BOOKING_MAX_SEATS = int(os.getenv("BATCH_BOOKING_MAX_SEATS", "500"))
+
+AVAILABLE_SEATS = select(Session.available_seats).where(Session.id == bindparam("session_id"))
+TAKEN_SEATS = select(Ticket.seat_number).where(
+    Ticket.session_id == bindparam("session_id"),
+    Ticket.seat_number.in_(bindparam("seats", expanding=True)),
+)
+# Вставка пачки билетов одним INSERT ... VALUES (...), (...) RETURNING; порядок строк
+# RETURNING не гарантирован, id сопоставляются по уникальному booking_reference
+INSERT_TICKETS = insert(Ticket).returning(Ticket.booking_reference, Ticket.id)
+# Занятые места по парам (сеанс, место) - одним запросом для нескольких сеансов
+TAKEN_SEAT_PAIRS = select(Ticket.session_id, Ticket.seat_number).where(
+    tuple_(Ticket.session_id, Ticket.seat_number).in_(bindparam("pairs", expanding=True))
+)
+# Отмена и оплата билета - условными запросами: повтор не меняет счётчики второй раз
+CANCEL_TICKET = (
+    delete(Ticket)
+    .where(Ticket.id == bindparam("ticket_id"))
+    .returning(Ticket.session_id, Ticket.seat_number, Ticket.is_paid, Ticket.booking_reference)
+    .execution_options(synchronize_session=False)
+)
+PAY_TICKET = (
+    update(Ticket)
+    .where(Ticket.id == bindparam("ticket_id"), Ticket.is_paid.is_(False))
+    .values(is_paid=True)
+    .execution_options(synchronize_session=False)
+)
+# Снятие оплаты: оплаченная бронь (status="paid") снова становится бронью без срока
+UNPAY_TICKET = (
+    update(Ticket)
+    .where(Ticket.id == bindparam("ticket_id"), Ticket.is_paid.is_(True))
+    .values(is_paid=False, payment_time=None,
+            status=case((Ticket.status == "paid", "reserved"), else_=Ticket.status))
+    .execution_options(synchronize_session=False)
+)
+
+
+def check_seat_numbers(seat_numbers) -> List[int]:
+    """Номера мест запроса - список целых чисел (bool не считается), иначе 400"""
+    if not isinstance(seat_numbers, list):
+        raise HTTPException(status_code=400, detail="seat_numbers должен быть списком номеров мест")
+    invalid = [seat for seat in seat_numbers if not isinstance(seat, int) or isinstance(seat, bool)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Неверные номера мест: {invalid}")
+    return seat_numbers
+
+
+def validate_seats(seat_numbers: List[int], layout: HallLayout):
+    """Номера мест без повторов, есть в схеме зала и не заблокированы, иначе 400"""
+    check_seat_numbers(seat_numbers)
+    if len(set(seat_numbers)) != len(seat_numbers):
+        raise HTTPException(status_code=400, detail="Места в запросе повторяются")
+    invalid = [seat for seat in seat_numbers if not layout.is_valid(seat)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Неверные номера мест: {invalid}")
+    blocked = [seat for seat in seat_numbers if not layout.is_bookable(seat)]
+    if blocked:
+        raise HTTPException(status_code=400, detail=f"Места не продаются: {blocked}")
+
+
+def seat_price(session, seat_type: str, base_price: float) -> float:
+    """Цена места по типу: цена сеанса для типа либо надбавка к базовой"""
+    if seat_type == "vip":
+        return float(session.vip_price) if session.vip_price else base_price * 1.5
+    if seat_type == "premium":
+        return float(session.premium_price) if session.premium_price else base_price * 1.2
+    return base_price
+
+
+def build_tickets(user_id: int, session, hall, seat_numbers: List[int],
+                  total_price: Optional[float] = None, status: str = "booked") -> List[Ticket]:
+    """Билеты на места сеанса: ряд, тип места и цена по схеме зала (app/hall_layout.py)"""
+    layout = hall_layouts.for_hall(hall)
+    base_price_per_seat = float(session.base_price if total_price is None else total_price) / len(seat_numbers)
+
+    tickets = []
+    for seat_number in seat_numbers:
+        seat_row = layout.row_of[seat_number]
+        seat_type = layout.seat_type(seat_number)
+        price = seat_price(session, seat_type, base_price_per_seat)
+        tickets.append(Ticket(
+            user_id=user_id,
+            session_id=session.id,
+            seat_row=seat_row,
+            seat_number=seat_number,
+            seat_type=seat_type,
+            price=price,
+            final_price=price,
+            booking_reference=str(uuid.uuid4())[:8].upper(),
+            status=status,
+            is_paid=False
+        ))
+        logger.debug("Билет: ряд %s, место %s, тип %s, цена %s", seat_row, seat_number, seat_type, price)
+    return tickets
+
+
+def _ticket_row(ticket: Ticket) -> dict:
+    # Только заданные атрибуты - остальные колонки получат значения по умолчанию
+    return {key: value for key, value in vars(ticket).items() if not key.startswith("_")}
+
+
+async def _insert_tickets_async(db, tickets: List[Ticket]):
+    """Bulk insert билетов; id проставляются в объекты для ответа"""
+    ids = dict((await db.execute(INSERT_TICKETS, [_ticket_row(ticket) for ticket in tickets])).all())
+    for ticket in tickets:
+        ticket.id = ids[ticket.booking_reference]
+
+
+def _not_enough_seats(available) -> HTTPException:
+    if available is None:
+        return HTTPException(status_code=404, detail="Сеанс не найден")
+    return HTTPException(status_code=409, detail=f"Недостаточно свободных мест. Доступно: {available}")
+
+
+def _seats_taken(session_id: int, taken) -> HTTPException:
+    # Карта мест разошлась с БД (например, бронь в другом воркере)
+    seat_inventory.invalidate(session_id)
+    logger.debug("Бронирование: места %s сеанса %s уже заняты", tuple(taken), session_id)
+    return HTTPException(status_code=409, detail=f"Места уже заняты: {sorted(taken)}")
+
+
+def book_seats(db, session_id: int, tickets: List[Ticket]) -> int:
+    """
+    Сохранить билеты сеанса одной транзакцией (синхронная Session).
+
+    Возвращает остаток свободных мест; при конфликте транзакция откатывается
+    и выбрасывается HTTPException 409.
+    """
+    seats = [ticket.seat_number for ticket in tickets]
+    params = {"session_id": session_id, "count": len(tickets)}
+    try:
+        available = db.execute(RESERVE_SEATS, params).scalar()
+        if available is None:
+            db.rollback()
+            raise _not_enough_seats(db.execute(AVAILABLE_SEATS, params).scalar())
+        sync_availability(db, [session_id])
+        db.add_all(tickets)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        taken = db.execute(TAKEN_SEATS, {"session_id": session_id, "seats": seats}).scalars().all()
+        if not taken:
+            # Нарушено другое ограничение, а не занятость места
+            raise
+        raise _seats_taken(session_id, taken)
+    seat_inventory.book(session_id, seats)
+    return available
+
+
+async def book_seats_async(db, session_id: int, tickets: List[Ticket]) -> int:
+    """Сохранить билеты сеанса одной транзакцией (AsyncSession), см. book_seats"""
+    seats = [ticket.seat_number for ticket in tickets]
+    params = {"session_id": session_id, "count": len(tickets)}
+    try:
+        available = (await db.execute(RESERVE_SEATS, params)).scalar()
+        if available is None:
+            await db.rollback()
+            raise _not_enough_seats((await db.execute(AVAILABLE_SEATS, params)).scalar())
+        await sync_availability_async(db, [session_id])
+        await _insert_tickets_async(db, tickets)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        taken = (await db.execute(TAKEN_SEATS, {"session_id": session_id, "seats": seats})).scalars().all()
+        if not taken:
+            raise
+        raise _seats_taken(session_id, taken)
+    seat_inventory.book(session_id, seats)
+    return available
+
+
+async def find_taken_seats_async(db, seats_by_session: Dict[int, List[int]]) -> Dict[int, List[int]]:
+    """Уже занятые места нескольких сеансов одним запросом: {session_id: [места]}"""
+    pairs = [(session_id, seat) for session_id, seats in seats_by_session.items() for seat in seats]
+    taken = defaultdict(list)
+    for session_id, seat in (await db.execute(TAKEN_SEAT_PAIRS, {"pairs": pairs})).all():
+        taken[session_id].append(seat)
+    return dict(taken)
+
+
+async def book_batch_async(db, tickets_by_session: Dict[int, List[Ticket]]) -> Dict[int, int]:
+    """
+    Сохранить билеты нескольких сеансов одной транзакцией (AsyncSession).
+
+    Возвращает остаток свободных мест по сеансам. Не хватает мест или занято
+    хотя бы одно место любого сеанса - откат всей группы и HTTPException 409.
+    """
+    available = {}
+    try:
+        for session_id, tickets in tickets_by_session.items():
+            params = {"session_id": session_id, "count": len(tickets)}
+            available[session_id] = (await db.execute(RESERVE_SEATS, params)).scalar()
+            if available[session_id] is None:
+                await db.rollback()
+                error = _not_enough_seats((await db.execute(AVAILABLE_SEATS, params)).scalar())
+                error.detail = f"Сеанс {session_id}: {error.detail}"
+                raise error
+        await sync_availability_async(db, tickets_by_session)
+        # Билеты всех сеансов - одним bulk insert
+        await _insert_tickets_async(db, [ticket for tickets in tickets_by_session.values() for ticket in tickets])
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        taken = await find_taken_seats_async(db, {
+            session_id: [ticket.seat_number for ticket in tickets]
+            for session_id, tickets in tickets_by_session.items()
+        })
+        if not taken:
+            raise
+        for session_id in taken:
+            seat_inventory.invalidate(session_id)
+        raise HTTPException(status_code=409, detail={"message": "Места уже заняты", "taken": taken})
+    for session_id, tickets in tickets_by_session.items():
+        seat_inventory.book(session_id, [ticket.seat_number for ticket in tickets])
+    return available
+
+
+def cancel_ticket(db, ticket_id: int) -> bool:
+    """
+    Удалить билет и вернуть место в счётчики сеанса одной транзакцией
+    (синхронная Session). False - билета уже нет.
+    """
+    row = db.execute(CANCEL_TICKET, {"ticket_id": ticket_id}).first()
+    if row is None:
+        db.rollback()
+        return False
+    session_id, seat_number, is_paid, reference = row
+    release_seats(db, [(session_id, is_paid)])
+    db.commit()
+    seat_inventory.release(session_id, (seat_number,))
+    # Сканер на входе не должен пропустить отменённый билет (app/checkin.py)
+    checkin.evict(session_id, (reference,))
+    return True
+
+
+async def cancel_ticket_async(db, ticket_id: int) -> bool:
+    """Удалить билет и вернуть место в счётчики (AsyncSession), см. cancel_ticket"""
+    row = (await db.execute(CANCEL_TICKET, {"ticket_id": ticket_id})).first()
+    if row is None:
+        await db.rollback()
+        return False
+    session_id, seat_number, is_paid, reference = row
+    await release_seats_async(db, [(session_id, is_paid)])
+    await db.commit()
+    seat_inventory.release(session_id, (seat_number,))
+    checkin.evict(session_id, (reference,))
+    return True
+
+
+def pay_ticket(db, ticket: Ticket):
+    """Отметить билет оплаченным и перенести его из брони в проданные (синхронная Session)"""
+    if db.execute(PAY_TICKET, {"ticket_id": ticket.id}).rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Билет уже оплачен")
+    mark_sold(db, ticket.session_id)
+    db.commit()
+    seat_inventory.mark_paid(ticket.session_id, (ticket.seat_number,))
+
+
+async def pay_ticket_async(db, ticket: Ticket):
+    """Отметить билет оплаченным (AsyncSession), см. pay_ticket"""
+    if (await db.execute(PAY_TICKET, {"ticket_id": ticket.id})).rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Билет уже оплачен")
+    await mark_sold_async(db, ticket.session_id)
+    await db.commit()
+    seat_inventory.mark_paid(ticket.session_id, (ticket.seat_number,))
+
+
+def unpay_ticket(db, ticket: Ticket):
+    """Снять оплату билета и вернуть его из проданных в брони (синхронная Session)"""
+    if db.execute(UNPAY_TICKET, {"ticket_id": ticket.id}).rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Билет не оплачен")
+    mark_sold(db, ticket.session_id, paid=False)
+    db.commit()
+    seat_inventory.mark_unpaid(ticket.session_id, (ticket.seat_number,))
+
+
+async def unpay_ticket_async(db, ticket: Ticket):
+    """Снять оплату билета (AsyncSession), см. unpay_ticket"""
+    if (await db.execute(UNPAY_TICKET, {"ticket_id": ticket.id})).rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Билет не оплачен")
+    await mark_sold_async(db, ticket.session_id, paid=False)
+    await db.commit()
+    seat_inventory.mark_unpaid(ticket.session_id, (ticket.seat_number,))
+
+
+async def update_ticket_async(db, ticket_id: int, values: dict):
+    """
+    Изменить поля билета (AsyncSession). Новое место уже занято - откат и 409
+    (уникальный индекс по месту сеанса); карту мест обновляет вызывающий.
+    """
+    try:
+        await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(**values))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Место уже занято")
@@ -0,0 +1,366 @@
+"""
+Проверка билетов на входе в зал (check-in).
+
+За 15 минут до показа на входе сканируются тысячи билетов, поэтому проверка
+идёт не в БД, а по индексу билетов сеанса в памяти: booking_reference ->
+место, оплата и время прохода. Индекс сеанса загружается одним запросом:
+заранее - фоновой задачей для сеансов, которые начинаются в ближайшие
+CHECKIN_PRELOAD_MINUTES минут, или при первом сканировании. Сканирование -
+поиск в словаре, повторный проход того же билета отклоняется сразу.
+
+Отметки прохода (status="used", used_time) копятся в памяти и записываются
+пачками по CHECKIN_FLUSH_BATCH раз в CHECKIN_FLUSH_INTERVAL секунд через
+очередь записи - сканер не ждёт commit. UPDATE условный (used_time IS NULL):
+билет, уже отмеченный в БД, второй раз не перезаписывается.
+
+Билет, которого нет в индексе (куплен после загрузки, другой сеанс), ищется
+в БД по booking_reference (уникальный индекс). Отменённые билеты и снятые
+брони убираются из индекса сразу после commit (evict из app/booking.py и
+app/holds.py), иначе сканер пропустил бы возвращённый билет. Индексы
+перечитываются каждым проходом загрузки раз в CHECKIN_PRELOAD_INTERVAL
+секунд: появляются новые билеты; отметки, ещё не записанные в БД,
+сохраняются. Отметка, которую условный UPDATE не записал (билет удалён или
+уже отмечен другим процессом), считается отказом.
+Индексы сеансов, начавшихся больше CHECKIN_LATE_MINUTES минут назад,
+выгружаются.
+
+Индекс живёт в процессе: при нескольких воркерах сканеры одного сеанса
+должны попадать в один воркер, иначе повторный проход через другой воркер
+заметит только условный UPDATE при записи (предупреждение в логе).
+
+Параметры окружения:
+
+    CHECKIN_PRELOAD_MINUTES=30    # за сколько минут до начала загружать сеанс
+    CHECKIN_LATE_MINUTES=60       # сколько минут после начала держать индекс
+    CHECKIN_PRELOAD_INTERVAL=60   # секунды между проходами загрузки, 0 - задача не запускается
+    CHECKIN_FLUSH_INTERVAL=0.5    # секунды между записями отметок прохода
+    CHECKIN_FLUSH_BATCH=500       # отметок в одной транзакции
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+
+from .database import AsyncSessionLocal
+from .models import Session, Ticket
+from .write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+CHECKIN_PRELOAD_MINUTES = int(os.getenv("CHECKIN_PRELOAD_MINUTES", "30"))
+CHECKIN_LATE_MINUTES = int(os.getenv("CHECKIN_LATE_MINUTES", "60"))
+CHECKIN_PRELOAD_INTERVAL = float(os.getenv("CHECKIN_PRELOAD_INTERVAL", "60"))
+CHECKIN_FLUSH_INTERVAL = float(os.getenv("CHECKIN_FLUSH_INTERVAL", "0.5"))
+CHECKIN_FLUSH_BATCH = int(os.getenv("CHECKIN_FLUSH_BATCH", "500"))
+
+USED_STATUS = "used"
+
+_tickets = Ticket.__table__
+_COLUMNS = (
+    Ticket.id, Ticket.booking_reference, Ticket.session_id, Ticket.seat_row, Ticket.seat_number,
+    Ticket.seat_type, Ticket.status, Ticket.is_paid, Ticket.used_time,
+)
+
+# Сеансы, для которых нужен индекс: начинаются в окне [since, until]
+SESSIONS_FOR_CHECKIN = (
+    select(Session.id)
+    .where(Session.start_time >= bindparam("since"), Session.start_time <= bindparam("until"))
+    .where(Session.is_active.isnot(False))
+)
+TICKETS_FOR_CHECKIN = select(*_COLUMNS).where(Ticket.session_id == bindparam("session_id"))
+TICKET_BY_REFERENCE = select(*_COLUMNS).where(Ticket.booking_reference == bindparam("reference"))
+# Отметка прохода; executemany пачкой [{"ticket_id", "scanned_at"}]
+MARK_USED = (
+    update(_tickets)
+    .where(_tickets.c.id == bindparam("ticket_id"), _tickets.c.used_time.is_(None))
+    .values(status=USED_STATUS, used_time=bindparam("scanned_at"))
+)
+# Время прохода билетов пачки: какие отметки записаны (rowcount executemany - общий)
+USED_TIMES = select(Ticket.id, Ticket.used_time).where(Ticket.id.in_(bindparam("ticket_ids", expanding=True)))
+
+
+class CheckinTicket:
+    """Билет в индексе сеанса"""
+
+    __slots__ = ("id", "reference", "session_id", "seat_row", "seat_number", "seat_type",
+                 "status", "is_paid", "used_time")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.reference = row.booking_reference
+        self.session_id = row.session_id
+        self.seat_row = row.seat_row
+        self.seat_number = row.seat_number
+        self.seat_type = row.seat_type
+        self.status = row.status
+        self.is_paid = row.is_paid
+        self.used_time = row.used_time
+
+    def as_dict(self) -> dict:
+        return {
+            "ticket_id": self.id,
+            "booking_reference": self.reference,
+            "session_id": self.session_id,
+            "seat_row": self.seat_row,
+            "seat_number": self.seat_number,
+            "seat_type": self.seat_type,
+            "used_time": self.used_time.isoformat() if self.used_time else None,
+        }
+
+
+def _rejected(status_code: int, result: str, message: str, ticket: CheckinTicket = None) -> HTTPException:
+    detail = {"message": message, "result": result}
+    if ticket is not None:
+        detail.update(ticket.as_dict())
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+class CheckinService:
+    """Индексы билетов сеансов, сканирование и пакетная запись отметок прохода"""
+
+    def __init__(self, preload_minutes: int = CHECKIN_PRELOAD_MINUTES, late_minutes: int = CHECKIN_LATE_MINUTES,
+                 preload_interval: float = CHECKIN_PRELOAD_INTERVAL, flush_interval: float = CHECKIN_FLUSH_INTERVAL,
+                 flush_batch: int = CHECKIN_FLUSH_BATCH):
+        self.preload_minutes = preload_minutes
+        self.late_minutes = late_minutes
+        self.preload_interval = preload_interval
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._sessions: Dict[int, Dict[str, CheckinTicket]] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        # Отменённые во время загрузки индекса: убираются из прочитанного
+        self._evicted: Dict[int, Set[str]] = {}
+        self._pending: List[Tuple[int, datetime]] = []
+        self._preload_task = None
+        self._flush_task = None
+        self.scans = 0
+        self.rejected = 0
+        self.flushed = 0
+
+    async def _read_session(self, session_id: int) -> Dict[str, CheckinTicket]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(TICKETS_FOR_CHECKIN, {"session_id": session_id})).all()
+        return {row.booking_reference: CheckinTicket(row) for row in rows}
+
+    async def load(self, session_id: int) -> Dict[str, CheckinTicket]:
+        """
+        (Пере)загрузить индекс сеанса.
+
+        Отметки прохода, сделанные во время чтения и ещё не записанные в БД,
+        переносятся в новый индекс. Параллельные вызовы для одного сеанса
+        ждут одно чтение.
+        """
+        loading = self._loading.get(session_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        loading = self._loading[session_id] = asyncio.get_running_loop().create_future()
+        try:
+            index = await self._read_session(session_id)
+            for reference in self._evicted.pop(session_id, ()):
+                index.pop(reference, None)
+            for reference, ticket in self._sessions.get(session_id, {}).items():
+                loaded = index.get(reference)
+                if loaded is not None and loaded.used_time is None and ticket.used_time is not None:
+                    loaded.status, loaded.used_time = ticket.status, ticket.used_time
+            self._sessions[session_id] = index
+            loading.set_result(index)
+            return index
+        except Exception as exc:
+            loading.set_exception(exc)
+            # Исключение получают ожидающие; если их нет, future не должен ругаться в лог
+            loading.exception()
+            raise
+        finally:
+            if not loading.done():
+                loading.cancel()
+            del self._loading[session_id]
+            self._evicted.pop(session_id, None)
+
+    def evict(self, session_id: int, references: Iterable[str]):
+        """Убрать из индекса сеанса удалённые из БД билеты (отмена, снятие брони; после commit)"""
+        references = list(references)
+        if session_id in self._loading:
+            self._evicted.setdefault(session_id, set()).update(references)
+        index = self._sessions.get(session_id)
+        if index is not None:
+            for reference in references:
+                index.pop(reference, None)
+
+    async def _lookup(self, reference: str) -> Optional[CheckinTicket]:
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(TICKET_BY_REFERENCE, {"reference": reference})).first()
+        return CheckinTicket(row) if row is not None else None
+
+    async def scan(self, session_id: int, reference: str) -> dict:
+        """
+        Проверить билет на входе в зал сеанса и отметить проход.
+
+        Ответ - место билета; отказ - HTTPException с detail {"result": ...}:
+        not_found (404), wrong_session, already_used, cancelled (409),
+        not_paid (402).
+        """
+        self.scans += 1
+        index = self._sessions.get(session_id)
+        if index is None:
+            index = await self.load(session_id)
+        ticket = index.get(reference)
+        if ticket is None:
+            # Куплен после загрузки индекса или на другой сеанс
+            found = await self._lookup(reference)
+            if found is not None and found.session_id == session_id:
+                index = self._sessions.get(session_id, index)
+                ticket = index.setdefault(reference, found)
+            elif found is not None:
+                self.rejected += 1
+                raise _rejected(409, "wrong_session", "Билет на другой сеанс", found)
+        if ticket is None:
+            self.rejected += 1
+            raise _rejected(404, "not_found", "Билет не найден")
+
+        if not ticket.is_paid and ticket.used_time is None:
+            # Мог быть оплачен после загрузки индекса
+            found = await self._lookup(reference)
+            if found is not None and found.is_paid:
+                ticket.is_paid = True
+
+        # Проверка и отметка без await между ними: два сканера одного билета не пройдут оба
+        if ticket.used_time is not None:
+            self.rejected += 1
+            raise _rejected(409, "already_used", "Билет уже использован", ticket)
+        if ticket.status == "cancelled":
+            self.rejected += 1
+            raise _rejected(409, "cancelled", "Билет отменён", ticket)
+        if not ticket.is_paid:
+            self.rejected += 1
+            raise _rejected(402, "not_paid", "Билет не оплачен", ticket)
+        ticket.status, ticket.used_time = USED_STATUS, datetime.utcnow()
+        self._pending.append((ticket.id, ticket.used_time))
+        return {"result": "admitted", **ticket.as_dict()}
+
+    def session_stats(self, session_id: int) -> Optional[dict]:
+        """Прошедших в зал по индексу сеанса; None - индекс не загружен"""
+        index = self._sessions.get(session_id)
+        if index is None:
+            return None
+        return {
+            "session_id": session_id,
+            "tickets": len(index),
+            "checked_in": sum(1 for ticket in index.values() if ticket.used_time is not None),
+        }
+
+    async def _write(self, db, batch: List[Tuple[int, datetime]]) -> List[Tuple[int, bool]]:
+        """Записать пачку отметок; возвращает незаписанные - (id билета, билет удалён)"""
+        marked = (await db.execute(
+            MARK_USED, [{"ticket_id": ticket_id, "scanned_at": scanned_at} for ticket_id, scanned_at in batch]
+        )).rowcount
+        missed = []
+        if marked != len(batch):
+            used = dict((await db.execute(USED_TIMES, {"ticket_ids": [ticket_id for ticket_id, _ in batch]})).all())
+            missed = [(ticket_id, ticket_id not in used) for ticket_id, scanned_at in batch
+                      if used.get(ticket_id) != scanned_at]
+        await db.commit()
+        return missed
+
+    def _reject_unwritten(self, missed: List[Tuple[int, bool]]):
+        """Незаписанные отметки - отказы; удалённые билеты уходят из индекса"""
+        self.rejected += len(missed)
+        deleted = {ticket_id for ticket_id, is_deleted in missed if is_deleted}
+        if deleted:
+            for index in self._sessions.values():
+                for reference in [reference for reference, ticket in index.items() if ticket.id in deleted]:
+                    del index[reference]
+        logger.warning("Отметки прохода не записаны: билет удалён или уже отмечен другим процессом",
+                       extra={"ticket_ids": [ticket_id for ticket_id, _ in missed], "deleted": len(deleted)})
+
+    async def flush(self) -> int:
+        """Записать накопленные отметки прохода пачками; возвращает число записанных"""
+        total = 0
+        while self._pending:
+            batch = self._pending[:self.flush_batch]
+            del self._pending[:len(batch)]
+            try:
+                missed = await write_queue.submit(lambda db: self._write(db, batch))
+            except BaseException:
+                # Отметки не потеряны: следующая запись повторит их первыми
+                self._pending[:0] = batch
+                raise
+            if missed:
+                self._reject_unwritten(missed)
+            self.flushed += len(batch) - len(missed)
+            total += len(batch) - len(missed)
+        return total
+
+    async def preload(self, now: datetime = None) -> int:
+        """Загрузить (перечитать) индексы сеансов окна и выгрузить прошедшие; возвращает число сеансов"""
+        now = now or datetime.utcnow()
+        since = now - timedelta(minutes=self.late_minutes)
+        async with AsyncSessionLocal() as db:
+            session_ids = set((await db.scalars(SESSIONS_FOR_CHECKIN, {
+                "since": since, "until": now + timedelta(minutes=self.preload_minutes),
+            })).all())
+        for session_id in session_ids:
+            await self.load(session_id)
+        # Сеансы вне окна выгружаются (загруженные сканированием - тоже), кроме незаписанных отметок
+        pending = {ticket_id for ticket_id, _ in self._pending}
+        for session_id in [session_id for session_id in self._sessions if session_id not in session_ids]:
+            if not any(ticket.id in pending for ticket in self._sessions[session_id].values()):
+                del self._sessions[session_id]
+        return len(session_ids)
+
+    async def _run_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка записи отметок прохода")
+
+    async def _run_preload(self):
+        while True:
+            try:
+                await self.preload()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка загрузки индексов билетов сеансов")
+            await asyncio.sleep(self.preload_interval)
+
+    def start(self):
+        # Задачи привязаны к текущему event loop
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._run_flush(), name="checkin-flush")
+        if self.preload_interval > 0 and (self._preload_task is None or self._preload_task.done()):
+            self._preload_task = asyncio.create_task(self._run_preload(), name="checkin-preload")
+
+    async def stop(self):
+        for task in (self._preload_task, self._flush_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._preload_task = self._flush_task = None
+        # Дописываем отметки прохода перед остановкой очереди записи
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "tickets": sum(len(index) for index in self._sessions.values()),
+            "scans": self.scans,
+            "rejected": self.rejected,
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+        }
+
+
+checkin = CheckinService()
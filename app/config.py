@@ -0,0 +1,91 @@
+"""
+Настройки приложения.
+
+Профиль выбирается переменной ENVIRONMENT (dev / prod / bench), отдельные
+параметры переопределяются переменными окружения DB_*.
+"""
+
+from dataclasses import dataclass, replace
+import os
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """Параметры движка и пула соединений"""
+    echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1  # секунды, -1 - не пересоздавать соединения
+    pool_pre_ping: bool = False
+    # Режим SQLite для высокой конкуренции: WAL, pragma на каждом соединении
+    # и запись бронирований через единственного писателя (app/write_queue.py)
+    sqlite_high_concurrency: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+
+
+# Профили окружений
+PROFILES = {
+    # Разработка: видим все SQL запросы, небольшой пул
+    "dev": DatabaseSettings(echo=True),
+    # Продакшн: без логирования SQL, пул под несколько сотен запросов в полёте,
+    # проверка соединений и пересоздание до таймаута на стороне сервера БД
+    "prod": DatabaseSettings(
+        echo=False,
+        pool_size=20,
+        max_overflow=20,
+        pool_timeout=10.0,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    ),
+    # Бенчмарки: без логирования и без лишних проверок соединений
+    "bench": DatabaseSettings(
+        echo=False,
+        pool_size=50,
+        max_overflow=50,
+        pool_timeout=30.0,
+    ),
+}
+
+# Синонимы названий окружений (ENVIRONMENT=production в env.production.example)
+PROFILE_ALIASES = {
+    "development": "dev",
+    "production": "prod",
+    "benchmark": "bench",
+}
+
+
+def get_environment() -> str:
+    """Название активного профиля"""
+    name = os.getenv("ENVIRONMENT", "dev").strip().lower()
+    name = PROFILE_ALIASES.get(name, name)
+    if name not in PROFILES:
+        raise ValueError(f"Неизвестное окружение ENVIRONMENT={name}, доступны: {', '.join(PROFILES)}")
+    return name
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_database_settings() -> DatabaseSettings:
+    """Настройки БД: профиль окружения + переопределения из DB_*"""
+    settings = PROFILES[get_environment()]
+    return replace(
+        settings,
+        echo=_env_bool("DB_ECHO", settings.echo),
+        pool_size=int(os.getenv("DB_POOL_SIZE", settings.pool_size)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", settings.max_overflow)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", settings.pool_timeout)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", settings.pool_recycle)),
+        pool_pre_ping=_env_bool("DB_POOL_PRE_PING", settings.pool_pre_ping),
+        sqlite_high_concurrency=_env_bool("DB_SQLITE_HIGH_CONCURRENCY", settings.sqlite_high_concurrency),
+        sqlite_busy_timeout_ms=int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", settings.sqlite_busy_timeout_ms)),
+        sqlite_mmap_size=int(os.getenv("DB_SQLITE_MMAP_SIZE", settings.sqlite_mmap_size)),
+        sqlite_cache_size_kb=int(os.getenv("DB_SQLITE_CACHE_SIZE_KB", settings.sqlite_cache_size_kb)),
+    )
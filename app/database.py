@@ -1,30 +1,180 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from dataclasses import replace
 import os
 
+from .config import DatabaseSettings, get_database_settings
+from .pool_metrics import InstrumentedAsyncPool, InstrumentedQueuePool, PoolStats
+
 # URL подключения к базе данных
 # Для демонстрации используем SQLite, в продакшене - PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/cinema_v2.db")
-print(f"[INFO] Используется база данных: {DATABASE_URL}")
-
-# Создание движка SQLAlchemy
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        echo=True,  # Логирование SQL запросов для отладки
-        connect_args={"check_same_thread": False}  # Для SQLite
-    )
-else:
-    # Настройки для PostgreSQL в продакшене
-    engine = create_engine(
-        DATABASE_URL,
-        echo=True,  # Логирование SQL запросов для отладки
+
+
+def to_async_url(url: str) -> str:
+    """Преобразование синхронного URL в URL с асинхронным драйвером"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+# Асинхронный URL можно переопределить отдельно (например, другой драйвер)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":"))
+
+
+def _engine_kwargs(url: str, settings: DatabaseSettings, poolclass) -> dict:
+    """Общие параметры движка для выбранного профиля"""
+    kwargs = {"echo": settings.echo}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}  # Для SQLite
+        if _is_memory_sqlite(url):
+            # In-memory база живёт в одном соединении - пул не настраиваем
+            return kwargs
+    kwargs.update(
+        poolclass=poolclass,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
     )
+    return kwargs
+
+
+def sqlite_pragmas(settings: DatabaseSettings) -> dict:
+    """PRAGMA для режима высокой конкуренции SQLite"""
+    return {
+        # Читатели не блокируются писателем и наоборот
+        "journal_mode": "WAL",
+        # В WAL режиме NORMAL безопасен и не делает fsync на каждый commit
+        "synchronous": "NORMAL",
+        # Ждать освобождения блокировки вместо "database is locked"
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        # Отрицательное значение - размер в КиБ
+        "cache_size": -settings.sqlite_cache_size_kb,
+        "temp_store": "MEMORY",
+    }
+
+
+def _install_sqlite_pragmas(sync_engine, settings: DatabaseSettings):
+    """Применять PRAGMA к каждому новому соединению"""
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _use_sqlite_mode(url: str, settings: DatabaseSettings) -> bool:
+    return url.startswith("sqlite") and not _is_memory_sqlite(url) and settings.sqlite_high_concurrency
+
+
+def _attach_stats(engine, name: str):
+    if isinstance(engine.pool, (InstrumentedQueuePool, InstrumentedAsyncPool)):
+        engine.pool.stats = PoolStats(name)
+    return engine
+
+
+def create_db_engine(url: str = DATABASE_URL, settings: DatabaseSettings = None):
+    """Создание синхронного движка по настройкам профиля"""
+    settings = settings or get_database_settings()
+    engine = create_engine(url, **_engine_kwargs(url, settings, InstrumentedQueuePool))
+    if _use_sqlite_mode(url, settings):
+        _install_sqlite_pragmas(engine, settings)
+    return _attach_stats(engine, "sync")
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, settings: DatabaseSettings = None):
+    """Создание асинхронного движка по настройкам профиля"""
+    settings = settings or get_database_settings()
+    engine = create_async_engine(url, **_engine_kwargs(url, settings, InstrumentedAsyncPool))
+    if _use_sqlite_mode(url, settings):
+        _install_sqlite_pragmas(engine.sync_engine, settings)
+    _attach_stats(engine.sync_engine, "async")
+    return engine
+
+
+def create_sqlite_writer_engine(url: str = ASYNC_DATABASE_URL, settings: DatabaseSettings = None):
+    """
+    Движок единственного писателя SQLite.
+
+    Одно соединение, транзакции начинаются с BEGIN IMMEDIATE: блокировка на
+    запись берётся сразу и ожидается через busy_timeout, а не падает при
+    попытке повысить блокировку посреди транзакции.
+    """
+    settings = settings or get_database_settings()
+    writer_settings = replace(settings, pool_size=1, max_overflow=0)
+    engine = create_async_engine(url, **_engine_kwargs(url, writer_settings, InstrumentedAsyncPool))
+    _install_sqlite_pragmas(engine.sync_engine, settings)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_driver_begin(dbapi_connection, connection_record):
+        # Драйвер не должен сам открывать транзакцию - это делает событие begin
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    _attach_stats(engine.sync_engine, "sqlite_writer")
+    return engine
+
+
+def get_pool_stats() -> dict:
+    """Метрики пулов всех движков"""
+    result = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    if SQLITE_HIGH_CONCURRENCY:
+        pools.append(("sqlite_writer", sqlite_writer_engine.sync_engine.pool))
+    for name, pool in pools:
+        stats = getattr(pool, "stats", None)
+        result[name] = stats.snapshot(pool) if stats else {"name": name, "pool": pool.status()}
+    return result
+
+
+# Создание движков SQLAlchemy (параметры пула - из профиля окружения, см. app/config.py)
+engine = create_db_engine()
+
+# Асинхронный движок для горячих эндпоинтов: запросы не блокируют event loop
+async_engine = create_async_db_engine()
+
+# Режим высокой конкуренции для файловой SQLite (WAL + единственный писатель)
+SQLITE_HIGH_CONCURRENCY = _use_sqlite_mode(DATABASE_URL, get_database_settings())
+sqlite_writer_engine = create_sqlite_writer_engine() if SQLITE_HIGH_CONCURRENCY else None
 
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Фабрика асинхронных сессий (expire_on_commit=False - объекты доступны после commit)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Сессии писателя: отдельное соединение SQLite либо общий пул для других СУБД
+WriterSessionLocal = async_sessionmaker(
+    bind=sqlite_writer_engine or async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -34,4 +184,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Получение асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
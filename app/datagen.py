@@ -0,0 +1,489 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+
+Заполняет базу объёмами, близкими к году работы сети кинотеатров: тысячи
+фильмов, сотни кинотеатров и залов, сотни тысяч сеансов, миллионы билетов и
+отзывов. Строки вставляются пачками через Core insert (executemany), каждая
+пачка - отдельная транзакция, поэтому память не растёт с объёмом.
+
+Распределения:
+- популярность фильмов - закон Ципфа, фильм идёт в прокате несколько недель
+  после премьеры (популярные дольше);
+- сеансы идут в каждом зале подряд с 10:00 до полуночи, с уборкой между ними;
+- заполняемость зависит от популярности фильма, времени (вечерний пик) и дня
+  недели (выходные), места в сеансе уникальны, билеты покупают группами;
+- часть пользователей ходит в кино намного чаще остальных.
+
+Результат детерминирован параметром --seed: при одинаковых параметрах
+генерируются одинаковые данные, и прогоны бенчмарков сравнимы.
+
+Запуск (после alembic upgrade head):
+    python -m app.datagen --scale small
+    python -m app.datagen --scale medium --tickets 10000000 --seed 7
+"""
+
+import argparse
+import bisect
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+import logging
+import random
+import time
+
+from sqlalchemy import func, insert, select
+
+from .config import get_database_settings
+from .database import DATABASE_URL, create_db_engine
+from .models import User, Movie, Cinema, Hall, Session, Ticket, Review, UserRole, MovieGenre
+from .schedule import rebuild
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DatagenSettings:
+    """Объёмы и параметры генерации"""
+    seed: int = 42
+    movies: int = 200
+    cinemas: int = 5
+    halls_per_cinema: int = 6  # в среднем, у каждого кинотеатра от 3 до 2x-3
+    days: int = 30
+    start: datetime = datetime(2024, 1, 1)
+    users: int = 5_000
+    tickets: int = 200_000  # целевое количество, ограничено вместимостью сеансов
+    reviews: int = 50_000
+    chunk_size: int = 10_000
+
+
+# Готовые масштабы, отдельные параметры переопределяются аргументами CLI
+PRESETS = {
+    "small": DatagenSettings(),
+    # Год работы средней сети: ~500 тыс. сеансов
+    "medium": DatagenSettings(
+        movies=2_000, cinemas=50, days=365, users=200_000, tickets=5_000_000, reviews=1_000_000,
+    ),
+    # Крупная сеть: миллионы сеансов, десятки миллионов билетов и отзывов
+    "large": DatagenSettings(
+        movies=5_000, cinemas=300, days=365, users=2_000_000, tickets=30_000_000, reviews=10_000_000,
+        chunk_size=50_000,
+    ),
+}
+
+CITIES = [
+    ("Москва", 13.0), ("Санкт-Петербург", 5.6), ("Новосибирск", 1.6), ("Екатеринбург", 1.5),
+    ("Казань", 1.3), ("Нижний Новгород", 1.2), ("Челябинск", 1.2), ("Красноярск", 1.2),
+    ("Самара", 1.2), ("Уфа", 1.1), ("Ростов-на-Дону", 1.1), ("Омск", 1.1), ("Краснодар", 1.1),
+    ("Воронеж", 1.0), ("Пермь", 1.0), ("Волгоград", 1.0),
+]
+STREETS = ["Ленина", "Мира", "Советская", "Гагарина", "Пушкина", "Садовая", "Набережная", "Центральная"]
+FIRST_NAMES = ["Александр", "Мария", "Дмитрий", "Анна", "Иван", "Елена", "Сергей", "Ольга", "Андрей", "Татьяна"]
+LAST_NAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов"]
+TITLE_WORDS = (
+    ["Последний", "Тёмный", "Бесконечный", "Тайный", "Красный", "Северный", "Потерянный", "Звёздный"],
+    ["рубеж", "город", "горизонт", "код", "океан", "след", "рассвет", "легион", "путь", "остров"],
+)
+AGE_RATINGS = ["G", "PG", "PG-13", "R"]
+SCREEN_TYPES = [("Standard", 70), ("3D", 15), ("IMAX", 8), ("4DX", 7)]
+
+# Спрос по часу начала сеанса: утро почти пустое, пик 19-21
+HOUR_DEMAND = {10: 0.25, 11: 0.3, 12: 0.4, 13: 0.45, 14: 0.5, 15: 0.55, 16: 0.65, 17: 0.8,
+               18: 0.95, 19: 1.0, 20: 1.0, 21: 0.9, 22: 0.6, 23: 0.35}
+WEEKEND_DEMAND = 1.35
+ZIPF_EXPONENT = 1.07
+# Момент "сейчас" внутри диапазона: прошедшие сеансы - использованные билеты,
+# будущие - оплаченные и забронированные
+NOW_FRACTION = 0.75
+
+
+def _rng(settings: DatagenSettings, name: str) -> random.Random:
+    # Свой генератор на каждую таблицу: изменение объёма билетов не меняет фильмы и т.п.
+    return random.Random(f"{settings.seed}:{name}")
+
+
+def _choose(rng: random.Random, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _bulk_insert(engine, model, rows, chunk_size: int) -> int:
+    """Вставка генератора строк пачками, каждая пачка - своя транзакция"""
+    table = model.__table__
+    total = 0
+    started = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with engine.begin() as conn:
+            conn.execute(insert(table), chunk)
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    logger.info("%s: %d строк за %.1f с (%.0f строк/с)", table.name, total, elapsed, total / elapsed if elapsed else 0)
+    return total
+
+
+@dataclass
+class _MovieInfo:
+    id: int
+    duration: int
+    popularity: float
+    release: datetime
+    run_days: int
+
+
+@dataclass
+class _HallInfo:
+    id: int
+    capacity: int
+    seats_per_row: int
+    vip_seats: int
+    premium_seats: int
+    screen_type: str
+
+
+def generate_users(settings: DatagenSettings, first_id: int):
+    rng = _rng(settings, "users")
+    created = settings.start - timedelta(days=730)
+    for uid in range(first_id, first_id + settings.users):
+        city = _choose(rng, CITIES)
+        yield {
+            "id": uid,
+            "username": f"guest{uid}",
+            "email": f"guest{uid}@example.com",
+            # Пароль как у демо пользователя, токен demo_token_guest<id> тоже работает
+            "hashed_password": "user123",
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "role": UserRole.CUSTOMER,
+            "is_active": rng.random() > 0.02,
+            "is_verified": rng.random() > 0.3,
+            "city": city,
+            "loyalty_points": 0,
+            "total_spent": 0,
+            "created_at": created + timedelta(minutes=rng.randrange(730 * 24 * 60)),
+            "updated_at": settings.start,
+        }
+
+
+def generate_movies(settings: DatagenSettings, first_id: int, infos: list):
+    """Фильмы; в infos складываются данные, нужные для расписания"""
+    rng = _rng(settings, "movies")
+    # Популярность по Ципфу, ранги перемешаны, чтобы не зависеть от id
+    ranks = list(range(1, settings.movies + 1))
+    rng.shuffle(ranks)
+    genres = list(MovieGenre)
+    first_release = settings.start - timedelta(days=60)
+    release_span = settings.days + 60
+    for index in range(settings.movies):
+        mid = first_id + index
+        popularity = 1.0 / ranks[index] ** ZIPF_EXPONENT
+        release = first_release + timedelta(days=rng.randrange(release_span))
+        # Хиты держатся в прокате дольше
+        run_days = int(21 + 63 * min(1.0, popularity * 20) + rng.randrange(14))
+        duration = max(75, min(200, int(rng.gauss(115, 20))))
+        infos.append(_MovieInfo(mid, duration, popularity, release, run_days))
+
+        title = f"{rng.choice(TITLE_WORDS[0])} {rng.choice(TITLE_WORDS[1])}"
+        if rng.random() < 0.15:
+            title += f" {rng.randint(2, 4)}"
+        yield {
+            "id": mid,
+            "title": title,
+            "duration_minutes": duration,
+            "genre": rng.choice(genres),
+            "release_year": release.year,
+            "release_date": release,
+            "language": "Русский",
+            "age_rating": rng.choice(AGE_RATINGS),
+            "rating": round(min(10.0, max(1.0, rng.gauss(6.5, 1.3))), 1),
+            "is_active": True,
+            "is_featured": ranks[index] <= 20,
+            "created_at": release - timedelta(days=30),
+            "updated_at": release - timedelta(days=30),
+        }
+
+
+def generate_cinemas(settings: DatagenSettings, first_id: int):
+    rng = _rng(settings, "cinemas")
+    for cid in range(first_id, first_id + settings.cinemas):
+        city = _choose(rng, CITIES)
+        yield {
+            "id": cid,
+            "name": f"Cinema Paradise {city} #{cid}",
+            "address": f"ул. {rng.choice(STREETS)}, {rng.randint(1, 200)}",
+            "city": city,
+            "parking_available": rng.random() < 0.6,
+            "is_active": True,
+            "created_at": settings.start,
+            "updated_at": settings.start,
+        }
+
+
+def generate_halls(settings: DatagenSettings, first_id: int, first_cinema_id: int, infos: list):
+    """Залы; в infos складываются вместимость и раскладка мест"""
+    rng = _rng(settings, "halls")
+    hid = first_id
+    max_halls = max(3, 2 * settings.halls_per_cinema - 3)
+    for cid in range(first_cinema_id, first_cinema_id + settings.cinemas):
+        for number in range(1, rng.randint(min(3, max_halls), max_halls) + 1):
+            screen_type = _choose(rng, SCREEN_TYPES)
+            # Большинство залов на 60-150 мест, IMAX - до 400
+            if screen_type == "IMAX":
+                rows, seats_per_row = rng.randint(14, 20), rng.randint(18, 22)
+            else:
+                rows, seats_per_row = rng.randint(6, 12), rng.randint(10, 14)
+            capacity = rows * seats_per_row
+            vip = seats_per_row * rng.choice((0, 1, 2))
+            premium = seats_per_row * rng.choice((0, 2, 3))
+            infos.append(_HallInfo(hid, capacity, seats_per_row, vip, premium, screen_type))
+            yield {
+                "id": hid,
+                "cinema_id": cid,
+                "name": f"Зал №{number}",
+                "hall_number": number,
+                "total_seats": capacity,
+                "rows": rows,
+                "seats_per_row": seats_per_row,
+                "screen_type": screen_type,
+                "sound_system": "Dolby Atmos" if screen_type != "Standard" else "Standard",
+                "vip_seats": vip,
+                "premium_seats": premium,
+                "standard_seats": capacity - vip - premium,
+                "is_active": True,
+                "created_at": settings.start,
+                "updated_at": settings.start,
+            }
+            hid += 1
+
+
+def plan_sessions(settings: DatagenSettings, movies: list, halls: list, first_id: int) -> list:
+    """
+    Расписание всех сеансов.
+
+    Возвращает кортежи (id, movie, hall, start_time, end_time, base_price, demand),
+    demand - относительный спрос, по нему распределяются билеты.
+    """
+    rng = _rng(settings, "sessions")
+    by_release = sorted(movies, key=lambda m: m.release)
+    releases = [m.release for m in by_release]
+    plan = []
+    sid = first_id
+    for day_index in range(settings.days):
+        day = settings.start + timedelta(days=day_index)
+        # В прокате - вышедшие фильмы, у которых не закончился срок показа
+        showing = [m for m in by_release[:bisect.bisect_right(releases, day)]
+                   if day < m.release + timedelta(days=m.run_days)]
+        if not showing:
+            continue
+        cum_weights = list(accumulate(m.popularity for m in showing))
+        weekend = WEEKEND_DEMAND if day.weekday() >= 5 else 1.0
+        for hall in halls:
+            start = day + timedelta(hours=10, minutes=5 * rng.randrange(18))
+            while start.hour >= 10 and start.hour <= 23:
+                movie = rng.choices(showing, cum_weights=cum_weights)[0]
+                end = start + timedelta(minutes=movie.duration)
+                hour_demand = HOUR_DEMAND[start.hour]
+                price = 250 + 250 * hour_demand
+                if hall.screen_type != "Standard":
+                    price += 150
+                price = round(price * (1.2 if weekend > 1 else 1.0) / 10) * 10
+                plan.append((sid, movie, hall, start, end, price, movie.popularity * hour_demand * weekend))
+                sid += 1
+                # Уборка зала и округление до 5 минут
+                minutes = movie.duration + 15 + 5 * rng.randrange(4)
+                start += timedelta(minutes=minutes + (-minutes) % 5)
+    return plan
+
+
+def allocate_tickets(settings: DatagenSettings, plan: list) -> list:
+    """Количество проданных мест на каждый сеанс пропорционально спросу"""
+    rng = _rng(settings, "occupancy")
+    counts = [0] * len(plan)
+    # Места, не поместившиеся в заполненные залы, перераспределяются по остальным сеансам
+    for _ in range(5):
+        missing = settings.tickets - sum(counts)
+        open_demand = sum(item[6] for item, count in zip(plan, counts) if count < item[2].capacity)
+        if missing <= 0 or not open_demand:
+            break
+        scale = missing / open_demand
+        for index, (_, _, hall, _, _, _, demand) in enumerate(plan):
+            if counts[index] >= hall.capacity:
+                continue
+            expected = demand * scale * rng.uniform(0.6, 1.4)
+            # Вероятностное округление, чтобы сумма была близка к цели
+            count = int(expected) + (rng.random() < expected % 1)
+            counts[index] = min(hall.capacity, counts[index] + count)
+    return counts
+
+
+def generate_sessions(settings: DatagenSettings, plan: list, counts: list, now: datetime):
+    for (sid, movie, hall, start, end, price, _), sold in zip(plan, counts):
+        # Счётчики согласованы с генерируемыми билетами: у будущих сеансов
+        # часть мест забронирована без оплаты
+        reserved = sold // 4 if start >= now else 0
+        yield {
+            "id": sid,
+            "movie_id": movie.id,
+            "hall_id": hall.id,
+            "start_time": start,
+            "end_time": end,
+            "date": start.replace(hour=0, minute=0),
+            "base_price": price,
+            "vip_price": price * 2,
+            "premium_price": round(price * 1.4),
+            "available_seats": hall.capacity - sold,
+            "sold_tickets": sold - reserved,
+            "reserved_tickets": reserved,
+            "is_active": True,
+            "is_sold_out": sold >= hall.capacity,
+            "format_3d": hall.screen_type == "3D",
+            "format_imax": hall.screen_type == "IMAX",
+            "created_at": start - timedelta(days=14),
+            "updated_at": start - timedelta(days=14),
+        }
+
+
+def generate_tickets(settings: DatagenSettings, plan: list, counts: list, now: datetime, first_id: int, first_user_id: int):
+    rng = _rng(settings, "tickets")
+    tid = first_id
+    for (sid, _, hall, start, _, price, _), sold in zip(plan, counts):
+        if not sold:
+            continue
+        seats = sorted(rng.sample(range(1, hall.capacity + 1), sold))
+        reserved = sold // 4 if start >= now else 0
+        position = 0
+        while position < sold:
+            # Группа из 1-4 соседних (по порядку) мест: один покупатель и время покупки
+            group = min(sold - position, rng.choice((1, 2, 2, 2, 3, 4)))
+            # Квадрат равномерной величины: часть пользователей ходит в кино чаще
+            user_id = first_user_id + int(settings.users * rng.random() ** 2)
+            booking_time = start - timedelta(minutes=int(rng.expovariate(1 / 2880)) + 10)
+            for seat in seats[position:position + group]:
+                if seat <= hall.vip_seats:
+                    seat_type, seat_price = "vip", price * 2
+                elif seat <= hall.vip_seats + hall.premium_seats:
+                    seat_type, seat_price = "premium", round(price * 1.4)
+                else:
+                    seat_type, seat_price = "standard", price
+                # Первые reserved мест будущего сеанса - бронь без оплаты
+                unpaid = position < reserved
+                if start < now:
+                    status = "used"
+                elif unpaid:
+                    status = "booked"
+                else:
+                    status = "paid"
+                yield {
+                    "id": tid,
+                    "session_id": sid,
+                    "user_id": user_id,
+                    "seat_row": (seat - 1) // hall.seats_per_row + 1,
+                    "seat_number": seat,
+                    "seat_type": seat_type,
+                    "price": seat_price,
+                    "discount_applied": 0,
+                    "final_price": seat_price,
+                    "booking_reference": f"BK{tid:012d}",
+                    "status": status,
+                    "is_paid": not unpaid,
+                    "booking_time": booking_time,
+                    "payment_time": None if unpaid else booking_time + timedelta(minutes=rng.randint(1, 15)),
+                    "used_time": start if status == "used" else None,
+                    "created_at": booking_time,
+                }
+                tid += 1
+                position += 1
+
+
+def generate_reviews(settings: DatagenSettings, movies: list, first_id: int, first_user_id: int, now: datetime):
+    rng = _rng(settings, "reviews")
+    released = [m for m in movies if m.release < now]
+    if not released or not settings.users:
+        return
+    cum_weights = list(accumulate(m.popularity for m in released))
+    for rid in range(first_id, first_id + settings.reviews):
+        movie = rng.choices(released, cum_weights=cum_weights)[0]
+        # Оценка зависит от популярности фильма, распределение смещено к высоким
+        mean = 5.5 + 3 * min(1.0, movie.popularity * 10)
+        created = movie.release + timedelta(minutes=rng.randrange(max(1, int((now - movie.release).total_seconds() // 60))))
+        yield {
+            "id": rid,
+            "movie_id": movie.id,
+            "user_id": first_user_id + rng.randrange(settings.users),
+            "rating": max(1, min(10, round(rng.gauss(mean, 1.8)))),
+            "title": "Отзыв",
+            "content": "Сгенерированный отзыв для нагрузочного тестирования.",
+            "is_spoiler": rng.random() < 0.05,
+            "is_verified_purchase": rng.random() < 0.6,
+            "helpful_votes": int(rng.paretovariate(1.5)) - 1,
+            "unhelpful_votes": int(rng.paretovariate(2.5)) - 1,
+            "is_approved": rng.random() < 0.95,
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+def generate(settings: DatagenSettings, engine=None) -> dict:
+    """
+    Сгенерировать данные в базе (схема должна быть создана миграциями).
+
+    Новые строки получают id после уже существующих, поэтому генератор можно
+    запускать поверх демо данных. Возвращает количество вставленных строк.
+    """
+    if engine is None:
+        # Без вывода SQL независимо от профиля: миллионы строк в лог не нужны
+        engine = create_db_engine(DATABASE_URL, replace(get_database_settings(), echo=False))
+    with engine.connect() as conn:
+        first = {model: _next_id(conn, model) for model in (User, Movie, Cinema, Hall, Session, Ticket, Review)}
+
+    now = settings.start + timedelta(days=int(settings.days * NOW_FRACTION))
+    movies, halls = [], []
+    result = {
+        "users": _bulk_insert(engine, User, generate_users(settings, first[User]), settings.chunk_size),
+        "movies": _bulk_insert(engine, Movie, generate_movies(settings, first[Movie], movies), settings.chunk_size),
+        "cinemas": _bulk_insert(engine, Cinema, generate_cinemas(settings, first[Cinema]), settings.chunk_size),
+        "halls": _bulk_insert(engine, Hall, generate_halls(settings, first[Hall], first[Cinema], halls), settings.chunk_size),
+    }
+    plan = plan_sessions(settings, movies, halls, first[Session])
+    counts = allocate_tickets(settings, plan)
+    result["sessions"] = _bulk_insert(engine, Session, generate_sessions(settings, plan, counts, now), settings.chunk_size)
+    result["tickets"] = _bulk_insert(
+        engine, Ticket, generate_tickets(settings, plan, counts, now, first[Ticket], first[User]), settings.chunk_size,
+    )
+    result["reviews"] = _bulk_insert(
+        engine, Review, generate_reviews(settings, movies, first[Review], first[User], now), settings.chunk_size,
+    )
+    with engine.connect() as conn:
+        result["schedule"] = rebuild(conn)
+    return result
+
+
+def _parse_args(argv=None) -> DatagenSettings:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=PRESETS, default="small", help="Готовый набор объёмов")
+    for field in fields(DatagenSettings):
+        if field.name == "start":
+            parser.add_argument("--start", type=datetime.fromisoformat, help="Первый день расписания, YYYY-MM-DD")
+        else:
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=int)
+    args = parser.parse_args(argv)
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in fields(DatagenSettings) if getattr(args, field.name) is not None
+    }
+    return replace(PRESETS[args.scale], **overrides)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    settings = _parse_args()
+    started = time.perf_counter()
+    counts = generate(settings)
+    print("Сгенерировано: " + ", ".join(f"{name}={count}" for name, count in counts.items()))
+    print(f"Время: {time.perf_counter() - started:.1f} с")
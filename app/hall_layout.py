@@ -0,0 +1,237 @@
+"""
+Схемы залов.
+
+Hall.seat_map хранит схему зала JSON строкой - по строке символов на ряд:
+
+    {"rows": ["VVVV..VVVV",
+              "PPPPPPPPPPPP",
+              "SSSSSSSSSSSS",
+              "AASSSXXSSSAA"]}
+
+    S - обычное место, P - премиум, V - VIP,
+    A - место для маломобильных зрителей (тип standard),
+    X - заблокированное место (есть в нумерации, но не продаётся),
+    . - проход (не место, только сдвигает колонку).
+
+Места нумеруются подряд по рядам слева направо, начиная с 1; число мест
+схемы (вместе с заблокированными) должно совпадать с Hall.total_seats, а
+продаются bookable_count = total_seats - заблокированные. Если схемы нет, она строится по
+rows / seats_per_row: первые vip_seats мест - VIP, следующие premium_seats -
+премиум.
+
+Схема разбирается один раз в HallLayout - массивы ряда, колонки, типа и
+флагов по номеру места - и кэшируется по залу. Кэш сбрасывается, когда у зала
+меняется updated_at (for_hall), и не живёт дольше HALL_LAYOUT_TTL секунд при
+загрузке по id (get / get_async).
+"""
+
+from array import array
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+from . import queries
+
+logger = logging.getLogger(__name__)
+
+HALL_LAYOUT_TTL = float(os.getenv("HALL_LAYOUT_TTL", "300"))
+
+SEAT_TYPES = ("standard", "premium", "vip")
+STANDARD, PREMIUM, VIP = range(3)
+
+# Флаги места
+ACCESSIBLE = 1
+BLOCKED = 2
+
+# Символ схемы -> (тип, флаги)
+CELLS = {
+    "S": (STANDARD, 0),
+    "P": (PREMIUM, 0),
+    "V": (VIP, 0),
+    "A": (STANDARD, ACCESSIBLE),
+    "X": (STANDARD, BLOCKED),
+}
+AISLE = "."
+
+
+class HallLayout:
+    """Схема зала: ряд, колонка, тип и флаги каждого места (индекс - номер места)"""
+
+    __slots__ = ("hall_id", "version", "capacity", "row_count", "row_of", "column_of", "types", "flags",
+                 "row_starts", "blocked_count", "bookable_count", "loaded_at", "_row_masks")
+
+    def __init__(self, hall_id: int, version, rows: List[List[tuple]]):
+        """rows - ряды из (колонка, тип, флаги) для каждого места"""
+        self.hall_id = hall_id
+        self.version = version
+        self.capacity = sum(len(row) for row in rows)
+        self.row_count = len(rows)
+        # Нулевой элемент не используется: номера мест с 1
+        self.row_of = array("H", [0])
+        self.column_of = array("H", [0])
+        self.types = bytearray(1)
+        self.flags = bytearray(1)
+        # Места ряда r - range(row_starts[r - 1], row_starts[r])
+        self.row_starts = array("I", [1])
+        for row_number, row in enumerate(rows, start=1):
+            for column, seat_type, flags in row:
+                self.row_of.append(row_number)
+                self.column_of.append(column)
+                self.types.append(seat_type)
+                self.flags.append(flags)
+            self.row_starts.append(len(self.row_of))
+        self.blocked_count = sum(1 for flags in self.flags if flags & BLOCKED)
+        # Места, которые продаются: начальное available_seats сеанса
+        self.bookable_count = self.capacity - self.blocked_count
+        self.loaded_at = time.monotonic()
+        self._row_masks = None
+
+    @classmethod
+    def from_seat_map(cls, hall_id: int, version, seat_map) -> "HallLayout":
+        """Схема из JSON строки (или уже разобранного объекта); ошибка формата - ValueError"""
+        data = json.loads(seat_map) if isinstance(seat_map, (str, bytes)) else seat_map
+        rows = data.get("rows") if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, str) for row in rows):
+            raise ValueError("seat_map: ожидается {\"rows\": [\"SSS..SSS\", ...]}")
+        parsed = []
+        for row_number, row in enumerate(rows, start=1):
+            seats = []
+            for column, cell in enumerate(row, start=1):
+                if cell == AISLE:
+                    continue
+                if cell not in CELLS:
+                    raise ValueError(f"seat_map: неизвестный символ {cell!r} в ряду {row_number}")
+                seats.append((column, *CELLS[cell]))
+            parsed.append(seats)
+        return cls(hall_id, version, parsed)
+
+    @classmethod
+    def from_counts(cls, hall_id: int, version, total_seats: int, seats_per_row: int = None,
+                    vip_seats: int = 0, premium_seats: int = 0) -> "HallLayout":
+        """Прямоугольная схема по количеству мест: сначала VIP, затем премиум"""
+        if not seats_per_row:
+            # Примерно 10 мест в ряду
+            estimated_rows = max(1, int((total_seats / 10) + 0.5))
+            seats_per_row = max(1, total_seats // estimated_rows)
+        vip_seats = vip_seats or 0
+        premium_seats = premium_seats or 0
+        rows = []
+        for seat in range(1, total_seats + 1):
+            if (seat - 1) % seats_per_row == 0:
+                rows.append([])
+            seat_type = VIP if seat <= vip_seats else PREMIUM if seat <= vip_seats + premium_seats else STANDARD
+            rows[-1].append(((seat - 1) % seats_per_row + 1, seat_type, 0))
+        return cls(hall_id, version, rows)
+
+    def is_valid(self, seat: int) -> bool:
+        return 1 <= seat <= self.capacity
+
+    def is_bookable(self, seat: int) -> bool:
+        return self.is_valid(seat) and not self.flags[seat] & BLOCKED
+
+    def is_accessible(self, seat: int) -> bool:
+        return bool(self.flags[seat] & ACCESSIBLE)
+
+    def seat_type(self, seat: int) -> str:
+        return SEAT_TYPES[self.types[seat]]
+
+    def row_seats(self, row: int) -> range:
+        """Номера мест ряда (ряды с 1)"""
+        return range(self.row_starts[row - 1], self.row_starts[row])
+
+    def row_masks(self) -> List[tuple]:
+        """
+        Битовые маски рядов (бит i - место row_seats(row)[i]), считаются один раз:
+        (первое место, число мест, соседство, заблокированные, маски по типам).
+        Бит i соседства стоит, если места i и i + 1 рядом (между ними нет прохода).
+        """
+        if self._row_masks is None:
+            masks = []
+            for row in range(1, self.row_count + 1):
+                seats = self.row_seats(row)
+                adjacent = blocked = 0
+                by_type = [0] * len(SEAT_TYPES)
+                for index, seat in enumerate(seats):
+                    bit = 1 << index
+                    if seat + 1 < seats.stop and self.column_of[seat + 1] == self.column_of[seat] + 1:
+                        adjacent |= bit
+                    if self.flags[seat] & BLOCKED:
+                        blocked |= bit
+                    by_type[self.types[seat]] |= bit
+                masks.append((seats.start, len(seats), adjacent, blocked, tuple(by_type)))
+            self._row_masks = masks
+        return self._row_masks
+
+    def blocked_seats(self) -> List[int]:
+        if not self.blocked_count:
+            return []
+        return [seat for seat in range(1, self.capacity + 1) if self.flags[seat] & BLOCKED]
+
+
+def build_layout(hall) -> HallLayout:
+    """Схема зала из seat_map либо по количеству мест"""
+    if hall.seat_map:
+        try:
+            layout = HallLayout.from_seat_map(hall.id, hall.updated_at, hall.seat_map)
+        except ValueError as exc:
+            logger.warning("Зал %s: некорректная схема мест (%s), используется схема по количеству мест", hall.id, exc)
+        else:
+            if layout.capacity == hall.total_seats:
+                return layout
+            logger.warning("Зал %s: в схеме %s мест, а total_seats=%s - схема не используется",
+                           hall.id, layout.capacity, hall.total_seats)
+    return HallLayout.from_counts(hall.id, hall.updated_at, hall.total_seats, hall.seats_per_row,
+                                  hall.vip_seats, hall.premium_seats)
+
+
+class HallLayoutCache:
+    """Разобранные схемы залов по id"""
+
+    def __init__(self, ttl: float = HALL_LAYOUT_TTL):
+        self.ttl = ttl
+        self._layouts = {}
+
+    def for_hall(self, hall) -> HallLayout:
+        """Схема загруженного зала; пересобирается, если зал изменился"""
+        layout = self._layouts.get(hall.id)
+        if layout is None or layout.version != hall.updated_at:
+            layout = self._layouts[hall.id] = build_layout(hall)
+        return layout
+
+    def _cached(self, hall_id: int) -> Optional[HallLayout]:
+        layout = self._layouts.get(hall_id)
+        if layout is not None and time.monotonic() - layout.loaded_at <= self.ttl:
+            return layout
+        return None
+
+    def get(self, db, hall_id: int) -> Optional[HallLayout]:
+        """Схема зала по id (синхронная Session); None - зала нет"""
+        layout = self._cached(hall_id)
+        if layout is not None:
+            return layout
+        hall = queries.get_hall(db, hall_id)
+        return self._reload(hall) if hall is not None else None
+
+    async def get_async(self, db, hall_id: int) -> Optional[HallLayout]:
+        """Схема зала по id (AsyncSession); None - зала нет"""
+        layout = self._cached(hall_id)
+        if layout is not None:
+            return layout
+        hall = await queries.get_hall_async(db, hall_id)
+        return self._reload(hall) if hall is not None else None
+
+    def _reload(self, hall) -> HallLayout:
+        layout = self.for_hall(hall)
+        layout.loaded_at = time.monotonic()
+        return layout
+
+    def invalidate(self, hall_id: int = None):
+        if hall_id is None:
+            self._layouts.clear()
+        else:
+            self._layouts.pop(hall_id, None)
+
+
+hall_layouts = HallLayoutCache()
@@ -0,0 +1,190 @@
+"""
+Временные брони мест.
+
+POST /tickets/hold создаёт билеты со status=reserved и сроком hold_expires_at:
+места заняты (счётчики сеанса и карта мест обновлены так же, как при обычном
+бронировании, см. app/booking.py), но только до истечения срока. Оплата
+(PATCH /tickets/{id}/pay) превращает бронь в оплаченный билет, неоплаченные
+брони снимает фоновая задача HoldSweeper.
+
+Задача раз в HOLD_SWEEP_INTERVAL секунд удаляет истёкшие брони пачками по
+HOLD_SWEEP_BATCH и возвращает места в available_seats / reserved_tickets
+(app/session_counters.py).
+Пачка выбирается по частичному индексу ix_tickets_hold_expires_at, в котором
+только билеты с hold_expires_at, поэтому стоимость прохода зависит от числа
+истёкших броней, а не от размера таблицы билетов. Каждая пачка - одна
+транзакция, в режиме SQLite - через очередь единственного писателя.
+
+Параметры окружения:
+
+    SEAT_HOLD_MINUTES=15        # срок брони по умолчанию
+    SEAT_HOLD_MAX_MINUTES=60    # максимальный hold_minutes в запросе
+    HOLD_SWEEP_INTERVAL=30      # секунды между проходами, 0 - задача не запускается
+    HOLD_SWEEP_BATCH=500        # броней в одной транзакции
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, select, update
+
+from .checkin import checkin
+from .models import Ticket
+from .seat_inventory import seat_inventory
+from .session_counters import mark_sold, mark_sold_async, release_seats_async
+from .write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+SEAT_HOLD_MINUTES = int(os.getenv("SEAT_HOLD_MINUTES", "15"))
+SEAT_HOLD_MAX_MINUTES = int(os.getenv("SEAT_HOLD_MAX_MINUTES", "60"))
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "30"))
+HOLD_SWEEP_BATCH = int(os.getenv("HOLD_SWEEP_BATCH", "500"))
+
+HOLD_STATUS = "reserved"
+
+# Самые старые истёкшие брони (условие hold_expires_at IS NOT NULL - для частичного индекса)
+EXPIRED_HOLDS = (
+    select(Ticket.id)
+    .where(
+        Ticket.hold_expires_at.isnot(None),
+        Ticket.hold_expires_at <= bindparam("now"),
+        Ticket.status == HOLD_STATUS,
+    )
+    .order_by(Ticket.hold_expires_at)
+    .limit(bindparam("batch"))
+)
+RELEASE_EXPIRED_HOLDS = (
+    delete(Ticket)
+    .where(Ticket.id.in_(EXPIRED_HOLDS))
+    .returning(Ticket.session_id, Ticket.seat_number, Ticket.booking_reference)
+    .execution_options(synchronize_session=False)
+)
+# Оплата брони, пока она не истекла и не снята
+CONVERT_HOLD = (
+    update(Ticket)
+    .where(
+        Ticket.id == bindparam("ticket_id"),
+        Ticket.status == HOLD_STATUS,
+        Ticket.hold_expires_at > bindparam("now"),
+    )
+    .values(status="paid", is_paid=True, hold_expires_at=None, payment_time=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+
+
+def hold_deadline(minutes=None) -> datetime:
+    """Срок новой брони; minutes вне 1..SEAT_HOLD_MAX_MINUTES - 400"""
+    if minutes is None:
+        minutes = SEAT_HOLD_MINUTES
+    if not isinstance(minutes, int) or not 1 <= minutes <= SEAT_HOLD_MAX_MINUTES:
+        raise HTTPException(status_code=400, detail=f"hold_minutes должен быть от 1 до {SEAT_HOLD_MAX_MINUTES}")
+    return datetime.utcnow() + timedelta(minutes=minutes)
+
+
+def is_hold(ticket) -> bool:
+    return ticket.status == HOLD_STATUS and ticket.hold_expires_at is not None
+
+
+def pay_hold(db, ticket):
+    """
+    Оплатить временную бронь (синхронная Session).
+
+    Условный UPDATE не даёт оплатить бронь, которую уже сняла фоновая задача
+    или у которой истёк срок - 409.
+    """
+    now = datetime.utcnow()
+    converted = db.execute(CONVERT_HOLD, {"ticket_id": ticket.id, "now": now}).rowcount
+    if converted != 1:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Время брони истекло")
+    mark_sold(db, ticket.session_id)
+    db.commit()
+    seat_inventory.mark_paid(ticket.session_id, (ticket.seat_number,))
+
+
+async def pay_hold_async(db, ticket):
+    """Оплатить временную бронь (AsyncSession), см. pay_hold"""
+    now = datetime.utcnow()
+    converted = (await db.execute(CONVERT_HOLD, {"ticket_id": ticket.id, "now": now})).rowcount
+    if converted != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Время брони истекло")
+    await mark_sold_async(db, ticket.session_id)
+    await db.commit()
+    seat_inventory.mark_paid(ticket.session_id, (ticket.seat_number,))
+
+
+async def release_expired_holds(db, batch: int = HOLD_SWEEP_BATCH, now: datetime = None) -> int:
+    """Снять одну пачку истёкших броней (AsyncSession); возвращает число снятых"""
+    now = now or datetime.utcnow()
+    released = (await db.execute(RELEASE_EXPIRED_HOLDS, {"now": now, "batch": batch})).all()
+    if not released:
+        return 0
+
+    seats_by_session = defaultdict(list)
+    references_by_session = defaultdict(list)
+    for session_id, seat_number, reference in released:
+        seats_by_session[session_id].append(seat_number)
+        references_by_session[session_id].append(reference)
+    # Брони не оплачены: места возвращаются из reserved_tickets
+    await release_seats_async(db, [(session_id, False) for session_id, _, _ in released])
+    await db.commit()
+
+    for session_id, seats in seats_by_session.items():
+        seat_inventory.release(session_id, seats)
+        checkin.evict(session_id, references_by_session[session_id])
+    return len(released)
+
+
+class HoldSweeper:
+    """Фоновая задача снятия истёкших броней"""
+
+    def __init__(self, interval: float = HOLD_SWEEP_INTERVAL, batch: int = HOLD_SWEEP_BATCH):
+        self.interval = interval
+        self.batch = batch
+        self._task = None
+
+    async def sweep(self) -> int:
+        """Снять все истёкшие на текущий момент брони, пачками"""
+        total = 0
+        while True:
+            released = await write_queue.submit(lambda db: release_expired_holds(db, self.batch))
+            total += released
+            if released < self.batch:
+                break
+        if total:
+            logger.info("Сняты истёкшие брони", extra={"tickets": total})
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка снятия истёкших броней")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        # Задача привязана к текущему event loop
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="hold-sweeper")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+hold_sweeper = HoldSweeper()
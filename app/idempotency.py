@@ -0,0 +1,224 @@
+"""
+Ключи идемпотентности для бронирования и оплаты.
+
+Клиент передаёт заголовок Idempotency-Key (например, UUID на одну попытку
+покупки) и повторяет запрос с тем же ключом, если не дождался ответа. Первый
+ответ сохраняется, повтор получает его без выполнения обработчика - без
+запросов к пользователям, сеансам и билетам - с заголовком
+Idempotent-Replayed: true.
+
+- Ключ действует в пределах метода, пути и заголовка Authorization: разные
+  пользователи с одинаковым ключом не пересекаются.
+- Тот же ключ с другим телом запроса - 422.
+- Параллельный дубликат ждёт завершения первого запроса (до
+  IDEMPOTENCY_WAIT_TIMEOUT секунд, затем 409) и получает его ответ.
+- Сохраняются только окончательные ответы: 5xx и повторяемые статусы
+  (RETRYABLE_STATUSES, например 429 виртуальной очереди с Retry-After) не
+  сохраняются, повтор с тем же ключом выполнится заново.
+
+Хранилище в памяти процесса: ответы хранятся IDEMPOTENCY_TTL секунд, не
+больше IDEMPOTENCY_MAX_KEYS ключей (старые вытесняются). Хранятся только
+статус, тип содержимого, тело ответа и отпечаток тела запроса. При нескольких
+воркерах повтор, попавший в другой процесс, выполнится заново; защиту от
+двойной продажи при этом даёт транзакция бронирования (app/booking.py).
+"""
+
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Ответы, после которых клиент повторяет запрос с тем же ключом: не сохраняются
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+
+# Эндпоинты с поддержкой Idempotency-Key
+IDEMPOTENT_ROUTES = (
+    ("POST", re.compile(r"^/tickets(/hold|/batch)?/?$")),
+    ("PATCH", re.compile(r"^/tickets/\d+/pay/?$")),
+    ("POST", re.compile(r"^/sessions/\d+/best-available/?$")),
+)
+
+
+class StoredResponse:
+    """Сохранённый ответ и отпечаток запроса, на который он был дан"""
+
+    __slots__ = ("fingerprint", "status", "content_type", "body", "expires_at")
+
+    def __init__(self, fingerprint: bytes, status: int, content_type: bytes, body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """Ответы по ключам: TTL, ограничение размера и ожидание запросов в работе"""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        # TTL одинаковый, поэтому порядок вставки - это порядок истечения
+        self._responses = OrderedDict()
+        self._in_flight = {}
+        self.replays = 0
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._responses:
+            key, stored = next(iter(self._responses.items()))
+            if stored.expires_at > now and len(self._responses) <= self.max_keys:
+                break
+            del self._responses[key]
+
+    def get(self, key) -> Optional[StoredResponse]:
+        stored = self._responses.get(key)
+        if stored is not None and stored.expires_at <= time.monotonic():
+            del self._responses[key]
+            return None
+        return stored
+
+    def put(self, key, fingerprint: bytes, status: int, content_type: bytes, body: bytes):
+        self._responses[key] = StoredResponse(fingerprint, status, content_type, body, time.monotonic() + self.ttl)
+        self._responses.move_to_end(key)
+        self._evict()
+
+    def in_flight(self, key) -> Optional[asyncio.Event]:
+        return self._in_flight.get(key)
+
+    def begin(self, key) -> asyncio.Event:
+        event = self._in_flight[key] = asyncio.Event()
+        return event
+
+    def finish(self, key):
+        event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def clear(self):
+        self._responses.clear()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._responses), "in_flight": len(self._in_flight), "replays": self.replays}
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _is_idempotent_route(method: str, path: str) -> bool:
+    return any(method == route_method and pattern.match(path) for route_method, pattern in IDEMPOTENT_ROUTES)
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+async def _send_json(send, status: int, data: dict, replayed: bool = False):
+    body = json.dumps(data, ensure_ascii=False).encode()
+    await _send(send, status, b"application/json", body, replayed)
+
+
+async def _send(send, status: int, content_type: bytes, body: bytes, replayed: bool = False):
+    headers = [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware: повтор ответа по Idempotency-Key для бронирования и оплаты"""
+
+    def __init__(self, app, store: IdempotencyStore = None, wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT):
+        self.app = app
+        self.store = store or idempotency_store
+        self.wait_timeout = wait_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_idempotent_route(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Неверный Idempotency-Key"})
+            return
+
+        # Тело читается целиком: по нему считается отпечаток, обработчику оно передаётся заново
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).digest()[:16]
+        authorization = hashlib.sha256(_header(scope, b"authorization") or b"").digest()[:16]
+        key = (scope["method"], scope["path"], authorization, idempotency_key)
+
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    await _send_json(send, 422, {"detail": "Idempotency-Key уже использован с другим запросом"})
+                    return
+                self.store.replays += 1
+                await _send(send, stored.status, stored.content_type, stored.body, replayed=True)
+                return
+            event = self.store.in_flight(key)
+            if event is None:
+                break
+            # Дубликат ждёт первый запрос и затем получает его ответ
+            try:
+                await asyncio.wait_for(event.wait(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                await _send_json(send, 409, {"detail": "Запрос с этим Idempotency-Key ещё выполняется"})
+                return
+
+        self.store.begin(key)
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        response = {"status": None, "content_type": b"application/json", "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = dict(message.get("headers", [])).get(b"content-type", b"application/json")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            status = response["status"]
+            if status is not None and status < 500 and status not in RETRYABLE_STATUSES:
+                self.store.put(key, fingerprint, status, response["content_type"], b"".join(response["body"]))
+        finally:
+            self.store.finish(key)
@@ -0,0 +1,159 @@
+"""
+Настройка логирования приложения.
+
+Записи логов кладутся в очередь (QueueHandler), а форматирование и запись в
+консоль выполняет отдельный поток QueueListener, поэтому запрос не ждёт
+вывода в stdout/stderr. Параметры задаются переменными окружения:
+
+    LOG_LEVEL=INFO                 # уровень корневого логгера
+    LOG_FORMAT=text|json           # json - одна JSON строка на запись
+    LOG_DEBUG_SAMPLE_RATE=1.0      # доля пропускаемых DEBUG записей (0.01 - каждая сотая)
+
+Дополнительные поля передаются через extra и попадают в JSON:
+
+    logger.info("Билеты забронированы", extra={"session_id": 1, "seats": 2})
+"""
+
+import atexit
+import copy
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+# Атрибуты LogRecord, которые не считаются пользовательскими полями extra
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+
+
+def record_extras(record: logging.LogRecord) -> dict:
+    """Поля, переданные через extra"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON строка на запись: время, уровень, логгер, сообщение и поля extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_extras(record),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Обычный текстовый формат, поля extra дописываются в конец строки"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = record_extras(record)
+        if extras:
+            line += " " + " ".join(f"{key}={value}" for key, value in extras.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание частых отладочных записей.
+
+    Из записей уровня DEBUG и ниже с одинаковым шаблоном сообщения
+    пропускается каждая N-я (N = 1 / rate). Записи выше DEBUG не трогаются.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if not self.every:
+            return False
+        with self._lock:
+            count = self._counters.get(record.msg, 0)
+            self._counters[record.msg] = count + 1
+        return count % self.every == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке.
+
+    Стандартный prepare() подставляет аргументы в сообщение сразу; здесь запись
+    только копируется, а getMessage() и форматирование выполняет поток
+    QueueListener. Аргументы логов должны быть неизменяемыми значениями
+    (числа, строки, кортежи), а не объектами, которые меняются после вызова.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def configure_logging(level: str = None, fmt: str = None, debug_sample_rate: float = None, stream=None):
+    """
+    Подключить очередь логов к корневому логгеру (повторный вызов перенастраивает).
+
+    Параметры по умолчанию берутся из LOG_LEVEL, LOG_FORMAT и LOG_DEBUG_SAMPLE_RATE.
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    if debug_sample_rate is None:
+        debug_sample_rate = _env_float("LOG_DEBUG_SAMPLE_RATE", 1.0)
+
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    # Очередь без ограничения: запись в неё не блокирует поток запроса
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(debug_sample_rate))
+    handler._cinema_queue_handler = True
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, "_cinema_queue_handler", False):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Дописать записи из очереди и остановить поток логирования"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
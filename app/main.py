@@ -1,12 +1,41 @@
-from fastapi import FastAPI, Header, HTTPException, Depends, Response
+from contextlib import AsyncExitStack
+from datetime import date
+import logging
+import os
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import uvicorn
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 
-from sqlalchemy import create_engine
-from app.database import Base, engine, get_db
+from sqlalchemy import select
+from app.database import engine, async_engine, sqlite_writer_engine, get_db, get_async_db, get_pool_stats
+from app.query_stats import QueryStatsMiddleware, instrument_engine
+from app.idempotency import IdempotencyMiddleware
+from app.response_cache import ResponseCacheMiddleware, response_cache
+from app.write_queue import write_queue
+from app.seat_inventory import seat_inventory
+from app.booking import (
+    BATCH_BOOKING_MAX_SEATS, check_seat_numbers, validate_seats, build_tickets, book_seats_async,
+    book_batch_async, find_taken_seats_async,
+)
+from app.holds import hold_deadline, hold_sweeper
+from app.session_counters import counter_reconciler
+from app.waiting_room import ADMISSION_HEADER, waiting_room
+from app.checkin import checkin
+from app.schedule import SCHEDULE_MAX_DAYS, schedule_query
+from app.pagination import NEXT_CURSOR_HEADER, count_cache
+from app.hall_layout import SEAT_TYPES, hall_layouts
+from app.best_available import BEST_AVAILABLE_MAX_SEATS, HOLD_ATTEMPTS, find_best_seats, hold_lock
+from app.queries import (
+    get_user_by_username,
+    get_user_by_username_async, get_session_async, get_hall_async,
+    get_sessions_with_halls_async, get_user_tickets_async, ticket_listing_query, TICKETS_KEYSET,
+)
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Импортируем модели напрямую для избежания циклических зависимостей
 try:
@@ -18,9 +47,14 @@ try:
     Ticket = models.Ticket
     Cinema = models.Cinema
 except ImportError as e:
-    print(f"Ошибка импорта моделей: {e}")
+    logging.getLogger(__name__).error("Ошибка импорта моделей: %s", e)
 
 from app.models import UserRole, MovieGenre
+from app.logging_config import configure_logging
+
+# Логи пишутся через очередь отдельным потоком (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Создаем приложение FastAPI
 app = FastAPI(
@@ -29,6 +63,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Ответы каталога и расписания из кэша в памяти, сбрасываются обработчиками изменений
+# (внутри CORS: заголовки CORS добавляются и к ответам из кэша)
+app.add_middleware(ResponseCacheMiddleware)
+
+# Повтор бронирования или оплаты с тем же Idempotency-Key получает сохранённый ответ
+# (тоже внутри CORS: повтор и собственные 409/422 читаются браузером)
+app.add_middleware(IdempotencyMiddleware)
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,103 +78,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Счётчики SQL запросов доступны фронтенду для отладки
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-N-Plus-One", "Idempotent-Replayed", "X-Cache", "ETag", NEXT_CURSOR_HEADER],
 )
 
-# Инициализация базы данных
-Base.metadata.create_all(bind=engine)
+# Подсчёт SQL запросов на каждый HTTP запрос и детектор N+1
+for _engine in (engine, async_engine, sqlite_writer_engine):
+    if _engine is not None:
+        instrument_engine(_engine)
+app.add_middleware(QueryStatsMiddleware)
 
-# Функция для добавления тестовых данных в БД
-def init_db():
-    db = next(get_db())
-    # Проверяем, есть ли данные
-    try:
-        # Создаем таблицы, если они еще не созданы
-        Base.metadata.create_all(bind=engine)
-        
-        if db.query(User).first() is None:
-            # Добавляем пользователей
-            admin = User(username="admin", email="admin@cinema.com", hashed_password="admin123", first_name="Admin", last_name="User", role=UserRole.ADMIN)
-            manager = User(username="manager", email="manager@cinema.com", hashed_password="manager123", first_name="Manager", last_name="User", role=UserRole.MANAGER)
-            user = User(username="user", email="user@cinema.com", hashed_password="user123", first_name="Regular", last_name="User", role=UserRole.CUSTOMER)
-            db.add(admin)
-            db.add(manager)
-            db.add(user)
-            db.commit()
-            print("Тестовые пользователи добавлены")
-        else:
-            print("Пользователи уже существуют")
-        
-        if db.query(Movie).first() is None:
-            # Добавляем фильмы
-            movie1 = Movie(title="Аватар: Путь воды", duration_minutes=192, rating=8.5, genre=MovieGenre.SCI_FI)
-            movie2 = Movie(title="Топ Ган: Мэверик", duration_minutes=130, rating=8.8, genre=MovieGenre.ACTION)
-            movie3 = Movie(title="Чёрная пантера: Ваканда навеки", duration_minutes=161, rating=7.2, genre=MovieGenre.ACTION)
-            db.add(movie1)
-            db.add(movie2)
-            db.add(movie3)
-            db.commit()
-            print("Тестовые фильмы добавлены")
-        else:
-            print("Фильмы уже существуют")
-        
-        if db.query(Cinema).first() is None:
-            # Добавляем кинотеатр
-            cinema = Cinema(name="Cinema Paradise", address="ул. Примерная, 123", city="Москва")
-            db.add(cinema)
-            db.commit()
-            print("Тестовый кинотеатр добавлен")
-        else:
-            print("Кинотеатр уже существует")
-        
-        if db.query(Hall).first() is None:
-            # Добавляем залы
-            cinema = db.query(Cinema).first()
-            hall1 = Hall(cinema_id=cinema.id, name="Зал №1", hall_number=1, total_seats=100, rows=10, seats_per_row=10)
-            hall2 = Hall(cinema_id=cinema.id, name="Зал №2", hall_number=2, total_seats=80, rows=8, seats_per_row=10)
-            db.add(hall1)
-            db.add(hall2)
-            db.commit()
-            print("Тестовые залы добавлены")
-        else:
-            print("Залы уже существуют")
-        
-        if db.query(Session).first() is None:
-            # Добавляем сеансы
-            from datetime import datetime
-            session1 = Session(movie_id=1, hall_id=1, start_time=datetime(2024, 1, 15, 14, 0), end_time=datetime(2024, 1, 15, 17, 12), date=datetime(2024, 1, 15), base_price=450, available_seats=100)
-            session2 = Session(movie_id=2, hall_id=2, start_time=datetime(2024, 1, 15, 16, 30), end_time=datetime(2024, 1, 15, 18, 40), date=datetime(2024, 1, 15), base_price=400, available_seats=80)
-            session3 = Session(movie_id=3, hall_id=1, start_time=datetime(2024, 1, 15, 19, 0), end_time=datetime(2024, 1, 15, 21, 41), date=datetime(2024, 1, 15), base_price=420, available_seats=100)
-            db.add(session1)
-            db.add(session2)
-            db.add(session3)
-            db.commit()
-            print("Тестовые сеансы добавлены")
-        else:
-            print("Сеансы уже существуют")
-        
-        if db.query(Ticket).first() is None:
-            # Добавляем тестовые билеты
-            from datetime import datetime
-            ticket1 = Ticket(user_id=1, session_id=1, seat_row=2, seat_number=5, price=450, final_price=450, status="booked", booking_reference="REF1", is_paid=True, booking_time=datetime(2024, 1, 15, 10, 30))
-            ticket2 = Ticket(user_id=3, session_id=2, seat_row=3, seat_number=3, price=400, final_price=400, status="booked", booking_reference="REF2", is_paid=False, booking_time=datetime(2024, 1, 15, 11, 15))
-            db.add(ticket1)
-            db.add(ticket2)
-            db.commit()
-            print("Тестовые билеты добавлены")
-        else:
-            print("Билеты уже существуют")
-    except Exception as e:
-        print(f"Ошибка при инициализации данных: {e}")
-    finally:
-        db.close()
-
-# Вызываем инициализацию при запуске
+# Запуск без работы со схемой и данными: схема создаётся миграциями
+# (alembic upgrade head), демо данные - python -m app.seed или SEED_DEMO_DATA=1
 @app.on_event("startup")
 async def startup_db_client():
-    # Убедимся, что таблицы созданы перед инициализацией данных
-    Base.metadata.create_all(bind=engine)
-    init_db()
-    print("База данных инициализирована")
+    logger.info("База данных: %s", engine.url.render_as_string(hide_password=True))
+    if os.getenv("SEED_DEMO_DATA", "").strip().lower() in ("1", "true", "yes", "on"):
+        from app.seed import init_db
+        await run_in_threadpool(init_db)
+    # Снятие истёкших временных броней (HOLD_SWEEP_INTERVAL)
+    hold_sweeper.start()
+    # Сверка счётчиков мест сеансов с билетами (COUNTER_RECONCILE_INTERVAL)
+    counter_reconciler.start()
+    # Истёкшие пропуска и ожидающие виртуальной очереди бронирования
+    waiting_room.start()
+    # Индексы билетов ближайших сеансов и запись отметок прохода в зал
+    checkin.start()
+
+@app.on_event("shutdown")
+async def shutdown_write_queue():
+    await hold_sweeper.stop()
+    await counter_reconciler.stop()
+    await waiting_room.stop()
+    await checkin.stop()
+    # Дописываем поставленные в очередь бронирования перед остановкой
+    await write_queue.stop()
 
 # Базовые эндпоинты
 @app.get("/")
@@ -154,11 +134,28 @@ async def health_check():
         "timestamp": "2024-01-15T12:00:00Z"
     }
 
+@app.get("/health/db")
+async def health_db():
+    """Метрики пулов соединений с БД"""
+    return {
+        "status": "healthy",
+        "pools": get_pool_stats()
+    }
+
+@app.get("/health/cache")
+async def health_cache():
+    """Счётчики кэша ответов каталога (app/response_cache.py) и кэша COUNT списков (app/pagination.py)"""
+    return {
+        "status": "healthy",
+        "response_cache": response_cache.stats(),
+        "count_cache": count_cache.stats()
+    }
+
 # Демо эндпоинты для базовой функциональности
 @app.get("/movies")
-async def get_movies(db: Session = Depends(get_db)):
+async def get_movies(db: AsyncSession = Depends(get_async_db)):
     """Получить список фильмов"""
-    movies = db.query(Movie).all()
+    movies = (await db.execute(select(Movie))).scalars().all()
     return [{
         "id": movie.id,
         "title": movie.title,
@@ -168,31 +165,34 @@ async def get_movies(db: Session = Depends(get_db)):
     } for movie in movies]
 
 @app.get("/sessions")
-async def get_sessions(db: Session = Depends(get_db)):
-    """Получить список сеансов"""
-    sessions = db.query(Session).all()
-    result = []
-    for session in sessions:
-        movie = db.query(Movie).filter(Movie.id == session.movie_id).first()
-        hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
-        result.append({
-            "id": session.id,
-            "movie_id": session.movie_id,
-            "movie": {"title": movie.title},
-            "start_time": session.start_time.isoformat(),
-            "price": float(session.base_price),
-            "hall_id": session.hall_id,
-            "hall": {"name": hall.name, "capacity": hall.total_seats},
-            "available_seats": session.available_seats
-        })
-    return result
+async def get_sessions(day: Optional[date] = Query(None, alias="date"), days: int = Query(1, ge=1, le=SCHEDULE_MAX_DAYS),
+                       cinema_id: Optional[int] = None, movie_id: Optional[int] = None,
+                       db: AsyncSession = Depends(get_async_db)):
+    """
+    Расписание сеансов из проекции schedule_entries одним запросом.
+
+    date и days - дни [date, date + days), cinema_id и movie_id - фильтры;
+    без date - все сеансы. Значения уже JSON-типов, поэтому ответ собирается
+    без jsonable_encoder.
+    """
+    entries = (await db.execute(schedule_query(day, days, cinema_id, movie_id))).all()
+    return JSONResponse([{
+        "id": entry.session_id,
+        "movie_id": entry.movie_id,
+        "movie": {"title": entry.movie_title},
+        "start_time": entry.start_time.isoformat(),
+        "price": float(entry.base_price),
+        "hall_id": entry.hall_id,
+        "hall": {"name": entry.hall_name, "capacity": entry.capacity},
+        "available_seats": entry.available_seats
+    } for entry in entries])
 
 @app.post("/auth/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Авторизация пользователя через форму (form-data)"""
     username = form_data.username
     password = form_data.password
-    user = db.query(User).filter(User.username == username).first()
+    user = get_user_by_username(db, username)
     # В реальном приложении сравнивай хеш пароля!
     if user and user.hashed_password == password:
         token = f"demo_token_{username}"
@@ -214,7 +214,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 @app.post("/auth/register")
 async def register(user_data: dict, db: Session = Depends(get_db)):
     """Регистрация нового пользователя"""
-    print(f"Данные регистрации: {user_data}")
+    logger.debug("Регистрация пользователя %s", user_data.get("username"))
     username = user_data.get("username")
     email = user_data.get("email")
     password = user_data.get("password")
@@ -222,7 +222,7 @@ async def register(user_data: dict, db: Session = Depends(get_db)):
     last_name = user_data.get("last_name", "Lastname")
     
     # Проверяем, существует ли пользователь
-    if db.query(User).filter(User.username == username).first():
+    if get_user_by_username(db, username):
         return JSONResponse(
             status_code=400,
             content={"detail": "Пользователь уже существует"}
@@ -253,7 +253,7 @@ async def get_current_user(authorization: str = Header(None), db: Session = Depe
     
     # Извлекаем username из токена
     username = token.replace("demo_token_", "")
-    user = db.query(User).filter(User.username == username).first()
+    user = get_user_by_username(db, username)
     if user:
         return {
             "username": user.username,
@@ -266,7 +266,10 @@ async def get_current_user(authorization: str = Header(None), db: Session = Depe
 @app.get("/demo/populate")
 async def populate_demo_data(db: Session = Depends(get_db)):
     """Загрузить демо данные"""
+    from app.seed import init_db
     init_db()
+    response_cache.clear()
+    count_cache.clear()
     user_count = db.query(User).count()
     return {
         "message": "Демо данные загружены",
@@ -277,7 +280,7 @@ async def populate_demo_data(db: Session = Depends(get_db)):
 
 # ИСПРАВЛЕННЫЕ ЭНДПОИНТЫ ДЛЯ БИЛЕТОВ
 @app.get("/tickets/my")
-async def get_my_tickets(authorization: str = Header(None), db: Session = Depends(get_db)):
+async def get_my_tickets(authorization: str = Header(None), db: AsyncSession = Depends(get_async_db)):
     """Получить мои билеты"""
     if not authorization:
         return JSONResponse(
@@ -294,19 +297,17 @@ async def get_my_tickets(authorization: str = Header(None), db: Session = Depend
         )
     
     username = token.replace("demo_token_", "")
-    user = db.query(User).filter(User.username == username).first()
+    user = await get_user_by_username_async(db, username)
     if not user:
         return JSONResponse(
             status_code=401,
             content={"detail": "Недействительный токен"}
         )
     
-    tickets = db.query(Ticket).filter(Ticket.user_id == user.id).all()
+    # Билеты с сеансом, фильмом и залом - одним запросом с JOIN
+    tickets = await get_user_tickets_async(db, user.id)
     result = []
     for ticket in tickets:
-        session = db.query(Session).filter(Session.id == ticket.session_id).first()
-        movie = db.query(Movie).filter(Movie.id == session.movie_id).first()
-        hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
         result.append({
             "id": ticket.id,
             "session_id": ticket.session_id,
@@ -323,13 +324,14 @@ async def get_my_tickets(authorization: str = Header(None), db: Session = Depend
             "is_paid": ticket.is_paid,
             "is_confirmed": ticket.is_paid,
             "session": {
-                "id": session.id,
-                "movie": {"title": movie.title, "id": movie.id},
-                "hall": {"name": hall.name, "id": hall.id},
-                "start_time": session.start_time.isoformat()
+                "id": ticket.session_id,
+                "movie": {"title": ticket.movie_title, "id": ticket.movie_id},
+                "hall": {"name": ticket.hall_name, "id": ticket.hall_id},
+                "start_time": ticket.start_time.isoformat()
             }
         })
-    return result
+    # Значения уже JSON-типов: без jsonable_encoder
+    return JSONResponse(result)
 
 # Функция для извлечения username из токена (заглушка, в реальном приложении нужно проверять токен)
 def get_username_from_token(token: str) -> str:
@@ -339,131 +341,90 @@ def get_username_from_token(token: str) -> str:
     }
     return token_to_user.get(token, "unknown_user")
 
-@app.post("/tickets")
-async def create_ticket(ticket_data: dict, authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Создать новый билет (бронирование) - УЛУЧШЕННАЯ ВЕРСИЯ С ПОДРОБНОСТЯМИ"""
-    print("Начало обработки запроса /tickets")
+async def booking_user(authorization: str, db: AsyncSession):
+    """Пользователь запроса бронирования по demo токену и его username"""
     if not authorization:
-        print("Ошибка: Токен не предоставлен")
         raise HTTPException(status_code=401, detail="Токен не предоставлен")
     
     # Извлекаем токен из заголовка
     try:
         token = authorization.split(" ")[1] if authorization.startswith("Bearer ") else authorization
-        print(f"Токен извлечен: {token}")
     except:
-        print("Ошибка: Неверный формат токена")
         raise HTTPException(status_code=401, detail="Неверный формат токена")
     
     # Извлекаем username из токена
     username = token.replace("demo_token_", "")
-    print(f"Username извлечен из токена: {username}")
     
     # Проверяем пользователя в базе
-    user = db.query(User).filter(User.username == username).first()
+    user = await get_user_by_username_async(db, username)
     if not user:
-        print(f"Ошибка: Пользователь {username} не найден")
+        logger.debug("Бронирование: пользователь %s не найден", username)
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    print(f"Пользователь найден: {username}, ID: {user.id}")
+    return user, username
+
+async def staff_user(authorization: str, db: AsyncSession):
+    """Сотрудник кинотеатра (админ или менеджер) по demo токену"""
+    user, username = await booking_user(authorization, db)
+    if user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+    return user
+
+async def prepare_booking(ticket_data: dict, authorization: str, db: AsyncSession):
+    """Пользователь, сеанс, зал и места запроса бронирования после всех проверок"""
+    user, username = await booking_user(authorization, db)
     
     # Проверяем наличие данных о бронировании
     session_id = ticket_data.get("session_id")
     seat_numbers = ticket_data.get("seat_numbers", [])
-    total_price = ticket_data.get("total_price")
     
     if not session_id or not seat_numbers:
-        print("Ошибка: Не указан session_id или seat_numbers")
         raise HTTPException(status_code=400, detail="Не указан session_id или seat_numbers")
-    print(f"Данные бронирования: session_id={session_id}, seat_numbers={seat_numbers}, total_price={total_price}")
+    check_seat_numbers(seat_numbers)
+    logger.debug("Бронирование: пользователь %s, сеанс %s, места %s", user.id, session_id, tuple(seat_numbers))
     
     # Проверяем существование сеанса
-    session = db.query(Session).filter(Session.id == session_id).first()
+    session = await get_session_async(db, session_id)
     if not session:
-        print(f"Ошибка: Сеанс {session_id} не найден")
         raise HTTPException(status_code=404, detail="Сеанс не найден")
-    print(f"Сеанс найден: {session_id}")
     
     # Проверяем зал
-    hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
+    hall = await get_hall_async(db, session.hall_id)
     if not hall:
-        print(f"Ошибка: Зал для сеанса {session_id} не найден")
         raise HTTPException(status_code=404, detail="Зал не найден")
-    print(f"Зал найден: {hall.name}, всего мест: {hall.total_seats}")
-    
-    # Проверяем доступность мест
-    if session.available_seats < len(seat_numbers):
-        print(f"Ошибка: Недостаточно свободных мест. Доступно: {session.available_seats}, запрошено: {len(seat_numbers)}")
-        raise HTTPException(status_code=400, detail=f"Недостаточно свободных мест. Доступно: {session.available_seats}")
-    print(f"Свободных мест достаточно: {session.available_seats}")
-    
-    # Проверяем, не заняты ли места
-    existing_tickets = db.query(Ticket).filter(Ticket.session_id == session_id, Ticket.seat_number.in_(seat_numbers)).all()
-    if existing_tickets:
-        occupied_seats = [ticket.seat_number for ticket in existing_tickets]
-        print(f"Ошибка: Места уже заняты: {occupied_seats}")
-        raise HTTPException(status_code=400, detail=f"Места уже заняты: {occupied_seats}")
-    print("Все указанные места свободны")
-    
-    # Проверяем фильм
-    movie = db.query(Movie).filter(Movie.id == session.movie_id).first()
-    if movie:
-        print(f"Фильм: {movie.title}, Зал: {hall.name}")
-    
-    # Создаем билеты
-    import uuid
-    tickets = []
-    base_price_per_seat = float(session.base_price) / len(seat_numbers) if total_price is None else float(total_price) / len(seat_numbers)
-    
-    # Получаем конфигурацию зала для правильного расчета рядов
-    seats_per_row = 10  # По умолчанию 10 мест в ряду
-    if hasattr(hall, 'seats_per_row') and hall.seats_per_row:
-        seats_per_row = hall.seats_per_row
-    else:
-        # Вычисляем seats_per_row на основе общего количества мест и рядов
-        total_seats = hall.total_seats
-        estimated_rows = max(1, int((total_seats / 10) + 0.5))  # Примерно 10 мест в ряду
-        seats_per_row = max(1, total_seats // estimated_rows)
-    
-    for seat_number in seat_numbers:
-        # Вычисляем ряд на основе номера места
-        seat_row = ((seat_number - 1) // seats_per_row) + 1
-        seat_in_row = ((seat_number - 1) % seats_per_row) + 1
-        
-        # Определяем тип места и цену (упрощенная логика)
-        seat_type = "standard"
-        seat_price = base_price_per_seat
-        # Проверяем, является ли место VIP или премиум на основе количества мест (примерная логика)
-        if seat_number <= hall.vip_seats:
-            seat_type = "vip"
-            seat_price = float(session.vip_price) if session.vip_price else base_price_per_seat * 1.5
-        elif seat_number <= (hall.vip_seats + hall.premium_seats):
-            seat_type = "premium"
-            seat_price = float(session.premium_price) if session.premium_price else base_price_per_seat * 1.2
-        
-        ticket = Ticket(
-            user_id=user.id,
-            session_id=session_id,
-            seat_row=seat_row,  # Правильно вычисленный ряд
-            seat_number=seat_number,
-            seat_type=seat_type,
-            price=seat_price,
-            final_price=seat_price,
-            booking_reference=str(uuid.uuid4())[:8].upper(),
-            status="booked",
-            is_paid=False
-        )
-        db.add(ticket)
-        tickets.append(ticket)
-        print(f"Билет создан: ряд {seat_row}, место {seat_number} (в ряду: {seat_in_row}), тип {seat_type}, цена {seat_price}")
     
-    # Обновляем количество доступных мест в сеансе
-    session.available_seats -= len(seat_numbers)
-    session.reserved_tickets += len(seat_numbers)
-    if session.available_seats == 0:
-        session.is_sold_out = True
+    # Номера мест без повторов, есть в схеме зала и продаются
+    validate_seats(seat_numbers, hall_layouts.for_hall(hall))
     
-    db.commit()
-    print(f"Сеанс обновлен: доступно мест {session.available_seats}, зарезервировано билетов {session.reserved_tickets}")
+    # Быстрый отказ по счётчику и карте мест в памяти (см. app/seat_inventory.py);
+    # окончательно места проверяет транзакция бронирования
+    if session.available_seats < len(seat_numbers):
+        raise HTTPException(status_code=409, detail=f"Недостаточно свободных мест. Доступно: {session.available_seats}")
+    seat_map = await seat_inventory.get_async(db, session_id)
+    occupied_seats = seat_map.taken_among(seat_numbers)
+    if occupied_seats:
+        logger.debug("Бронирование: места %s сеанса %s уже заняты", tuple(occupied_seats), session_id)
+        raise HTTPException(status_code=409, detail=f"Места уже заняты: {occupied_seats}")
+    
+    return user, username, session, hall, seat_numbers
+
+@app.post("/tickets")
+async def create_ticket(ticket_data: dict, authorization: str = Header(None),
+                        admission_token: str = Header(None, alias=ADMISSION_HEADER),
+                        db: AsyncSession = Depends(get_async_db)):
+    """Создать новый билет (бронирование) - УЛУЧШЕННАЯ ВЕРСИЯ С ПОДРОБНОСТЯМИ"""
+    user, username, session, hall, seat_numbers = await prepare_booking(ticket_data, authorization, db)
+    session_id = session.id
+    tickets = build_tickets(user.id, session, hall, seat_numbers, ticket_data.get("total_price"))
+    
+    # Билеты и счётчики сеанса сохраняются одной атомарной транзакцией (app/booking.py);
+    # в режиме SQLite - через очередь единственного писателя. Одновременных транзакций
+    # не больше слотов виртуальной очереди (app/waiting_room.py), иначе 429
+    async with waiting_room.booking_slot(session_id, hall.cinema_id, admission_token):
+        available_seats = await write_queue.submit(lambda wdb: book_seats_async(wdb, session_id, tickets))
+    logger.info(
+        "Билеты забронированы",
+        extra={"user_id": user.id, "session_id": session_id, "seats": len(tickets), "available_seats": available_seats},
+    )
     
     return {
         "message": f"Билеты успешно забронированы для {username}",
@@ -471,6 +432,223 @@ async def create_ticket(ticket_data: dict, authorization: str = Header(None), db
         "booking_references": [ticket.booking_reference for ticket in tickets]
     }
 
+@app.post("/tickets/hold")
+async def hold_tickets(ticket_data: dict, authorization: str = Header(None),
+                       admission_token: str = Header(None, alias=ADMISSION_HEADER),
+                       db: AsyncSession = Depends(get_async_db)):
+    """
+    Временная бронь мест на hold_minutes минут (по умолчанию SEAT_HOLD_MINUTES).
+    
+    Места заняты до оплаты (PATCH /tickets/{id}/pay); неоплаченную бронь
+    после истечения срока снимает фоновая задача (app/holds.py).
+    """
+    user, username, session, hall, seat_numbers = await prepare_booking(ticket_data, authorization, db)
+    session_id = session.id
+    hold_expires_at = hold_deadline(ticket_data.get("hold_minutes"))
+    tickets = build_tickets(user.id, session, hall, seat_numbers, ticket_data.get("total_price"), status="reserved")
+    for ticket in tickets:
+        ticket.hold_expires_at = hold_expires_at
+    
+    async with waiting_room.booking_slot(session_id, hall.cinema_id, admission_token):
+        available_seats = await write_queue.submit(lambda wdb: book_seats_async(wdb, session_id, tickets))
+    logger.info(
+        "Места временно забронированы",
+        extra={"user_id": user.id, "session_id": session_id, "seats": len(tickets), "available_seats": available_seats},
+    )
+    
+    return {
+        "message": f"Места временно забронированы для {username}",
+        "ticket_ids": [ticket.id for ticket in tickets],
+        "booking_references": [ticket.booking_reference for ticket in tickets],
+        "hold_expires_at": hold_expires_at.isoformat()
+    }
+
+@app.post("/sessions/{session_id}/best-available")
+async def best_available_seats(session_id: int, request_data: dict = None, authorization: str = Header(None),
+                               admission_token: str = Header(None, alias=ADMISSION_HEADER),
+                               db: AsyncSession = Depends(get_async_db)):
+    """
+    Подобрать лучшие count мест рядом (app/best_available.py).
+    
+    Тело: {"count": 2, "seat_type": "vip", "hold": false, "hold_minutes": 15}.
+    С hold=true места сразу временно бронируются на пользователя токена
+    (как POST /tickets/hold); если их успели занять, подбор повторяется.
+    """
+    request_data = request_data or {}
+    count = request_data.get("count", 2)
+    seat_type = request_data.get("seat_type")
+    hold = bool(request_data.get("hold"))
+    if not isinstance(count, int) or not 1 <= count <= BEST_AVAILABLE_MAX_SEATS:
+        raise HTTPException(status_code=400, detail=f"count должен быть от 1 до {BEST_AVAILABLE_MAX_SEATS}")
+    if seat_type is not None and seat_type not in SEAT_TYPES:
+        raise HTTPException(status_code=400, detail=f"seat_type: одно из {list(SEAT_TYPES)}")
+    if hold:
+        user, username = await booking_user(authorization, db)
+        hold_expires_at = hold_deadline(request_data.get("hold_minutes"))
+    
+    session = await get_session_async(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Сеанс не найден")
+    hall = await get_hall_async(db, session.hall_id)
+    layout = hall_layouts.for_hall(hall)
+    
+    if not hold:
+        best = find_best_seats(layout, await seat_inventory.get_async(db, session_id), count, seat_type)
+        if best is None:
+            raise HTTPException(status_code=409, detail=f"Нет {count} свободных мест рядом")
+        return {"session_id": session_id, "seats": best.seats, "row": best.row, "seat_type": best.seat_type}
+    
+    # Подбор и бронь под блокировкой сеанса: параллельные запросы не выбирают одни и те же места
+    async with waiting_room.booking_slot(session_id, hall.cinema_id, admission_token), hold_lock(session_id):
+        for _ in range(HOLD_ATTEMPTS):
+            seat_map = await seat_inventory.get_async(db, session_id)
+            best = find_best_seats(layout, seat_map, count, seat_type)
+            if best is None:
+                raise HTTPException(status_code=409, detail=f"Нет {count} свободных мест рядом")
+            tickets = build_tickets(user.id, session, hall, best.seats, status="reserved")
+            for ticket in tickets:
+                ticket.hold_expires_at = hold_expires_at
+            try:
+                await write_queue.submit(lambda wdb: book_seats_async(wdb, session_id, tickets))
+            except HTTPException as exc:
+                # Места заняли в другом процессе: карта мест уже сброшена, подбираем заново
+                if exc.status_code != 409:
+                    raise
+                continue
+            return {
+                "session_id": session_id,
+                "seats": best.seats,
+                "row": best.row,
+                "seat_type": best.seat_type,
+                "ticket_ids": [ticket.id for ticket in tickets],
+                "booking_references": [ticket.booking_reference for ticket in tickets],
+                "hold_expires_at": hold_expires_at.isoformat()
+            }
+    raise HTTPException(status_code=409, detail="Места заняты другими покупателями, попробуйте ещё раз")
+
+@app.post("/sessions/{session_id}/waiting-room")
+async def join_waiting_room(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Встать в виртуальную очередь на бронирование сеанса (app/waiting_room.py).
+    
+    Ответ - позиция и оценка ожидания либо сразу пропуск (status=admitted);
+    пропуск передаётся при бронировании в заголовке X-Admission-Token.
+    """
+    session = await get_session_async(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Сеанс не найден")
+    hall = await get_hall_async(db, session.hall_id)
+    waiter = waiting_room.join(session_id, hall.cinema_id)
+    return waiting_room.status(waiter.id, session_id)
+
+@app.get("/sessions/{session_id}/waiting-room/{waiter_id}")
+async def waiting_room_status(session_id: int, waiter_id: str):
+    """Позиция в очереди и оценка ожидания; после допуска - пропуск"""
+    status = waiting_room.status(waiter_id, session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Нет в очереди: время ожидания или пропуска истекло")
+    return status
+
+@app.post("/sessions/{session_id}/check-in")
+async def check_in_ticket(session_id: int, scan_data: dict, authorization: str = Header(None),
+                          db: AsyncSession = Depends(get_async_db)):
+    """
+    Проверить билет на входе в зал (app/checkin.py): {"booking_reference": "AB12CD34"}.
+    
+    Проверка - по индексу билетов сеанса в памяти, отметка прохода пишется в БД
+    фоном пачками. Отказ - detail.result: not_found (404), not_paid (402),
+    wrong_session, already_used, cancelled (409).
+    """
+    await staff_user(authorization, db)
+    reference = scan_data.get("booking_reference")
+    if not isinstance(reference, str) or not reference.strip():
+        raise HTTPException(status_code=400, detail="Не указан booking_reference")
+    return await checkin.scan(session_id, reference.strip().upper())
+
+@app.get("/sessions/{session_id}/check-in")
+async def check_in_status(session_id: int, authorization: str = Header(None),
+                          db: AsyncSession = Depends(get_async_db)):
+    """Билетов сеанса и прошедших в зал по индексу check-in"""
+    await staff_user(authorization, db)
+    stats = checkin.session_stats(session_id)
+    if stats is None:
+        await checkin.load(session_id)
+        stats = checkin.session_stats(session_id)
+    return stats
+
+@app.post("/tickets/batch")
+async def create_tickets_batch(batch_data: dict, authorization: str = Header(None),
+                               admission_token: str = Header(None, alias=ADMISSION_HEADER),
+                               db: AsyncSession = Depends(get_async_db)):
+    """
+    Групповое бронирование мест на несколько сеансов одной транзакцией.
+    
+    Тело: {"bookings": [{"session_id": 1, "seat_numbers": [1, 2]}, ...]}.
+    Сеансы, залы и занятость мест проверяются общими запросами на всю группу;
+    если хотя бы одно место недоступно, не бронируется ничего.
+    """
+    user, username = await booking_user(authorization, db)
+    
+    bookings = batch_data.get("bookings")
+    if not bookings or not isinstance(bookings, list):
+        raise HTTPException(status_code=400, detail="Не указан список bookings")
+    
+    # Места по сеансам; повторный сеанс в списке дополняет места
+    seats_by_session = {}
+    for booking in bookings:
+        session_id = booking.get("session_id")
+        seat_numbers = booking.get("seat_numbers")
+        if not session_id or not seat_numbers:
+            raise HTTPException(status_code=400, detail="Не указан session_id или seat_numbers")
+        seats_by_session.setdefault(session_id, []).extend(check_seat_numbers(seat_numbers))
+    total_seats = sum(len(seats) for seats in seats_by_session.values())
+    if total_seats > BATCH_BOOKING_MAX_SEATS:
+        raise HTTPException(status_code=400, detail=f"Не больше {BATCH_BOOKING_MAX_SEATS} мест за одно бронирование")
+    
+    sessions = await get_sessions_with_halls_async(db, seats_by_session)
+    missing = [session_id for session_id in seats_by_session if session_id not in sessions]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Сеансы не найдены: {missing}")
+    for session_id, seat_numbers in seats_by_session.items():
+        session, hall = sessions[session_id]
+        validate_seats(seat_numbers, hall_layouts.for_hall(hall))
+        if session.available_seats < len(seat_numbers):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Сеанс {session_id}: недостаточно свободных мест. Доступно: {session.available_seats}"
+            )
+    
+    taken = await find_taken_seats_async(db, seats_by_session)
+    if taken:
+        raise HTTPException(status_code=409, detail={"message": "Места уже заняты", "taken": taken})
+    
+    tickets_by_session = {
+        session_id: build_tickets(user.id, *sessions[session_id], seat_numbers)
+        for session_id, seat_numbers in seats_by_session.items()
+    }
+    # Слот виртуальной очереди на каждый сеанс группы
+    async with AsyncExitStack() as slots:
+        for session_id, (session, hall) in sessions.items():
+            await slots.enter_async_context(waiting_room.booking_slot(session_id, hall.cinema_id, admission_token))
+        await write_queue.submit(lambda wdb: book_batch_async(wdb, tickets_by_session))
+    logger.info(
+        "Групповое бронирование",
+        extra={"user_id": user.id, "sessions": len(tickets_by_session), "seats": total_seats},
+    )
+    
+    return {
+        "message": f"Билеты успешно забронированы для {username}",
+        "total_seats": total_seats,
+        "bookings": [
+            {
+                "session_id": session_id,
+                "ticket_ids": [ticket.id for ticket in tickets],
+                "booking_references": [ticket.booking_reference for ticket in tickets]
+            }
+            for session_id, tickets in tickets_by_session.items()
+        ]
+    }
+
 @app.get("/admin/users")
 async def get_admin_users(authorization: str = Header(None), db: Session = Depends(get_db)):
     """Получить список пользователей (только для админа)"""
@@ -483,7 +661,7 @@ async def get_admin_users(authorization: str = Header(None), db: Session = Depen
         raise HTTPException(status_code=401, detail="Неверный формат токена")
     
     username = token.replace("demo_token_", "")
-    current_user = db.query(User).filter(User.username == username).first()
+    current_user = get_user_by_username(db, username)
     if not current_user or current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
         raise HTTPException(status_code=403, detail="Доступ запрещён")
     
@@ -497,8 +675,18 @@ async def get_admin_users(authorization: str = Header(None), db: Session = Depen
     } for user in users]
 
 @app.get("/admin/tickets")
-async def get_admin_tickets(authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Получить все билеты (для админа)"""
+async def get_admin_tickets(authorization: str = Header(None), cursor: Optional[str] = None, skip: int = Query(0, ge=0),
+                            limit: int = Query(100, ge=1, le=1000), day: Optional[date] = Query(None, alias="date"),
+                            session_id: Optional[int] = None, status: Optional[str] = None,
+                            db: AsyncSession = Depends(get_async_db)):
+    """
+    Билеты для админа постранично, новые первыми.
+
+    Следующая страница - cursor из заголовка X-Next-Cursor (app/pagination.py);
+    skip оставлен для старых клиентов и читает строки до страницы.
+    Фильтры: date - день сеанса, session_id, status. Билет с сеансом, фильмом,
+    залом и владельцем - одна строка одного запроса с JOIN.
+    """
     if not authorization:
         return JSONResponse(
             status_code=401,
@@ -514,22 +702,22 @@ async def get_admin_tickets(authorization: str = Header(None), db: Session = Dep
         )
     
     username = token.replace("demo_token_", "")
-    current_user = db.query(User).filter(User.username == username).first()
+    current_user = await get_user_by_username_async(db, username)
     if not current_user or current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
         return JSONResponse(
             status_code=403,
             content={"detail": "Доступ запрещён"}
         )
     
-    tickets = db.query(Ticket).all()
+    query = ticket_listing_query(day, session_id, status)
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = (await db.execute(TICKETS_KEYSET.apply(query, cursor, limit))).all()
+    tickets, next_cursor = TICKETS_KEYSET.split(rows, limit)
     result = []
-    print(f"🔍 Админ запросил билеты. Найдено: {len(tickets)} билетов")
+    logger.info("Админ %s запросил билеты: %d", username, len(tickets))
     for ticket in tickets:
-        session = db.query(Session).filter(Session.id == ticket.session_id).first()
-        movie = db.query(Movie).filter(Movie.id == session.movie_id).first()
-        hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
-        user = db.query(User).filter(User.id == ticket.user_id).first()
-        print(f"   - Билет #{ticket.id}: {user.username} → {movie.title}, место {ticket.seat_number}")
+        logger.debug("Билет #%s: %s -> %s, место %s", ticket.id, ticket.username, ticket.movie_title, ticket.seat_number)
         result.append({
             "id": ticket.id,
             "session_id": ticket.session_id,
@@ -538,33 +726,34 @@ async def get_admin_tickets(authorization: str = Header(None), db: Session = Dep
             "row_number": ticket.seat_row,
             "total_price": float(ticket.final_price),
             "price": float(ticket.price),
-            "user": user.username,
-            "customer_name": user.username,
-            "customer_email": user.email,
+            "user": ticket.username,
+            "customer_name": ticket.username,
+            "customer_email": ticket.email,
             "booking_time": ticket.booking_time.isoformat(),
             "purchase_date": ticket.booking_time.isoformat(),
             "status": ticket.status,
             "is_paid": ticket.is_paid,
             "is_confirmed": ticket.is_paid,
-            "customer_phone": user.phone or "",
+            "customer_phone": ticket.phone or "",
             "session": {
-                "id": session.id,
-                "movie": {"title": movie.title, "id": movie.id},
-                "hall": {"name": hall.name, "id": hall.id},
-                "start_time": session.start_time.isoformat()
+                "id": ticket.session_id,
+                "movie": {"title": ticket.movie_title, "id": ticket.movie_id},
+                "hall": {"name": ticket.hall_name, "id": ticket.hall_id},
+                "start_time": ticket.start_time.isoformat()
             },
-            "movie_title": movie.title,
-            "movie": {"title": movie.title, "id": movie.id},
-            "hall_name": hall.name,
-            "hall": {"name": hall.name, "id": hall.id},
-            "start_time": session.start_time.isoformat(),
+            "movie_title": ticket.movie_title,
+            "movie": {"title": ticket.movie_title, "id": ticket.movie_id},
+            "hall_name": ticket.hall_name,
+            "hall": {"name": ticket.hall_name, "id": ticket.hall_id},
+            "start_time": ticket.start_time.isoformat(),
             "user_info": {
-                "username": user.username,
-                "email": user.email,
-                "role": user.role.value
+                "username": ticket.username,
+                "email": ticket.email,
+                "role": ticket.role.value
             }
         })
-    return result
+    # Значения уже JSON-типов: без jsonable_encoder
+    return JSONResponse(result, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @app.get("/sessions/{session_id}/tickets")
 async def get_tickets_for_session(session_id: int, db: Session = Depends(get_db)):
@@ -579,39 +768,16 @@ async def get_tickets_for_session(session_id: int, db: Session = Depends(get_db)
         "is_paid": ticket.is_paid
     } for ticket in tickets]
 
-@app.post("/admin/update_seat_rows")
-async def update_seat_rows(authorization: str = Header(None), db: Session = Depends(get_db)):
-    """Обновить seat_row для всех существующих билетов"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Токен не предоставлен")
-    
-    try:
-        token = authorization.split(" ")[1] if authorization.startswith("Bearer ") else authorization
-    except:
-        raise HTTPException(status_code=401, detail="Неверный формат токена")
-    
-    username = token.replace("demo_token_", "")
-    user = db.query(User).filter(User.username == username).first()
-    if not user or user.role != UserRole.ADMIN:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
-    
-    tickets = db.query(Ticket).all()
-    updated_count = 0
-    for ticket in tickets:
-        session = db.query(Session).filter(Session.id == ticket.session_id).first()
-        if session:
-            hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
-            if hall:
-                seats_per_row = hall.seats_per_row if hall.seats_per_row else 10
-                new_row = ((ticket.seat_number - 1) // seats_per_row) + 1
-                if ticket.seat_row != new_row:
-                    ticket.seat_row = new_row
-                    updated_count += 1
-    db.commit()
-    return {
-        "message": "Обновление seat_row завершено",
-        "updated_tickets": updated_count
-    }
+# Роутеры подключаются после эндпоинтов main.py: при совпадении пути
+# (например, /tickets/my) работает вариант из main.py
+from app.routers import cinemas, movies, reviews, sessions, tickets
+
+app.include_router(movies.router, prefix="/movies", tags=["Фильмы"])
+app.include_router(sessions.router, prefix="/sessions", tags=["Сеансы"])
+app.include_router(tickets.router, prefix="/tickets", tags=["Билеты"])
+app.include_router(cinemas.router, prefix="/cinemas", tags=["Кинотеатры"])
+app.include_router(reviews.router, prefix="/reviews", tags=["Отзывы"])
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
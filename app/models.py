@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean, Enum, DECIMAL, Time
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Boolean, Enum, DECIMAL, Time, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -121,7 +121,7 @@ class Hall(Base):
     __tablename__ = "halls"
 
     id = Column(Integer, primary_key=True, index=True)
-    cinema_id = Column(Integer, ForeignKey("cinemas.id"), nullable=False)
+    cinema_id = Column(Integer, ForeignKey("cinemas.id"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     hall_number = Column(Integer, nullable=False)
     total_seats = Column(Integer, nullable=False)
@@ -145,6 +145,11 @@ class Hall(Base):
 class Session(Base):
     """Модель сеанса"""
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Расписание фильма и загрузка зала по времени
+        Index("ix_sessions_movie_start", "movie_id", "start_time"),
+        Index("ix_sessions_hall_start", "hall_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
@@ -177,6 +182,21 @@ class Session(Base):
 class Ticket(Base):
     """Модель билета"""
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Одно место на сеансе можно продать только один раз
+        Index("uq_tickets_session_seat", "session_id", "seat_number", unique=True),
+        # История билетов пользователя
+        Index("ix_tickets_user_booking_time", "user_id", "booking_time"),
+        # Админский список билетов: новые первыми, в том числе с фильтром по статусу
+        Index("ix_tickets_booking_time", "booking_time"),
+        Index("ix_tickets_status_booking_time", "status", "booking_time"),
+        # Истекающие брони: частичный индекс только по билетам с hold_expires_at
+        Index(
+            "ix_tickets_hold_expires_at", "hold_expires_at",
+            sqlite_where=text("hold_expires_at IS NOT NULL"),
+            postgresql_where=text("hold_expires_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
@@ -189,11 +209,12 @@ class Ticket(Base):
     final_price = Column(DECIMAL(8, 2), nullable=False)
     booking_reference = Column(String(20), unique=True, nullable=False, index=True)
     status = Column(String(20), default="reserved")  # reserved, paid, cancelled, used
+    hold_expires_at = Column(DateTime)  # срок временной брони (status=reserved), см. app/holds.py
     payment_method = Column(String(50))
     payment_transaction_id = Column(String(255))
     qr_code = Column(String(500))
     is_paid = Column(Boolean, default=False)
-    booking_time = Column(DateTime, default=datetime.utcnow)
+    booking_time = Column(DateTime, default=datetime.utcnow, nullable=False)
     payment_time = Column(DateTime)
     cancellation_time = Column(DateTime)
     used_time = Column(DateTime)
@@ -206,6 +227,10 @@ class Ticket(Base):
 class Review(Base):
     """Модель отзыва о фильме"""
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Лента одобренных отзывов о фильме
+        Index("ix_reviews_movie_approved_created", "movie_id", "is_approved", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
@@ -215,12 +240,41 @@ class Review(Base):
     content = Column(Text)
     is_spoiler = Column(Boolean, default=False)
     is_verified_purchase = Column(Boolean, default=False)
-    helpful_votes = Column(Integer, default=0)
+    helpful_votes = Column(Integer, default=0, nullable=False)
     unhelpful_votes = Column(Integer, default=0)
     is_approved = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Связи
     movie = relationship("Movie", back_populates="reviews")
-    user = relationship("User", back_populates="reviews") 
\ No newline at end of file
+    user = relationship("User", back_populates="reviews") 
+
+class ScheduleEntry(Base):
+    """Строка расписания: сеанс с фильмом, залом и наличием мест (проекция для чтения, см. app/schedule.py)"""
+    __tablename__ = "schedule_entries"
+    __table_args__ = (
+        # Расписание дня: все кинотеатры или один, по времени начала
+        Index("ix_schedule_day_cinema_start", "day", "cinema_id", "start_time"),
+    )
+
+    # Без внешних ключей: проекция перестраивается из sessions, movies и halls
+    session_id = Column(Integer, primary_key=True, autoincrement=False)
+    cinema_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    movie_id = Column(Integer, nullable=False)
+    movie_title = Column(String(255), nullable=False)
+    hall_id = Column(Integer, nullable=False)
+    hall_name = Column(String(100), nullable=False)
+    capacity = Column(Integer, nullable=False)
+    base_price = Column(DECIMAL(8, 2), nullable=False)
+    vip_price = Column(DECIMAL(8, 2))
+    premium_price = Column(DECIMAL(8, 2))
+    available_seats = Column(Integer, nullable=False)
+    is_sold_out = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=True)
+    language = Column(String(50))
+    format_3d = Column(Boolean, default=False)
+    format_imax = Column(Boolean, default=False)
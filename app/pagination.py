@@ -0,0 +1,225 @@
+"""
+Курсорная (keyset) пагинация списков.
+
+OFFSET заставляет БД прочитать и выбросить все строки перед страницей, и
+глубокие страницы становятся тем медленнее, чем дальше от начала. Здесь
+следующая страница продолжается условием по колонкам сортировки:
+
+    WHERE (start_time, id) > (:последний start_time, :последний id)
+    ORDER BY start_time, id LIMIT :limit + 1
+
+- это диапазон по индексу, и страница стоит одинаково на любой глубине. id в
+конце ключа делает порядок однозначным при одинаковых значениях сортировки.
+Колонки ключа не должны быть NULL.
+
+Курсор непрозрачен для клиента: base64 от имени ключа и значений колонок
+последней строки страницы. В ответе - next_cursor (None на последней
+странице), клиент передаёт его параметром cursor. Курсор другого списка или
+другой сортировки отклоняется с 400.
+
+Общее число строк - отдельный COUNT, который на больших таблицах стоит
+дороже самой страницы. Режим count:
+
+- exact - COUNT на каждый запрос;
+- cached - точный COUNT, запомненный на PAGINATION_COUNT_TTL секунд для тех
+  же фильтров (по умолчанию): после изменений total отстаёт не больше TTL;
+- estimate - COUNT не дальше PAGINATION_COUNT_CAP строк: total точный, пока
+  строк меньше порога, иначе total = порог и total_exact = False ("10000+");
+- none - без COUNT, total = None.
+
+Параметры окружения:
+
+    PAGINATION_COUNT_TTL=30
+    PAGINATION_COUNT_CAP=10000
+    PAGINATION_COUNT_CACHE_SIZE=1000
+"""
+
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import os
+import time
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, func, literal_column, select, tuple_
+
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", "30"))
+PAGINATION_COUNT_CAP = int(os.getenv("PAGINATION_COUNT_CAP", "10000"))
+PAGINATION_COUNT_CACHE_SIZE = int(os.getenv("PAGINATION_COUNT_CACHE_SIZE", "1000"))
+
+COUNT_MODES = ("exact", "cached", "estimate", "none")
+COUNT_PATTERN = "^(" + "|".join(COUNT_MODES) + ")$"
+# Заголовок следующей страницы у списков, которые отдаются массивом
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+    total: Optional[int]
+    total_exact: bool
+
+
+def _dump(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load(column, value):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+class Keyset:
+    """
+    Ключ сортировки списка: колонки (последняя - уникальная, обычно id) и
+    направление. name попадает в курсор, чтобы курсор одного списка или
+    сортировки не применялся к другому.
+    """
+
+    def __init__(self, name: str, *columns, descending: bool = False):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self) -> tuple:
+        return tuple(column.desc() if self.descending else column.asc() for column in self.columns)
+
+    def encode(self, values) -> str:
+        raw = json.dumps([self.name, *(_dump(value) for value in values)], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> tuple:
+        try:
+            name, *values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if name != self.name or len(values) != len(self.columns):
+                raise ValueError(name)
+            return tuple(_load(column, value) for column, value in zip(self.columns, values))
+        except (ValueError, TypeError, binascii.Error):
+            raise HTTPException(status_code=400, detail="Недействительный курсор страницы")
+
+    def apply(self, query, cursor: Optional[str], limit: int):
+        """
+        Страница query (ORM Query или select) после cursor: условие по ключу,
+        ORDER BY ключа и LIMIT limit + 1 - лишняя строка показывает, что
+        следующая страница есть.
+        """
+        if cursor:
+            key = tuple_(*self.columns)
+            values = tuple_(*(bindparam(None, value, type_=column.type)
+                              for column, value in zip(self.columns, self.decode(cursor))))
+            query = query.where(key < values if self.descending else key > values)
+        return query.order_by(*self.order_by()).limit(limit + 1)
+
+    def split(self, rows: List[Any], limit: int) -> Tuple[list, Optional[str]]:
+        """Строки страницы без лишней и курсор следующей страницы"""
+        if len(rows) <= limit:
+            return list(rows), None
+        items = list(rows[:limit])
+        last = items[-1]
+        return items, self.encode(getattr(last, column.key) for column in self.columns)
+
+
+class CountCache:
+    """Точные COUNT по тексту запроса и параметрам: TTL и LRU по числу записей"""
+
+    def __init__(self, ttl: float = PAGINATION_COUNT_TTL, max_entries: int = PAGINATION_COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[float, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, total: int):
+        self._entries[key] = (time.monotonic() + self.ttl, total)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+count_cache = CountCache()
+
+
+def _statement(query):
+    # ORM Query -> select
+    return getattr(query, "statement", query)
+
+
+def _count_statement(query, mode: str):
+    # Колонки списка для COUNT не нужны: подзапрос без них не читает строки таблицы
+    statement = _statement(query).order_by(None).with_only_columns(literal_column("1"), maintain_column_froms=True)
+    if mode == "estimate":
+        statement = statement.limit(PAGINATION_COUNT_CAP)
+    return select(func.count()).select_from(statement.subquery())
+
+
+def _cache_key(statement) -> tuple:
+    compiled = statement.compile()
+    return str(compiled), repr(sorted(compiled.params.items()))
+
+
+def _counted(mode: str, total: int) -> Tuple[int, bool]:
+    if mode == "estimate" and total >= PAGINATION_COUNT_CAP:
+        return total, False
+    return total, True
+
+
+def count_rows(db, query, mode: str = "cached") -> Tuple[Optional[int], bool]:
+    """(total, total_exact) списка query без пагинации (синхронная Session)"""
+    if mode == "none":
+        return None, False
+    statement = _count_statement(query, mode)
+    key = _cache_key(statement) if mode == "cached" else None
+    total = count_cache.get(key) if key else None
+    if total is None:
+        total = db.execute(statement).scalar()
+        if key:
+            count_cache.put(key, total)
+    return _counted(mode, total)
+
+
+async def count_rows_async(db, query, mode: str = "cached") -> Tuple[Optional[int], bool]:
+    """(total, total_exact) списка query без пагинации (AsyncSession)"""
+    if mode == "none":
+        return None, False
+    statement = _count_statement(query, mode)
+    key = _cache_key(statement) if mode == "cached" else None
+    total = count_cache.get(key) if key else None
+    if total is None:
+        total = (await db.execute(statement)).scalar()
+        if key:
+            count_cache.put(key, total)
+    return _counted(mode, total)
+
+
+def paginate(db, query, keyset: Keyset, cursor: Optional[str], limit: int, count: str = "cached") -> Page:
+    """Страница ORM Query по ключу keyset и total в режиме count (синхронная Session)"""
+    total, total_exact = count_rows(db, query, count)
+    items, next_cursor = keyset.split(keyset.apply(query, cursor, limit).all(), limit)
+    return Page(items, next_cursor, total, total_exact)
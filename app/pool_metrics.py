@@ -0,0 +1,111 @@
+"""
+Метрики пула соединений.
+
+InstrumentedQueuePool и InstrumentedAsyncPool считают время ожидания
+соединения, overflow-подключения и таймауты, чтобы исчерпание пула было видно
+в /health/db, а не только как необъяснимая задержка ответов.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Накопительные счётчики одного пула"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait_time: float, overflow_created: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            if wait_time > self.wait_time_max:
+                self.wait_time_max = wait_time
+            if overflow_created:
+                self.overflow_events += 1
+
+    def record_timeout(self, wait_time: float):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_time_total += wait_time
+            if wait_time > self.wait_time_max:
+                self.wait_time_max = wait_time
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.overflow_events = 0
+            self.timeouts = 0
+
+    def snapshot(self, pool=None) -> dict:
+        """Текущее состояние пула и накопленные счётчики"""
+        with self._lock:
+            data = {
+                "name": self.name,
+                "checkouts": self.checkouts,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return data
+
+
+class _InstrumentedPoolMixin:
+    """Замер времени получения соединения из QueuePool"""
+
+    stats: PoolStats = None
+
+    def _do_get(self):
+        stats = self.stats
+        if stats is None:
+            return super()._do_get()
+
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            stats.record_timeout(time.perf_counter() - started)
+            logger.warning("Пул соединений %s исчерпан: %s", stats.name, self.status())
+            raise
+        overflow_created = self._overflow > overflow_before and self._overflow > 0
+        stats.record_checkout(time.perf_counter() - started, overflow_created)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул - счётчики переносим в новый
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool с метриками для синхронного движка"""
+
+
+class InstrumentedAsyncPool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool с метриками для асинхронного движка"""
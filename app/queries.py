@@ -0,0 +1,142 @@
+"""
+Готовые операторы для самых частых выборок.
+
+Пользователь по username/id, сеанс, зал и фильм по id запрашиваются почти в
+каждом HTTP запросе. Операторы строятся один раз при импорте с bindparam
+вместо значений: ключ кэша компиляции у неизменяемого оператора запоминается,
+скомпилированный SQL берётся из кэша движка, и на вызове остаётся только
+подставить параметр. Так не нужно собирать select(...).filter(...) и заново
+вычислять ключ кэша на каждый запрос (см. benchmarks/bench_queries.py).
+
+Списки билетов (история пользователя, админский список) собираются одним
+запросом с JOIN сеанса, фильма, зала и владельца вместо запросов на каждый
+билет; число запросов не зависит от длины списка.
+
+Для синхронной Session - get_*, для AsyncSession - get_*_async.
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import bindparam, select
+
+from .models import User, Movie, Hall, Session, Ticket, ScheduleEntry
+from .pagination import Keyset
+
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+USER_BY_ID = select(User).where(User.id == bindparam("id"))
+SESSION_BY_ID = select(Session).where(Session.id == bindparam("id"))
+HALL_BY_ID = select(Hall).where(Hall.id == bindparam("id"))
+MOVIE_BY_ID = select(Movie).where(Movie.id == bindparam("id"))
+# Имена авторов страницы отзывов - одним запросом
+USER_NAMES = select(User.id, User.first_name, User.last_name).where(User.id.in_(bindparam("ids", expanding=True)))
+SESSIONS_WITH_HALLS = (
+    select(Session, Hall)
+    .join(Hall, Hall.id == Session.hall_id)
+    .where(Session.id.in_(bindparam("ids", expanding=True)))
+)
+
+# Билет с сеансом, фильмом и залом - строка списка билетов
+TICKET_LISTING = (
+    select(
+        Ticket.id, Ticket.session_id, Ticket.user_id, Ticket.seat_row, Ticket.seat_number, Ticket.price,
+        Ticket.final_price, Ticket.booking_time, Ticket.status, Ticket.is_paid, Session.start_time,
+        Movie.id.label("movie_id"), Movie.title.label("movie_title"),
+        Hall.id.label("hall_id"), Hall.name.label("hall_name"),
+    )
+    .join(Session, Session.id == Ticket.session_id)
+    .join(Movie, Movie.id == Session.movie_id)
+    .join(Hall, Hall.id == Session.hall_id)
+)
+# Билеты новые первыми; ключ курсорных страниц списков билетов (app/pagination.py)
+TICKETS_KEYSET = Keyset("tickets", Ticket.booking_time, Ticket.id, descending=True)
+TICKETS_BY_USER = TICKET_LISTING.where(Ticket.user_id == bindparam("user_id")).order_by(*TICKETS_KEYSET.order_by())
+# То же с владельцем билета (админский список)
+TICKET_LISTING_WITH_USERS = (
+    TICKET_LISTING
+    .add_columns(User.username, User.email, User.phone, User.role)
+    .join(User, User.id == Ticket.user_id)
+)
+
+
+def get_user_by_username(db, username: str):
+    return db.execute(USER_BY_USERNAME, {"username": username}).scalars().first()
+
+
+def get_user(db, user_id: int):
+    return db.execute(USER_BY_ID, {"id": user_id}).scalars().first()
+
+
+def get_session(db, session_id: int):
+    return db.execute(SESSION_BY_ID, {"id": session_id}).scalars().first()
+
+
+def get_hall(db, hall_id: int):
+    return db.execute(HALL_BY_ID, {"id": hall_id}).scalars().first()
+
+
+def get_movie(db, movie_id: int):
+    return db.execute(MOVIE_BY_ID, {"id": movie_id}).scalars().first()
+
+
+def ticket_listing_query(day: Optional[date] = None, session_id: Optional[int] = None, status: Optional[str] = None):
+    """
+    Админский список билетов с фильтрами; порядок и страницу задаёт TICKETS_KEYSET.
+
+    day - день сеанса (сеансы дня берутся по индексу проекции расписания),
+    session_id и status - фильтры по билету.
+    """
+    query = TICKET_LISTING_WITH_USERS
+    if day is not None:
+        query = query.where(Ticket.session_id.in_(select(ScheduleEntry.session_id).where(ScheduleEntry.day == day)))
+    if session_id is not None:
+        query = query.where(Ticket.session_id == session_id)
+    if status is not None:
+        query = query.where(Ticket.status == status)
+    return query
+
+
+def get_user_tickets(db, user_id: int):
+    """Билеты пользователя с сеансом, фильмом и залом, новые первыми"""
+    return db.execute(TICKETS_BY_USER, {"user_id": user_id}).all()
+
+
+def get_sessions_with_halls(db, session_ids) -> dict:
+    """{session_id: (сеанс, зал)} одним запросом"""
+    rows = db.execute(SESSIONS_WITH_HALLS, {"ids": list(session_ids)}).all()
+    return {session.id: (session, hall) for session, hall in rows}
+
+
+def get_user_names(db, user_ids) -> dict:
+    """{user_id: "Имя Фамилия"} одним запросом"""
+    rows = db.execute(USER_NAMES, {"ids": list(set(user_ids))}).all()
+    return {user_id: f"{first_name} {last_name}" for user_id, first_name, last_name in rows}
+
+
+async def get_user_by_username_async(db, username: str):
+    return (await db.execute(USER_BY_USERNAME, {"username": username})).scalars().first()
+
+
+async def get_user_async(db, user_id: int):
+    return (await db.execute(USER_BY_ID, {"id": user_id})).scalars().first()
+
+
+async def get_session_async(db, session_id: int):
+    return (await db.execute(SESSION_BY_ID, {"id": session_id})).scalars().first()
+
+
+async def get_hall_async(db, hall_id: int):
+    return (await db.execute(HALL_BY_ID, {"id": hall_id})).scalars().first()
+
+
+async def get_movie_async(db, movie_id: int):
+    return (await db.execute(MOVIE_BY_ID, {"id": movie_id})).scalars().first()
+
+
+async def get_sessions_with_halls_async(db, session_ids) -> dict:
+    rows = (await db.execute(SESSIONS_WITH_HALLS, {"ids": list(session_ids)})).all()
+    return {session.id: (session, hall) for session, hall in rows}
+
+
+async def get_user_tickets_async(db, user_id: int):
+    return (await db.execute(TICKETS_BY_USER, {"user_id": user_id})).all()
@@ -0,0 +1,178 @@
+"""
+Инструментирование SQL запросов.
+
+QueryStatsMiddleware считает количество запросов и суммарное время БД на
+каждый HTTP запрос, отдаёт их в заголовках X-DB-Query-Count / X-DB-Time-Ms,
+пишет в лог и помечает повторяющиеся запросы одной формы как вероятный N+1.
+
+Для регрессионных тестов есть query_budget() и assert_query_budget().
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Сколько одинаковых запросов за один HTTP запрос считать признаком N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: литералы заменены на ?, пробелы схлопнуты"""
+    return _WHITESPACE.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+
+def short_shape(shape: str, limit: int = 240) -> str:
+    """Сокращение длинного запроса: начало списка колонок и FROM/WHERE целиком"""
+    if len(shape) <= limit:
+        return shape
+    head = limit // 3
+    return f"{shape[:head]} ... {shape[-(limit - head):]}"
+
+
+class QueryStats:
+    """Статистика SQL запросов в рамках одного HTTP запроса (или блока кода)"""
+
+    def __init__(self, parent: "QueryStats" = None):
+        self.parent = parent
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        stats = self
+        shape = statement_shape(statement)
+        while stats is not None:
+            stats.count += 1
+            stats.total_time += duration
+            stats.shapes[shape] += 1
+            stats = stats.parent
+
+    @property
+    def total_time_ms(self) -> float:
+        return round(self.total_time * 1000, 3)
+
+    def repeated(self, threshold: int = None) -> list:
+        """Формы запросов, повторившиеся threshold раз и более"""
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_stats: ContextVar = ContextVar("query_stats", default=None)
+
+
+def current_query_stats():
+    """Статистика текущего запроса (None вне QueryStatsMiddleware/query_budget)"""
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Подключить подсчёт запросов к движку (для AsyncEngine - к sync_engine)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: заголовки, лог и детектор N+1 для каждого HTTP запроса"""
+
+    def __init__(self, app, threshold: int = None):
+        self.app = app
+        self.threshold = threshold or N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=_current_stats.get())
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", str(stats.total_time_ms).encode()))
+                repeated = stats.repeated(self.threshold)
+                if repeated:
+                    headers.append((b"x-db-n-plus-one", str(len(repeated)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats, time.perf_counter() - started)
+
+    def _report(self, scope, stats: QueryStats, elapsed: float):
+        path = scope.get("path", "")
+        method = scope.get("method", "")
+        logger.info(
+            "%s %s: %d SQL запросов, БД %.1f мс, всего %.1f мс",
+            method, path, stats.count, stats.total_time * 1000, elapsed * 1000,
+        )
+        for shape, count in stats.repeated(self.threshold):
+            logger.warning("Вероятный N+1 в %s %s: %d раз выполнен запрос %s", method, path, count, short_shape(shape))
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт выполнил больше SQL запросов, чем разрешено бюджетом"""
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """
+    Проверка бюджета запросов для блока кода.
+
+    Работает, когда приложение вызывается в той же задаче asyncio
+    (например, httpx.AsyncClient + ASGITransport):
+
+        with query_budget(3):
+            await client.get("/sessions")
+    """
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+    if stats.count > max_queries:
+        repeated = "; ".join(f"{count}x {short_shape(shape, 160)}" for shape, count in stats.repeated())
+        raise QueryBudgetExceeded(
+            f"Выполнено {stats.count} SQL запросов при бюджете {max_queries}"
+            + (f". Повторы: {repeated}" if repeated else "")
+        )
+
+
+def assert_query_budget(response, max_queries: int):
+    """Проверка бюджета по заголовку X-DB-Query-Count ответа (для TestClient)"""
+    count = int(response.headers["x-db-query-count"])
+    if count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{response.request.method} {response.request.url.path}: "
+            f"выполнено {count} SQL запросов при бюджете {max_queries}"
+        )
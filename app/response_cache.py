@@ -0,0 +1,342 @@
+"""
+Кэш ответов каталога в памяти процесса.
+
+Фильмы, кинотеатры, залы и расписание меняются несколько раз в день, а
+читаются постоянно. Ответы GET из CACHED_ROUTES (только 200) сохраняются по
+пути и отсортированным параметрам запроса и отдаются без выполнения
+обработчика - без запросов к БД и сериализации - с заголовком X-Cache: HIT.
+
+Инвалидация точная, по тегам: у каждого маршрута свои теги (список фильмов -
+"movies", фильм 5 - "movie:5", залы кинотеатра 2 - "halls:2"), обработчики
+создания, изменения и удаления в app/routers/movies.py, sessions.py и
+cinemas.py после commit вызывают response_cache.invalidate(<теги>). Ответ,
+который считался во время инвалидации своего тега, не сохраняется: версии
+тегов запоминаются до вызова обработчика и сверяются перед записью.
+
+Списки сеансов показывают наличие мест, которое меняется с каждым
+бронированием, поэтому они хранятся RESPONSE_CACHE_LIVE_TTL секунд: наличие
+в списке отстаёт не больше чем на это время, места окончательно проверяет
+транзакция бронирования (app/booking.py).
+
+Размер ограничен: не больше RESPONSE_CACHE_MAX_ENTRIES ответов и
+RESPONSE_CACHE_MAX_BYTES байт тел (вытесняются давно не читанные, LRU), ответы
+больше RESPONSE_CACHE_MAX_ENTRY_BYTES не кэшируются. При нескольких воркерах
+у каждого процесса свой кэш: изменение, сделанное через другой процесс,
+становится видно не позже чем через RESPONSE_CACHE_TTL секунд.
+
+Условный GET: у каждого ответа сильный ETag (хэш тела) и Cache-Control:
+no-cache - клиент хранит ответ и каждый раз сверяет его. Запрос с
+If-None-Match, совпавшим с ETag ответа из кэша, получает 304 без выполнения
+обработчика и без тела; при промахе ETag считается по телу, которое сразу
+кэшируется. При выключенном кэше ETag и 304 тоже работают, но ответ
+каждый раз считается заново. ETag зависит только от содержимого, поэтому
+одинаков во всех воркерах и после перезапуска.
+
+Одновременные промахи по одному ключу не идут в БД все сразу: первый запрос
+считает ответ, остальные ждут его (до RESPONSE_CACHE_WAIT_TIMEOUT секунд) и
+получают ответ из кэша.
+
+Параметры окружения:
+
+    RESPONSE_CACHE_TTL=300                # секунды, 0 - кэш выключен
+    RESPONSE_CACHE_LIVE_TTL=5             # секунды для ответов с наличием мест
+    RESPONSE_CACHE_MAX_ENTRIES=10000
+    RESPONSE_CACHE_MAX_BYTES=67108864     # 64 МБ
+    RESPONSE_CACHE_MAX_ENTRY_BYTES=1048576
+    RESPONSE_CACHE_WAIT_TIMEOUT=30        # ожидание одновременного промаха по тому же ключу
+"""
+
+import asyncio
+from collections import OrderedDict, defaultdict
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, NamedTuple, Optional, Pattern, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_LIVE_TTL = float(os.getenv("RESPONSE_CACHE_LIVE_TTL", "5"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+RESPONSE_CACHE_WAIT_TIMEOUT = float(os.getenv("RESPONSE_CACHE_WAIT_TIMEOUT", "30"))
+
+HEADER = b"x-cache"
+CACHE_CONTROL = b"no-cache"
+
+
+class CachedRoute(NamedTuple):
+    """Кэшируемый маршрут: теги - str.format по группам шаблона пути"""
+    pattern: Pattern
+    tags: Tuple[str, ...]
+    live: bool = False
+
+
+# /movies и /sessions - демо эндпоинты main.py, со слэшем - роутеры
+CACHED_ROUTES = (
+    CachedRoute(re.compile(r"^/movies/?$"), ("movies",)),
+    CachedRoute(re.compile(r"^/movies/(\d+)$"), ("movie:{0}",)),
+    CachedRoute(re.compile(r"^/movies/(\d+)/sessions$"), ("movie:{0}", "sessions"), live=True),
+    CachedRoute(re.compile(r"^/cinemas/?$"), ("cinemas",)),
+    CachedRoute(re.compile(r"^/cinemas/(\d+)$"), ("cinemas",)),
+    CachedRoute(re.compile(r"^/cinemas/(\d+)/halls$"), ("halls:{0}",)),
+    CachedRoute(re.compile(r"^/sessions/?$"), ("sessions",), live=True),
+    CachedRoute(re.compile(r"^/sessions/(\d+)$"), ("sessions",), live=True),
+)
+
+
+def match_route(path: str) -> Optional[Tuple[Tuple[str, ...], bool]]:
+    """Теги и признак live для пути; None - путь не кэшируется"""
+    for route in CACHED_ROUTES:
+        match = route.pattern.match(path)
+        if match is not None:
+            return tuple(tag.format(*match.groups()) for tag in route.tags), route.live
+    return None
+
+
+class CachedResponse:
+    """Тело ответа 200 и теги, по которым он инвалидируется"""
+
+    __slots__ = ("tags", "content_type", "body", "etag", "expires_at")
+
+    def __init__(self, tags: Tuple[str, ...], content_type: bytes, body: bytes, etag: bytes, expires_at: float):
+        self.tags = tags
+        self.content_type = content_type
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Ответы по ключу запроса: TTL, LRU по числу и размеру, инвалидация по тегам"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, live_ttl: float = RESPONSE_CACHE_LIVE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = RESPONSE_CACHE_MAX_ENTRY_BYTES):
+        self.ttl = ttl
+        self.live_ttl = live_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[tuple]] = defaultdict(set)
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._generation = 0
+        self._in_flight: Dict[tuple, asyncio.Event] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _remove(self, key) -> CachedResponse:
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+        return entry
+
+    def get(self, key) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def versions(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        return (self._generation, *(self._versions[tag] for tag in tags))
+
+    def put(self, key, tags: Tuple[str, ...], versions: Tuple[int, ...], live: bool,
+            content_type: bytes, body: bytes, etag: bytes) -> bool:
+        """Сохранить ответ, если его теги не инвалидировались с момента versions"""
+        if versions != self.versions(tags) or len(body) > self.max_entry_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        ttl = min(self.ttl, self.live_ttl) if live else self.ttl
+        self._entries[key] = CachedResponse(tags, content_type, body, etag, time.monotonic() + ttl)
+        self.bytes += len(body)
+        for tag in tags:
+            self._keys_by_tag[tag].add(key)
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def in_flight(self, key) -> Optional[asyncio.Event]:
+        return self._in_flight.get(key)
+
+    def begin(self, key) -> asyncio.Event:
+        event = self._in_flight[key] = asyncio.Event()
+        return event
+
+    def finish(self, key):
+        event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def invalidate(self, *tags: str):
+        """Сбросить ответы с любым из тегов (вызывать после commit изменения)"""
+        for tag in tags:
+            self._versions[tag] += 1
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Сбросить все ответы (массовая загрузка данных и т.п.)"""
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key(scope) -> tuple:
+    # Порядок параметров не важен: ?a=1&b=2 и ?b=2&a=1 - один ответ
+    query = scope.get("query_string", b"").decode("latin-1")
+    return scope["path"], urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+
+def make_etag(body: bytes) -> bytes:
+    """Сильный ETag по содержимому ответа"""
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    """If-None-Match со списком тегов или *; сравнение слабое (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+async def _send_response(send, content_type: bytes, body: bytes, etag: bytes, cache_status: bytes,
+                         not_modified: bool, headers=()):
+    # Клиент хранит ответ, но каждый раз сверяет ETag: 304 без тела, если ничего не изменилось
+    headers = [*headers, (b"etag", etag), (b"cache-control", CACHE_CONTROL), (HEADER, cache_status)]
+    if not_modified:
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    headers += [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware: ответы GET каталога из кэша с ETag, промахи сохраняются"""
+
+    def __init__(self, app, cache: ResponseCache = None, wait_timeout: float = RESPONSE_CACHE_WAIT_TIMEOUT):
+        self.app = app
+        self.cache = cache or response_cache
+        self.wait_timeout = wait_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        route = match_route(scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        tags, live = route
+        if_none_match = _header(scope, b"if-none-match")
+        enabled = self.cache.enabled
+
+        key = _cache_key(scope)
+        while enabled:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.hits += 1
+                not_modified = etag_matches(if_none_match, entry.etag)
+                if not_modified:
+                    self.cache.not_modified += 1
+                await _send_response(send, entry.content_type, entry.body, entry.etag, b"HIT", not_modified)
+                return
+            event = self.cache.in_flight(key)
+            if event is None:
+                break
+            # Тот же ответ уже считается: ждём его; если он не попал в кэш - считаем сами
+            try:
+                await asyncio.wait_for(event.wait(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                break
+        if enabled:
+            self.cache.misses += 1
+
+        versions = self.cache.versions(tags)
+        # Ответ 200 собирается целиком: ETag считается по телу и идёт в заголовках
+        response = {"start": None, "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response["start"] = message
+                return
+            if message["type"] == "http.response.body" and response["start"] is not None:
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await finish()
+                return
+            await send(message)
+
+        async def finish():
+            headers = [(name, value) for name, value in response["start"].get("headers", [])
+                       if name not in (b"content-type", b"content-length", b"etag", b"cache-control")]
+            content_type = dict(response["start"].get("headers", [])).get(b"content-type", b"application/json")
+            body = b"".join(response["body"])
+            etag = make_etag(body)
+            not_modified = etag_matches(if_none_match, etag)
+            if not_modified:
+                self.cache.not_modified += 1
+            if enabled:
+                self.cache.put(key, tags, versions, live, content_type, body, etag)
+            await _send_response(send, content_type, body, etag, b"MISS", not_modified, headers)
+
+        leader = enabled and self.cache.in_flight(key) is None
+        if leader:
+            self.cache.begin(key)
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            if leader:
+                self.cache.finish(key)
@@ -6,6 +6,11 @@ from datetime import datetime, time
 
 from ..database import get_db
 from ..models import Cinema as CinemaModel, Hall as HallModel, User
+from ..hall_layout import HallLayout
+from .. import queries
+from ..pagination import COUNT_PATTERN, Keyset, paginate
+from ..response_cache import response_cache
+from ..schemas import CursorPage
 from ..auth import get_current_user, get_admin_user
 
 router = APIRouter()
@@ -38,6 +43,9 @@ class Cinema(CinemaBase):
     class Config:
         from_attributes = True
 
+class CinemaList(CursorPage):
+    cinemas: List[Cinema]
+
 # Схемы для залов
 class HallBase(BaseModel):
     cinema_id: int = Field(..., description="ID кинотеатра")
@@ -66,6 +74,8 @@ class Hall(HallBase):
     class Config:
         from_attributes = True
 
+CINEMAS_KEYSET = Keyset("cinemas", CinemaModel.id)
+
 @router.post("/", response_model=Cinema, summary="Создать кинотеатр")
 async def create_cinema(
     cinema: CinemaCreate,
@@ -79,25 +89,35 @@ async def create_cinema(
     db.add(db_cinema)
     db.commit()
     db.refresh(db_cinema)
+    response_cache.invalidate("cinemas")
     return db_cinema
 
-@router.get("/", response_model=List[Cinema], summary="Получить список кинотеатров")
+@router.get("/", response_model=CinemaList, summary="Получить список кинотеатров")
 async def get_cinemas(
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (next_cursor предыдущего ответа)"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей на странице"),
     city: Optional[str] = Query(None, description="Фильтр по городу"),
+    count: str = Query("cached", pattern=COUNT_PATTERN, description="Подсчёт total: exact, cached, estimate, none"),
     db: Session = Depends(get_db)
 ):
     """
     Получение списка кинотеатров с возможностью фильтрации.
+    
+    Страницы по курсору (по id), следующая - cursor=next_cursor.
     """
     query = db.query(CinemaModel).filter(CinemaModel.is_active == True)
     
     if city:
         query = query.filter(CinemaModel.city.ilike(f"%{city}%"))
     
-    cinemas = query.offset(skip).limit(limit).all()
-    return cinemas
+    page = paginate(db, query, CINEMAS_KEYSET, cursor, limit, count)
+    return CinemaList(
+        cinemas=page.items,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_exact=page.total_exact,
+        per_page=limit
+    )
 
 @router.get("/{cinema_id}", response_model=Cinema, summary="Получить кинотеатр по ID")
 async def get_cinema(
@@ -154,12 +174,25 @@ async def create_hall(
     if existing_hall:
         raise HTTPException(status_code=400, detail="Зал с таким номером уже существует")
     
+    # Схема мест разбирается сразу: ошибка формата или числа мест - 400
+    if hall.seat_map:
+        try:
+            layout = HallLayout.from_seat_map(None, None, hall.seat_map)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if layout.capacity != hall.total_seats:
+            raise HTTPException(
+                status_code=400,
+                detail=f"В схеме {layout.capacity} мест, а total_seats={hall.total_seats}"
+            )
+    
     hall_data = hall.dict()
     hall_data["cinema_id"] = cinema_id
     db_hall = HallModel(**hall_data)
     db.add(db_hall)
     db.commit()
     db.refresh(db_hall)
+    response_cache.invalidate(f"halls:{cinema_id}")
     return db_hall
 
 @router.get("/halls/{hall_id}", response_model=Hall, summary="Получить зал по ID")
@@ -170,7 +203,7 @@ async def get_hall(
     """
     Получение информации о конкретном зале.
     """
-    hall = db.query(HallModel).filter(HallModel.id == hall_id).first()
+    hall = queries.get_hall(db, hall_id)
     if hall is None:
         raise HTTPException(status_code=404, detail="Зал не найден")
     return hall
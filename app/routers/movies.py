@@ -4,18 +4,26 @@ from typing import List, Optional
 from datetime import datetime
 
 from ..database import get_db
-from ..models import Movie as MovieModel
-from ..schemas import Movie, MovieCreate, MovieUpdate, MovieList
+from ..models import Movie as MovieModel, User
+from .. import queries
+from ..pagination import COUNT_PATTERN, Keyset, paginate
+from ..response_cache import response_cache
+from ..schedule import refresh_movie, remove_movie
+from ..auth import get_admin_user
+from ..schemas import MovieResponse as Movie, MovieCreate, MovieUpdate, MovieList
 
 router = APIRouter()
 
+MOVIES_KEYSET = Keyset("movies", MovieModel.id)
+
 @router.post("/", response_model=Movie, summary="Создать фильм")
 async def create_movie(
     movie: MovieCreate,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Создание нового фильма в базе данных.
+    Создание нового фильма в базе данных (только для администраторов).
     
     - **title**: Название фильма (обязательно)
     - **description**: Описание фильма
@@ -30,19 +38,23 @@ async def create_movie(
     db.add(db_movie)
     db.commit()
     db.refresh(db_movie)
+    response_cache.invalidate("movies")
     return db_movie
 
 @router.get("/", response_model=MovieList, summary="Получить список фильмов")
 async def get_movies(
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (next_cursor предыдущего ответа)"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей на странице"),
     search: Optional[str] = Query(None, description="Поиск по названию или режиссеру"),
     genre: Optional[str] = Query(None, description="Фильтр по жанру"),
     is_active: Optional[bool] = Query(None, description="Фильтр по активности"),
+    count: str = Query("cached", pattern=COUNT_PATTERN, description="Подсчёт total: exact, cached, estimate, none"),
     db: Session = Depends(get_db)
 ):
     """
     Получение списка фильмов с возможностью фильтрации и поиска.
+    
+    Страницы по курсору (по id), следующая - cursor=next_cursor.
     """
     query = db.query(MovieModel)
     
@@ -58,13 +70,12 @@ async def get_movies(
     if is_active is not None:
         query = query.filter(MovieModel.is_active == is_active)
     
-    total = query.count()
-    movies = query.offset(skip).limit(limit).all()
-    
+    page = paginate(db, query, MOVIES_KEYSET, cursor, limit, count)
     return MovieList(
-        movies=movies,
-        total=total,
-        page=skip // limit + 1,
+        movies=page.items,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_exact=page.total_exact,
         per_page=limit
     )
 
@@ -76,7 +87,7 @@ async def get_movie(
     """
     Получение конкретного фильма по его ID.
     """
-    movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
+    movie = queries.get_movie(db, movie_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     return movie
@@ -85,12 +96,13 @@ async def get_movie(
 async def update_movie(
     movie_id: int,
     movie_update: MovieUpdate,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Обновление данных фильма.
+    Обновление данных фильма (только для администраторов).
     """
-    movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
+    movie = queries.get_movie(db, movie_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
@@ -100,25 +112,32 @@ async def update_movie(
         for field, value in update_data.items():
             setattr(movie, field, value)
         
+        db.flush()
+        refresh_movie(db, movie_id)
         db.commit()
         db.refresh(movie)
+        # Название фильма есть и в списке сеансов
+        response_cache.invalidate("movies", f"movie:{movie_id}", "sessions")
     
     return movie
 
 @router.delete("/{movie_id}", summary="Удалить фильм")
 async def delete_movie(
     movie_id: int,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Удаление фильма из базы данных.
+    Удаление фильма из базы данных (только для администраторов).
     """
-    movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
+    movie = queries.get_movie(db, movie_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
     db.delete(movie)
+    remove_movie(db, movie_id)
     db.commit()
+    response_cache.invalidate("movies", f"movie:{movie_id}", "sessions")
     return {"message": "Фильм успешно удален"}
 
 @router.get("/{movie_id}/sessions", summary="Получить сеансы фильма")
@@ -129,7 +148,7 @@ async def get_movie_sessions(
     """
     Получение всех сеансов конкретного фильма.
     """
-    movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
+    movie = queries.get_movie(db, movie_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
@@ -6,7 +6,10 @@ from datetime import datetime
 
 from ..database import get_db
 from ..models import Review as ReviewModel, Movie as MovieModel, User
+from .. import queries
 from ..auth import get_current_user
+from ..pagination import COUNT_PATTERN, Keyset, paginate
+from ..schemas import CursorPage
 
 router = APIRouter()
 
@@ -40,6 +43,21 @@ class ReviewResponse(ReviewBase):
     class Config:
         from_attributes = True
 
+class ReviewList(CursorPage):
+    reviews: List[ReviewResponse]
+
+# Ключи страниц отзывов фильма: (sort_by, order) -> колонка сортировки и id
+REVIEW_SORT_FIELDS = {
+    "created_at": ReviewModel.created_at,
+    "rating": ReviewModel.rating,
+    "helpful_votes": ReviewModel.helpful_votes,
+}
+REVIEWS_KEYSETS = {
+    (sort_by, order): Keyset(f"reviews:{sort_by}:{order}", field, ReviewModel.id, descending=order == "desc")
+    for sort_by, field in REVIEW_SORT_FIELDS.items()
+    for order in ("asc", "desc")
+}
+
 @router.post("/", response_model=ReviewResponse, summary="Создать отзыв")
 async def create_review(
     review: ReviewCreate,
@@ -56,7 +74,7 @@ async def create_review(
     - **is_spoiler**: Отметка о спойлерах
     """
     # Проверяем существование фильма
-    movie = db.query(MovieModel).filter(MovieModel.id == review.movie_id).first()
+    movie = queries.get_movie(db, review.movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
@@ -98,21 +116,25 @@ async def create_review(
     
     return ReviewResponse(**response_data)
 
-@router.get("/movie/{movie_id}", response_model=List[ReviewResponse], summary="Получить отзывы о фильме")
+@router.get("/movie/{movie_id}", response_model=ReviewList, summary="Получить отзывы о фильме")
 async def get_movie_reviews(
     movie_id: int,
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (next_cursor предыдущего ответа)"),
     limit: int = Query(50, ge=1, le=100, description="Количество записей на странице"),
     sort_by: str = Query("created_at", description="Сортировка: created_at, rating, helpful_votes"),
     order: str = Query("desc", description="Порядок: asc, desc"),
     verified_only: bool = Query(False, description="Только подтвержденные покупки"),
+    count: str = Query("cached", pattern=COUNT_PATTERN, description="Подсчёт total: exact, cached, estimate, none"),
     db: Session = Depends(get_db)
 ):
     """
     Получение отзывов о конкретном фильме с возможностью сортировки и фильтрации.
+    
+    Страницы по курсору (по колонке сортировки и id), следующая -
+    cursor=next_cursor с теми же sort_by и order.
     """
     # Проверяем существование фильма
-    movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
+    movie = queries.get_movie(db, movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
@@ -125,29 +147,26 @@ async def get_movie_reviews(
         query = query.filter(ReviewModel.is_verified_purchase == True)
     
     # Сортировка
-    if sort_by == "rating":
-        sort_field = ReviewModel.rating
-    elif sort_by == "helpful_votes":
-        sort_field = ReviewModel.helpful_votes
-    else:
-        sort_field = ReviewModel.created_at
+    if sort_by not in REVIEW_SORT_FIELDS:
+        sort_by = "created_at"
+    keyset = REVIEWS_KEYSETS[sort_by, "asc" if order == "asc" else "desc"]
+    page = paginate(db, query, keyset, cursor, limit, count)
     
-    if order == "asc":
-        query = query.order_by(sort_field.asc())
-    else:
-        query = query.order_by(sort_field.desc())
-    
-    reviews = query.offset(skip).limit(limit).all()
-    
-    # Добавляем информацию о пользователях
+    # Имена авторов страницы - одним запросом
+    user_names = queries.get_user_names(db, [review.user_id for review in page.items])
     result = []
-    for review in reviews:
-        user = db.query(User).filter(User.id == review.user_id).first()
+    for review in page.items:
         review_data = review.__dict__.copy()
-        review_data["user_name"] = f"{user.first_name} {user.last_name}" if user else "Неизвестный пользователь"
+        review_data["user_name"] = user_names.get(review.user_id, "Неизвестный пользователь")
         result.append(ReviewResponse(**review_data))
     
-    return result
+    return ReviewList(
+        reviews=result,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_exact=page.total_exact,
+        per_page=limit
+    )
 
 @router.get("/{review_id}", response_model=ReviewResponse, summary="Получить отзыв по ID")
 async def get_review(
@@ -161,7 +180,7 @@ async def get_review(
     if not review:
         raise HTTPException(status_code=404, detail="Отзыв не найден")
     
-    user = db.query(User).filter(User.id == review.user_id).first()
+    user = queries.get_user(db, review.user_id)
     review_data = review.__dict__.copy()
     review_data["user_name"] = f"{user.first_name} {user.last_name}" if user else "Неизвестный пользователь"
     
@@ -1,21 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 
 from ..database import get_db
-from ..models import Session as SessionModel, Movie as MovieModel, Ticket
+from ..models import Session as SessionModel, Movie as MovieModel, Ticket, User
+from .. import queries
+from ..seat_inventory import seat_inventory
+from ..pagination import COUNT_PATTERN, Keyset, paginate
+from ..response_cache import response_cache
+from ..schedule import refresh_sessions, remove_sessions
+from ..hall_layout import hall_layouts
+from ..auth import get_admin_user
 from ..schemas import Session as SessionSchema, SessionCreate, SessionUpdate, SessionList
 
 router = APIRouter()
 
+SESSIONS_KEYSET = Keyset("sessions", SessionModel.start_time, SessionModel.id)
+
 @router.post("/", response_model=SessionSchema, summary="Создать сеанс")
 async def create_session(
     session: SessionCreate,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Создание нового сеанса в базе данных.
+    Создание нового сеанса в базе данных (только для администраторов).
     
     - **movie_id**: ID фильма (обязательно)
     - **start_time**: Время начала сеанса
@@ -25,7 +36,7 @@ async def create_session(
     - **price**: Цена билета
     """
     # Проверяем существование фильма
-    movie = db.query(MovieModel).filter(MovieModel.id == session.movie_id).first()
+    movie = queries.get_movie(db, session.movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Фильм не найден")
     
@@ -33,28 +44,41 @@ async def create_session(
     if session.end_time <= session.start_time:
         raise HTTPException(status_code=400, detail="Время окончания должно быть позже времени начала")
     
+    hall = queries.get_hall(db, session.hall_id)
+    if not hall:
+        raise HTTPException(status_code=404, detail="Зал не найден")
+    
     db_session = SessionModel(
         **session.dict(),
-        available_seats=session.total_seats  # Изначально все места доступны
+        # День сеанса (NOT NULL) - полночь даты начала, как в seed
+        date=session.start_time.replace(hour=0, minute=0, second=0, microsecond=0),
+        # Изначально доступны все места зала, кроме заблокированных в схеме
+        available_seats=hall_layouts.for_hall(hall).bookable_count
     )
     db.add(db_session)
+    db.flush()
+    refresh_sessions(db, [db_session.id])
     db.commit()
     db.refresh(db_session)
+    response_cache.invalidate("sessions")
     return db_session
 
 @router.get("/", response_model=SessionList, summary="Получить список сеансов")
 async def get_sessions(
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (next_cursor предыдущего ответа)"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей на странице"),
     movie_id: Optional[int] = Query(None, description="Фильтр по ID фильма"),
     hall_number: Optional[int] = Query(None, description="Фильтр по номеру зала"),
     date_from: Optional[datetime] = Query(None, description="Фильтр сеансов от даты"),
     date_to: Optional[datetime] = Query(None, description="Фильтр сеансов до даты"),
     is_active: Optional[bool] = Query(None, description="Фильтр по активности"),
+    count: str = Query("cached", pattern=COUNT_PATTERN, description="Подсчёт total: exact, cached, estimate, none"),
     db: Session = Depends(get_db)
 ):
     """
     Получение списка сеансов с возможностью фильтрации.
+    
+    Страницы по курсору (по start_time и id), следующая - cursor=next_cursor.
     """
     query = db.query(SessionModel)
     
@@ -73,15 +97,12 @@ async def get_sessions(
     if is_active is not None:
         query = query.filter(SessionModel.is_active == is_active)
     
-    query = query.order_by(SessionModel.start_time)
-    
-    total = query.count()
-    sessions = query.offset(skip).limit(limit).all()
-    
+    page = paginate(db, query, SESSIONS_KEYSET, cursor, limit, count)
     return SessionList(
-        sessions=sessions,
-        total=total,
-        page=skip // limit + 1,
+        sessions=page.items,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_exact=page.total_exact,
         per_page=limit
     )
 
@@ -93,7 +114,7 @@ async def get_session(
     """
     Получение конкретного сеанса по его ID.
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = queries.get_session(db, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     return session
@@ -102,12 +123,13 @@ async def get_session(
 async def update_session(
     session_id: int,
     session_update: SessionUpdate,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Обновление данных сеанса.
+    Обновление данных сеанса (только для администраторов).
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = queries.get_session(db, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
@@ -115,37 +137,52 @@ async def update_session(
     
     # Если обновляется movie_id, проверяем существование фильма
     if "movie_id" in update_data:
-        movie = db.query(MovieModel).filter(MovieModel.id == update_data["movie_id"]).first()
+        movie = queries.get_movie(db, update_data["movie_id"])
         if not movie:
             raise HTTPException(status_code=404, detail="Фильм не найден")
     
-    # Если обновляется total_seats, пересчитываем available_seats
-    if "total_seats" in update_data:
-        sold_tickets = len(session.tickets)
-        new_total = update_data["total_seats"]
-        if new_total < sold_tickets:
-            raise HTTPException(status_code=400, detail="Нельзя уменьшить количество мест меньше проданных билетов")
-        update_data["available_seats"] = new_total - sold_tickets
+    # При смене зала счётчик мест считается по схеме нового зала
+    hall_changed = "hall_id" in update_data and update_data["hall_id"] != session.hall_id
+    if hall_changed:
+        hall = queries.get_hall(db, update_data["hall_id"])
+        if not hall:
+            raise HTTPException(status_code=404, detail="Зал не найден")
+        layout = hall_layouts.for_hall(hall)
+        seats = db.scalars(select(Ticket.seat_number).where(Ticket.session_id == session_id)).all()
+        missing = sorted(seat for seat in seats if not layout.is_bookable(seat))
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Места билетов не продаются в новом зале: {missing}")
+        # Билеты пересчитываются в том же UPDATE - параллельное бронирование не теряется
+        tickets = select(func.count()).where(Ticket.session_id == session_id).scalar_subquery()
+        update_data["available_seats"] = layout.bookable_count - tickets
+        update_data["is_sold_out"] = layout.bookable_count - tickets <= 0
     
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
         for field, value in update_data.items():
             setattr(session, field, value)
         
+        db.flush()
+        refresh_sessions(db, [session_id])
         db.commit()
         db.refresh(session)
+        response_cache.invalidate("sessions")
+        if hall_changed:
+            # Карта мест в памяти описывает старый зал
+            seat_inventory.invalidate(session_id)
     
     return session
 
 @router.delete("/{session_id}", summary="Удалить сеанс")
 async def delete_session(
     session_id: int,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Удаление сеанса из базы данных.
+    Удаление сеанса из базы данных (только для администраторов).
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = queries.get_session(db, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
@@ -154,18 +191,22 @@ async def delete_session(
         raise HTTPException(status_code=400, detail="Нельзя удалить сеанс с проданными билетами")
     
     db.delete(session)
+    remove_sessions(db, [session_id])
     db.commit()
+    seat_inventory.invalidate(session_id)
+    response_cache.invalidate("sessions")
     return {"message": "Сеанс успешно удален"}
 
 @router.get("/{session_id}/tickets", summary="Получить билеты сеанса")
 async def get_session_tickets(
     session_id: int,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение всех билетов конкретного сеанса.
+    Получение всех билетов конкретного сеанса (только для администраторов).
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = queries.get_session(db, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
@@ -179,18 +220,25 @@ async def get_available_seats(
     """
     Получение списка доступных мест для сеанса.
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
-    if session is None:
+    seat_map = seat_inventory.get(db, session_id)
+    if seat_map is None:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
-    occupied_seats = [ticket.seat_number for ticket in session.tickets]
-    available_seats = [seat for seat in range(1, session.total_seats + 1) 
-                      if seat not in occupied_seats]
+    # Заблокированные в схеме зала места не продаются (app/hall_layout.py)
+    layout = hall_layouts.get(db, seat_map.hall_id)
+    if layout is None:
+        raise HTTPException(status_code=404, detail="Зал не найден")
+    blocked_seats = layout.blocked_seats()
+    available_seats = seat_map.free_seats()
+    if blocked_seats:
+        blocked = set(blocked_seats)
+        available_seats = [seat for seat in available_seats if seat not in blocked]
     
     return {
         "session_id": session_id,
-        "total_seats": session.total_seats,
+        "total_seats": seat_map.capacity,
         "available_seats": available_seats,
-        "occupied_seats": occupied_seats,
+        "occupied_seats": seat_map.occupied_seats(),
+        "blocked_seats": blocked_seats,
         "available_count": len(available_seats)
-    } 
\ No newline at end of file
+    }
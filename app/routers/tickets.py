@@ -1,141 +1,164 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import datetime
 
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models import Ticket as TicketModel, Session as SessionModel, User
+from .. import queries
+from ..seat_inventory import seat_inventory
+from ..hall_layout import hall_layouts
+from ..booking import (
+    book_seats_async, build_tickets, validate_seats, cancel_ticket_async, pay_ticket_async, unpay_ticket_async,
+    update_ticket_async,
+)
+from ..waiting_room import ADMISSION_HEADER, waiting_room
+from ..write_queue import write_queue
+from ..holds import is_hold, pay_hold_async
+from ..pagination import COUNT_PATTERN, NEXT_CURSOR_HEADER, paginate
 from ..schemas import Ticket, TicketCreate, TicketUpdate, TicketList
-from ..auth import get_current_user, get_admin_user
+from ..auth import get_current_user, get_admin_user, is_staff
 
 router = APIRouter()
 
+def get_owned_ticket(db: Session, ticket_id: int, user: User) -> TicketModel:
+    """Билет владельца или сотрудника кинотеатра: 404 - нет билета, 403 - чужой билет"""
+    ticket = db.query(TicketModel).filter(TicketModel.id == ticket_id).first()
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Билет не найден")
+    if ticket.user_id != user.id and not is_staff(user):
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+    return ticket
+
 @router.post("/", response_model=Ticket, summary="Забронировать билет")
 async def create_ticket(
     ticket: TicketCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    admission_token: Optional[str] = Header(None, alias=ADMISSION_HEADER),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Бронирование билета на сеанс.
     
     - **session_id**: ID сеанса (обязательно)
     - **seat_number**: Номер места
-    - **customer_name**: Имя клиента
-    - **customer_email**: Email клиента
-    - **customer_phone**: Телефон клиента
-    - **price**: Цена билета
+    
+    Ряд, тип места, цена и номер брони берутся из схемы зала и сеанса
+    (booking.build_tickets), как у POST /tickets.
     """
     # Проверяем существование сеанса
-    session = db.query(SessionModel).filter(SessionModel.id == ticket.session_id).first()
+    session = await queries.get_session_async(db, ticket.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
     if not session.is_active:
         raise HTTPException(status_code=400, detail="Сеанс неактивен")
     
-    # Проверяем, что место свободно
-    existing_ticket = db.query(TicketModel).filter(
-        TicketModel.session_id == ticket.session_id,
-        TicketModel.seat_number == ticket.seat_number
-    ).first()
-    
-    if existing_ticket:
-        raise HTTPException(status_code=400, detail="Место уже занято")
-    
-    # Проверяем валидность номера места
-    if ticket.seat_number < 1 or ticket.seat_number > session.total_seats:
-        raise HTTPException(status_code=400, detail="Неверный номер места")
-    
-    # Создаем билет с привязкой к пользователю
-    ticket_data = ticket.dict()
-    ticket_data["user_id"] = current_user.id  # Связываем с текущим пользователем
-    
-    db_ticket = TicketModel(**ticket_data)
-    db.add(db_ticket)
-    
-    # Уменьшаем количество доступных мест
-    session.available_seats -= 1
-    
-    db.commit()
-    db.refresh(db_ticket)
-    return db_ticket
+    hall = await queries.get_hall_async(db, session.hall_id)
+    if not hall:
+        raise HTTPException(status_code=404, detail="Зал не найден")
+    
+    # Проверяем номер места по схеме зала и быстрый отказ по карте мест в памяти
+    validate_seats([ticket.seat_number], hall_layouts.for_hall(hall))
+    seat_map = await seat_inventory.get_async(db, session.id)
+    if seat_map.taken_among([ticket.seat_number]):
+        raise HTTPException(status_code=409, detail=f"Места уже заняты: {[ticket.seat_number]}")
+    
+    session_id = session.id
+    tickets = build_tickets(current_user.id, session, hall, [ticket.seat_number])
+    
+    # Билет и счётчик мест сеанса сохраняются одной транзакцией через очередь
+    # единственного писателя; занятое место - 409 (уникальный индекс по месту сеанса).
+    # Транзакция занимает слот виртуальной очереди (app/waiting_room.py)
+    async with waiting_room.booking_slot(session_id, hall.cinema_id, admission_token):
+        await write_queue.submit(lambda wdb: book_seats_async(wdb, session_id, tickets))
+    return await db.get(TicketModel, tickets[0].id)
 
 @router.get("/", response_model=TicketList, summary="Получить список билетов")
 async def get_tickets(
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (next_cursor предыдущего ответа)"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей на странице"),
     session_id: Optional[int] = Query(None, description="Фильтр по ID сеанса"),
     customer_name: Optional[str] = Query(None, description="Фильтр по имени клиента"),
     customer_email: Optional[str] = Query(None, description="Фильтр по email клиента"),
     is_paid: Optional[bool] = Query(None, description="Фильтр по статусу оплаты"),
+    count: str = Query("cached", pattern=COUNT_PATTERN, description="Подсчёт total: exact, cached, estimate, none"),
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение списка билетов с возможностью фильтрации.
+    Получение списка билетов с возможностью фильтрации, новые первыми (только для администраторов).
+    
+    Страницы по курсору (по booking_time и id), следующая - cursor=next_cursor.
     """
     query = db.query(TicketModel)
     
     if session_id:
         query = query.filter(TicketModel.session_id == session_id)
     
+    # Данные клиента - у пользователя билета
     if customer_name:
-        query = query.filter(TicketModel.customer_name.ilike(f"%{customer_name}%"))
+        full_name = User.first_name + " " + User.last_name
+        query = query.filter(TicketModel.user_id.in_(select(User.id).where(full_name.ilike(f"%{customer_name}%"))))
     
     if customer_email:
-        query = query.filter(TicketModel.customer_email.ilike(f"%{customer_email}%"))
+        query = query.filter(TicketModel.user_id.in_(select(User.id).where(User.email.ilike(f"%{customer_email}%"))))
     
     if is_paid is not None:
         query = query.filter(TicketModel.is_paid == is_paid)
     
-    query = query.order_by(TicketModel.booking_time.desc())
-    
-    total = query.count()
-    tickets = query.offset(skip).limit(limit).all()
-    
+    page = paginate(db, query, queries.TICKETS_KEYSET, cursor, limit, count)
     return TicketList(
-        tickets=tickets,
-        total=total,
-        page=skip // limit + 1,
+        tickets=page.items,
+        next_cursor=page.next_cursor,
+        total=page.total,
+        total_exact=page.total_exact,
         per_page=limit
     )
 
 @router.get("/{ticket_id}", response_model=Ticket, summary="Получить билет по ID")
 async def get_ticket(
     ticket_id: int,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение конкретного билета по его ID.
+    Получение конкретного билета по его ID (владельцем или сотрудником).
     """
-    ticket = db.query(TicketModel).filter(TicketModel.id == ticket_id).first()
-    if ticket is None:
-        raise HTTPException(status_code=404, detail="Билет не найден")
-    return ticket
+    return get_owned_ticket(db, ticket_id, current_user)
 
 @router.put("/{ticket_id}", response_model=Ticket, summary="Обновить билет")
 async def update_ticket(
     ticket_id: int,
     ticket_update: TicketUpdate,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Обновление данных билета.
+    Обновление данных билета (только для администраторов).
     """
     ticket = db.query(TicketModel).filter(TicketModel.id == ticket_id).first()
     if ticket is None:
         raise HTTPException(status_code=404, detail="Билет не найден")
     
     update_data = ticket_update.dict(exclude_unset=True)
+    # Оплата и её снятие - условными запросами с проверками, как PATCH /{ticket_id}/pay
+    is_paid = update_data.pop("is_paid", None)
     
     # Если обновляется номер места, проверяем его доступность
     if "seat_number" in update_data:
         new_seat = update_data["seat_number"]
         session = ticket.session
         
-        # Проверяем валидность номера места
-        if new_seat < 1 or new_seat > session.total_seats:
+        # Проверяем номер места по схеме зала
+        layout = hall_layouts.for_hall(session.hall)
+        if not layout.is_bookable(new_seat):
             raise HTTPException(status_code=400, detail="Неверный номер места")
+        # Ряд и тип нового места - из схемы
+        update_data["seat_row"] = layout.row_of[new_seat]
+        update_data["seat_type"] = layout.seat_type(new_seat)
         
         # Проверяем, что место свободно (кроме текущего билета)
         existing_ticket = db.query(TicketModel).filter(
@@ -145,13 +168,32 @@ async def update_ticket(
         ).first()
         
         if existing_ticket:
-            raise HTTPException(status_code=400, detail="Место уже занято")
+            raise HTTPException(status_code=409, detail="Место уже занято")
     
+    # Изменения билета и счётчиков - через очередь единственного писателя (app/write_queue.py)
     if update_data:
-        for field, value in update_data.items():
-            setattr(ticket, field, value)
-        
-        db.commit()
+        old_seat = ticket.seat_number
+        try:
+            await write_queue.submit(lambda wdb: update_ticket_async(wdb, ticket_id, update_data))
+        except HTTPException:
+            # Место заняли между проверкой и commit
+            seat_inventory.invalidate(ticket.session_id)
+            raise
+        db.refresh(ticket)
+        if ticket.seat_number != old_seat:
+            seat_inventory.release(ticket.session_id, (old_seat,))
+            seat_inventory.book(ticket.session_id, (ticket.seat_number,))
+        if ticket.is_paid:
+            seat_inventory.mark_paid(ticket.session_id, (ticket.seat_number,))
+    
+    if is_paid is not None and is_paid != ticket.is_paid:
+        if not is_paid:
+            await write_queue.submit(lambda wdb: unpay_ticket_async(wdb, ticket))
+        elif is_hold(ticket):
+            # Временная бронь оплачивается, только пока не истекла (app/holds.py)
+            await write_queue.submit(lambda wdb: pay_hold_async(wdb, ticket))
+        else:
+            await write_queue.submit(lambda wdb: pay_ticket_async(wdb, ticket))
         db.refresh(ticket)
     
     return ticket
@@ -159,54 +201,52 @@ async def update_ticket(
 @router.delete("/{ticket_id}", summary="Отменить бронирование билета")
 async def delete_ticket(
     ticket_id: int,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Отмена бронирования билета.
+    Отмена бронирования билета владельцем или сотрудником.
     """
-    ticket = db.query(TicketModel).filter(TicketModel.id == ticket_id).first()
-    if ticket is None:
+    get_owned_ticket(db, ticket_id, current_user)
+    # Билет удаляется, а место возвращается в счётчики сеанса одной транзакцией
+    # через очередь единственного писателя
+    if not await write_queue.submit(lambda wdb: cancel_ticket_async(wdb, ticket_id)):
         raise HTTPException(status_code=404, detail="Билет не найден")
-    
-    session = ticket.session
-    
-    # Увеличиваем количество доступных мест
-    session.available_seats += 1
-    
-    db.delete(ticket)
-    db.commit()
     return {"message": "Бронирование билета отменено"}
 
 @router.patch("/{ticket_id}/pay", response_model=Ticket, summary="Оплатить билет")
 async def pay_ticket(
     ticket_id: int,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Отметка билета как оплаченного.
+    Отметка билета как оплаченного (владельцем или сотрудником).
     """
-    ticket = db.query(TicketModel).filter(TicketModel.id == ticket_id).first()
-    if ticket is None:
-        raise HTTPException(status_code=404, detail="Билет не найден")
+    ticket = get_owned_ticket(db, ticket_id, current_user)
     
     if ticket.is_paid:
         raise HTTPException(status_code=400, detail="Билет уже оплачен")
     
-    ticket.is_paid = True
-    db.commit()
+    # Временная бронь оплачивается, только пока не истекла (app/holds.py)
+    if is_hold(ticket):
+        await write_queue.submit(lambda wdb: pay_hold_async(wdb, ticket))
+    else:
+        await write_queue.submit(lambda wdb: pay_ticket_async(wdb, ticket))
     db.refresh(ticket)
     return ticket
 
-@router.get("/customer/{customer_email}", summary="Получить билеты клиента")
+@router.get("/customer/{customer_email}", response_model=List[Ticket], summary="Получить билеты клиента")
 async def get_customer_tickets(
     customer_email: str,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение всех билетов конкретного клиента по email.
+    Получение всех билетов конкретного клиента по email (только для администраторов).
     """
     tickets = db.query(TicketModel).filter(
-        TicketModel.customer_email == customer_email
+        TicketModel.user_id.in_(select(User.id).where(User.email == customer_email))
     ).order_by(TicketModel.booking_time.desc()).all()
     
     return tickets
@@ -215,10 +255,11 @@ async def get_customer_tickets(
 async def get_tickets_statistics(
     date_from: Optional[datetime] = Query(None, description="Дата начала периода"),
     date_to: Optional[datetime] = Query(None, description="Дата окончания периода"),
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение статистики по билетам за период.
+    Получение статистики по билетам за период (только для администраторов).
     """
     query = db.query(TicketModel)
     
@@ -258,29 +299,32 @@ async def get_my_tickets(
 
 @router.get("/admin/all", response_model=List[Ticket], summary="Получить все билеты (админ)")
 async def get_all_tickets_admin(
+    response: Response,
     admin_user: User = Depends(get_admin_user),
-    skip: int = Query(0, ge=0, description="Количество записей для пропуска"),
+    cursor: Optional[str] = Query(None, description="Курсор страницы (заголовок X-Next-Cursor предыдущего ответа)"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей на странице"),
     db: Session = Depends(get_db)
 ):
     """
-    Получение всех билетов в системе (только для администраторов).
-    """
-    tickets = db.query(TicketModel).order_by(
-        TicketModel.booking_time.desc()
-    ).offset(skip).limit(limit).all()
+    Получение всех билетов в системе (только для администраторов), новые первыми.
     
-    return tickets
+    Курсор следующей страницы - в заголовке X-Next-Cursor.
+    """
+    page = paginate(db, db.query(TicketModel), queries.TICKETS_KEYSET, cursor, limit, count="none")
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 @router.get("/sessions/{session_id}/tickets", response_model=List[Ticket], summary="Получить билеты для сеанса")
 async def get_tickets_for_session(
     session_id: int,
+    admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Получение списка билетов для конкретного сеанса.
+    Получение списка билетов для конкретного сеанса (только для администраторов).
     """
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = queries.get_session(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Сеанс не найден")
     
@@ -0,0 +1,166 @@
+"""
+Проекция расписания для чтения (таблица schedule_entries).
+
+Расписание показывает сеанс вместе с названием фильма, залом, вместимостью,
+ценой и наличием мест. Вместо чтения sessions с запросами фильма и зала на
+каждый сеанс оно хранится готовым: строка на сеанс с денормализованными
+полями и индекс (day, cinema_id, start_time). Расписание дня или нескольких
+дней - всех кинотеатров или одного - один запрос по диапазону индекса.
+
+Проекция обновляется в той же транзакции, что и исходные данные:
+
+- сеанс создан, изменён или удалён (app/routers/sessions.py) -
+  refresh_sessions / remove_sessions;
+- фильм изменён или удалён (app/routers/movies.py) - refresh_movie /
+  remove_movie;
+- изменилось наличие мест (бронирование в app/booking.py, отмена билетов и
+  снятие броней через release_seats, исправление сверкой в
+  app/session_counters.py) - sync_availability: одна строка по первичному
+  ключу, значение копируется из счётчиков сеанса.
+
+Данные, записанные в обход приложения (seed, генератор, импорт), попадают в
+проекцию перестроением - rebuild(db) или
+
+    python -m app.schedule --rebuild
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+from .models import Hall, Movie, ScheduleEntry, Session
+
+SCHEDULE_MAX_DAYS = 31
+
+_schedule = ScheduleEntry.__table__
+_sessions = Session.__table__
+_SESSION_IDS = bindparam("session_ids", expanding=True)
+_MOVIE_ID = bindparam("movie_id")
+
+# Строки проекции из исходных таблиц, в порядке _COLUMNS
+_COLUMNS = (
+    "session_id", "cinema_id", "day", "start_time", "end_time", "movie_id", "movie_title", "hall_id",
+    "hall_name", "capacity", "base_price", "vip_price", "premium_price", "available_seats", "is_sold_out",
+    "is_active", "language", "format_3d", "format_imax",
+)
+SOURCE = (
+    select(
+        Session.id, Hall.cinema_id, func.date(Session.start_time), Session.start_time, Session.end_time,
+        Session.movie_id, Movie.title, Session.hall_id, Hall.name, Hall.total_seats,
+        Session.base_price, Session.vip_price, Session.premium_price, Session.available_seats,
+        Session.is_sold_out, Session.is_active, Session.language, Session.format_3d, Session.format_imax,
+    )
+    .join(Movie, Movie.id == Session.movie_id)
+    .join(Hall, Hall.id == Session.hall_id)
+)
+
+DELETE_SESSIONS = delete(_schedule).where(_schedule.c.session_id.in_(_SESSION_IDS))
+INSERT_SESSIONS = insert(_schedule).from_select(_COLUMNS, SOURCE.where(Session.id.in_(_SESSION_IDS)))
+DELETE_MOVIE = delete(_schedule).where(_schedule.c.movie_id == _MOVIE_ID)
+INSERT_MOVIE = insert(_schedule).from_select(_COLUMNS, SOURCE.where(Session.movie_id == _MOVIE_ID))
+DELETE_ALL = delete(_schedule)
+INSERT_ALL = insert(_schedule).from_select(_COLUMNS, SOURCE)
+
+# Наличие мест из счётчиков сеанса; executemany [{"sid": ...}]
+_current = _sessions.c.id == _schedule.c.session_id
+SYNC_AVAILABILITY = (
+    update(_schedule)
+    .where(_schedule.c.session_id == bindparam("sid"))
+    .values(
+        available_seats=select(_sessions.c.available_seats).where(_current).scalar_subquery(),
+        is_sold_out=select(_sessions.c.is_sold_out).where(_current).scalar_subquery(),
+    )
+)
+
+
+def refresh_sessions(db, session_ids: Iterable[int]):
+    """Пересобрать строки сеансов (синхронная Session, без commit; удалённые сеансы пропадают)"""
+    params = {"session_ids": list(session_ids)}
+    db.execute(DELETE_SESSIONS, params)
+    db.execute(INSERT_SESSIONS, params)
+
+
+def remove_sessions(db, session_ids: Iterable[int]):
+    """Удалить строки сеансов (синхронная Session, без commit)"""
+    db.execute(DELETE_SESSIONS, {"session_ids": list(session_ids)})
+
+
+def refresh_movie(db, movie_id: int):
+    """Пересобрать строки сеансов фильма, например после смены названия (без commit)"""
+    db.execute(DELETE_MOVIE, {"movie_id": movie_id})
+    db.execute(INSERT_MOVIE, {"movie_id": movie_id})
+
+
+def remove_movie(db, movie_id: int):
+    """Удалить строки сеансов фильма (синхронная Session, без commit)"""
+    db.execute(DELETE_MOVIE, {"movie_id": movie_id})
+
+
+def _sync_params(session_ids: Iterable[int]):
+    return [{"sid": session_id} for session_id in set(session_ids)]
+
+
+def sync_availability(db, session_ids: Iterable[int]):
+    """Скопировать наличие мест сеансов из счётчиков (синхронная Session, без commit)"""
+    params = _sync_params(session_ids)
+    if params:
+        db.execute(SYNC_AVAILABILITY, params)
+
+
+async def sync_availability_async(db, session_ids: Iterable[int]):
+    """Скопировать наличие мест сеансов из счётчиков (AsyncSession, без commit)"""
+    params = _sync_params(session_ids)
+    if params:
+        await db.execute(SYNC_AVAILABILITY, params)
+
+
+def rebuild(db) -> int:
+    """Перестроить всю проекцию одной транзакцией; возвращает число строк"""
+    db.execute(DELETE_ALL)
+    db.execute(INSERT_ALL)
+    db.commit()
+    return db.scalar(select(func.count()).select_from(_schedule))
+
+
+# Поля ответа GET /sessions: строки без загрузки ORM объектов
+SCHEDULE_COLUMNS = (
+    ScheduleEntry.session_id, ScheduleEntry.movie_id, ScheduleEntry.movie_title, ScheduleEntry.start_time,
+    ScheduleEntry.base_price, ScheduleEntry.hall_id, ScheduleEntry.hall_name, ScheduleEntry.capacity,
+    ScheduleEntry.available_seats,
+)
+
+
+def schedule_query(day_from: Optional[date] = None, days: int = 1, cinema_id: Optional[int] = None,
+                   movie_id: Optional[int] = None):
+    """
+    SELECT расписания: дни [day_from, day_from + days) по индексу
+    (day, cinema_id, start_time); без day_from - всё расписание.
+    """
+    query = select(*SCHEDULE_COLUMNS)
+    if day_from is not None:
+        query = query.where(ScheduleEntry.day >= day_from, ScheduleEntry.day < day_from + timedelta(days=days))
+    if cinema_id is not None:
+        query = query.where(ScheduleEntry.cinema_id == cinema_id)
+    if movie_id is not None:
+        query = query.where(ScheduleEntry.movie_id == movie_id)
+    return query.order_by(ScheduleEntry.day, ScheduleEntry.start_time, ScheduleEntry.session_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Проекция расписания schedule_entries")
+    parser.add_argument("--rebuild", action="store_true", help="Перестроить из sessions, movies и halls")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            print(f"schedule_entries: {rebuild(db)} сеансов")
+        else:
+            parser.print_help()
+    finally:
+        db.close()
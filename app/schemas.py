@@ -93,8 +93,7 @@ class Session(SessionBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Схемы для билетов
 class TicketBase(BaseModel):
@@ -125,8 +124,7 @@ class Ticket(TicketBase):
     booking_time: datetime
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Схемы для пользователей
 class UserBase(BaseModel):
@@ -155,20 +153,18 @@ class UserResponse(UserBase):
     created_at: datetime
 
 # Схемы для ответов
-class MovieList(BaseModel):
-    movies: List[MovieResponse]
-    total: int
-    page: int
+class CursorPage(BaseModel):
+    """Страница курсорной пагинации (app/pagination.py)"""
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы, None - последняя")
+    total: Optional[int] = Field(None, description="Всего записей (нет при count=none)")
+    total_exact: bool = Field(True, description="False - total ограничен порогом count=estimate")
     per_page: int
 
-class SessionList(BaseModel):
+class MovieList(CursorPage):
+    movies: List[MovieResponse]
+
+class SessionList(CursorPage):
     sessions: List[Session]
-    total: int
-    page: int
-    per_page: int
 
-class TicketList(BaseModel):
+class TicketList(CursorPage):
     tickets: List[Ticket]
-    total: int
-    page: int
-    per_page: int 
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Учёт мест сеансов в памяти.
+
+Для каждого активного сеанса хранится компактная битовая карта занятых и
+оплаченных мест (1 бит на место). Карта строится лениво одним запросом к БД при
+первом обращении и дальше обновляется при бронировании, отмене и оплате,
+поэтому проверка мест, количество свободных мест и список доступных мест
+отвечаются из памяти.
+
+БД остаётся источником истины: запись бронирования всё равно перепроверяет
+места (уникальный индекс uq_tickets_session_seat). Карта живёт в процессе,
+поэтому при нескольких воркерах она перечитывается из БД не реже, чем раз в
+SEAT_INVENTORY_TTL секунд, а при расхождении с БД сбрасывается.
+"""
+
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, select
+
+from .hall_layout import hall_layouts
+from .models import Hall, Session, Ticket
+
+logger = logging.getLogger(__name__)
+
+SEAT_INVENTORY_TTL = float(os.getenv("SEAT_INVENTORY_TTL", "30"))
+SEAT_INVENTORY_MAX_SESSIONS = int(os.getenv("SEAT_INVENTORY_MAX_SESSIONS", "10000"))
+
+CAPACITY_BY_SESSION = (
+    select(Hall.total_seats, Hall.id)
+    .join(Session, Session.hall_id == Hall.id)
+    .where(Session.id == bindparam("session_id"))
+)
+SEATS_BY_SESSION = select(Ticket.seat_number, Ticket.is_paid).where(Ticket.session_id == bindparam("session_id"))
+
+
+class SeatMap:
+    """Битовые карты занятых и оплаченных мест одного сеанса (места с 1)"""
+
+    __slots__ = ("capacity", "hall_id", "blocked_count", "taken", "paid", "taken_count", "paid_count", "loaded_at")
+
+    def __init__(self, capacity: int, hall_id: int = None, blocked_count: int = 0):
+        self.capacity = capacity
+        self.hall_id = hall_id
+        # Заблокированные в схеме зала места не продаются и в свободные не входят
+        self.blocked_count = blocked_count
+        size = capacity // 8 + 1
+        self.taken = bytearray(size)
+        self.paid = bytearray(size)
+        self.taken_count = 0
+        self.paid_count = 0
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, capacity: int, rows, hall_id: int = None, blocked_count: int = 0) -> "SeatMap":
+        seat_map = cls(capacity, hall_id, blocked_count)
+        for seat, is_paid in rows:
+            seat_map.book((seat,))
+            if is_paid:
+                seat_map.mark_paid((seat,))
+        return seat_map
+
+    def valid(self, seat: int) -> bool:
+        return 1 <= seat <= self.capacity
+
+    def is_taken(self, seat: int) -> bool:
+        return bool(self.taken[seat >> 3] & (1 << (seat & 7)))
+
+    def is_paid(self, seat: int) -> bool:
+        return bool(self.paid[seat >> 3] & (1 << (seat & 7)))
+
+    def taken_among(self, seats: Iterable[int]) -> List[int]:
+        """Уже занятые места из списка"""
+        return [seat for seat in seats if self.valid(seat) and self.is_taken(seat)]
+
+    @property
+    def free_count(self) -> int:
+        return self.capacity - self.blocked_count - self.taken_count
+
+    def book(self, seats: Iterable[int]):
+        for seat in seats:
+            if self.valid(seat) and not self.is_taken(seat):
+                self.taken[seat >> 3] |= 1 << (seat & 7)
+                self.taken_count += 1
+
+    def release(self, seats: Iterable[int]):
+        for seat in seats:
+            if self.valid(seat) and self.is_taken(seat):
+                self.taken[seat >> 3] &= ~(1 << (seat & 7)) & 0xFF
+                self.taken_count -= 1
+                if self.is_paid(seat):
+                    self.paid[seat >> 3] &= ~(1 << (seat & 7)) & 0xFF
+                    self.paid_count -= 1
+
+    def mark_paid(self, seats: Iterable[int]):
+        for seat in seats:
+            if self.valid(seat) and self.is_taken(seat) and not self.is_paid(seat):
+                self.paid[seat >> 3] |= 1 << (seat & 7)
+                self.paid_count += 1
+
+    def mark_unpaid(self, seats: Iterable[int]):
+        for seat in seats:
+            if self.valid(seat) and self.is_paid(seat):
+                self.paid[seat >> 3] &= ~(1 << (seat & 7)) & 0xFF
+                self.paid_count -= 1
+
+    def free_seats(self) -> List[int]:
+        taken = self.taken
+        return [seat for seat in range(1, self.capacity + 1) if not taken[seat >> 3] & (1 << (seat & 7))]
+
+    def occupied_seats(self) -> List[int]:
+        taken = self.taken
+        return [seat for seat in range(1, self.capacity + 1) if taken[seat >> 3] & (1 << (seat & 7))]
+
+
+def _blocked(layout) -> int:
+    return layout.blocked_count if layout is not None else 0
+
+
+class SeatInventory:
+    """Карты мест активных сеансов: ленивое построение, TTL и вытеснение LRU"""
+
+    def __init__(self, ttl: float = SEAT_INVENTORY_TTL, max_sessions: int = SEAT_INVENTORY_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _cached(self, session_id: int) -> Optional[SeatMap]:
+        with self._lock:
+            seat_map = self._maps.get(session_id)
+            if seat_map is None:
+                return None
+            if time.monotonic() - seat_map.loaded_at > self.ttl:
+                del self._maps[session_id]
+                return None
+            self._maps.move_to_end(session_id)
+            self.hits += 1
+            return seat_map
+
+    def _store(self, session_id: int, seat_map: SeatMap) -> SeatMap:
+        with self._lock:
+            self.loads += 1
+            self._maps[session_id] = seat_map
+            self._maps.move_to_end(session_id)
+            while len(self._maps) > self.max_sessions:
+                self._maps.popitem(last=False)
+        return seat_map
+
+    def get(self, db, session_id: int) -> Optional[SeatMap]:
+        """Карта мест сеанса (синхронная Session); None - сеанса нет"""
+        seat_map = self._cached(session_id)
+        if seat_map is not None:
+            return seat_map
+        hall = db.execute(CAPACITY_BY_SESSION, {"session_id": session_id}).first()
+        if hall is None:
+            return None
+        rows = db.execute(SEATS_BY_SESSION, {"session_id": session_id}).all()
+        layout = hall_layouts.get(db, hall.id)
+        return self._store(session_id, SeatMap.from_rows(hall.total_seats, rows, hall.id, _blocked(layout)))
+
+    async def get_async(self, db, session_id: int) -> Optional[SeatMap]:
+        """Карта мест сеанса (AsyncSession); None - сеанса нет"""
+        seat_map = self._cached(session_id)
+        if seat_map is not None:
+            return seat_map
+        hall = (await db.execute(CAPACITY_BY_SESSION, {"session_id": session_id})).first()
+        if hall is None:
+            return None
+        rows = (await db.execute(SEATS_BY_SESSION, {"session_id": session_id})).all()
+        layout = await hall_layouts.get_async(db, hall.id)
+        return self._store(session_id, SeatMap.from_rows(hall.total_seats, rows, hall.id, _blocked(layout)))
+
+    def _loaded(self, session_id: int) -> Optional[SeatMap]:
+        with self._lock:
+            return self._maps.get(session_id)
+
+    def book(self, session_id: int, seats: Iterable[int]):
+        """Места забронированы (после commit)"""
+        seat_map = self._loaded(session_id)
+        if seat_map is not None:
+            with self._lock:
+                seat_map.book(seats)
+
+    def release(self, session_id: int, seats: Iterable[int]):
+        """Бронь отменена, места свободны (после commit)"""
+        seat_map = self._loaded(session_id)
+        if seat_map is not None:
+            with self._lock:
+                seat_map.release(seats)
+
+    def mark_paid(self, session_id: int, seats: Iterable[int]):
+        """Места оплачены (после commit)"""
+        seat_map = self._loaded(session_id)
+        if seat_map is not None:
+            with self._lock:
+                seat_map.mark_paid(seats)
+
+    def mark_unpaid(self, session_id: int, seats: Iterable[int]):
+        """Оплата мест снята (после commit)"""
+        seat_map = self._loaded(session_id)
+        if seat_map is not None:
+            with self._lock:
+                seat_map.mark_unpaid(seats)
+
+    def invalidate(self, session_id: int = None):
+        """Сбросить карту сеанса (или все карты) - следующий запрос перечитает БД"""
+        with self._lock:
+            if session_id is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._maps), "hits": self.hits, "loads": self.loads}
+
+
+seat_inventory = SeatInventory()
@@ -0,0 +1,110 @@
+"""
+Демо данные Cinema Paradise.
+
+Приложение больше не заполняет базу при каждом запуске воркера. Данные
+добавляются только по явному запросу:
+
+    python -m app.seed                 # из командной строки
+    SEED_DEMO_DATA=1 uvicorn app.main:app   # один раз при старте
+    GET /demo/populate                 # через API
+"""
+
+from datetime import datetime
+
+from .database import SessionLocal
+from .models import User, Movie, Cinema, Hall, Session, Ticket, UserRole, MovieGenre
+from .schedule import rebuild
+
+
+def init_db() -> dict:
+    """
+    Добавить тестовые данные в пустые таблицы.
+
+    Каждая таблица проверяется одним запросом, всё сохраняется одним commit.
+    Возвращает, какие группы данных были добавлены.
+    """
+    db = SessionLocal()
+    added = {}
+    try:
+        users = movies = halls = sessions = None
+
+        if db.query(User.id).first() is None:
+            users = [
+                User(username="admin", email="admin@cinema.com", hashed_password="admin123", first_name="Admin", last_name="User", role=UserRole.ADMIN),
+                User(username="manager", email="manager@cinema.com", hashed_password="manager123", first_name="Manager", last_name="User", role=UserRole.MANAGER),
+                User(username="user", email="user@cinema.com", hashed_password="user123", first_name="Regular", last_name="User", role=UserRole.CUSTOMER),
+            ]
+            db.add_all(users)
+            added["users"] = len(users)
+
+        if db.query(Movie.id).first() is None:
+            movies = [
+                Movie(title="Аватар: Путь воды", duration_minutes=192, rating=8.5, genre=MovieGenre.SCI_FI),
+                Movie(title="Топ Ган: Мэверик", duration_minutes=130, rating=8.8, genre=MovieGenre.ACTION),
+                Movie(title="Чёрная пантера: Ваканда навеки", duration_minutes=161, rating=7.2, genre=MovieGenre.ACTION),
+            ]
+            db.add_all(movies)
+            added["movies"] = len(movies)
+
+        cinema = db.query(Cinema).first()
+        if cinema is None:
+            cinema = Cinema(name="Cinema Paradise", address="ул. Примерная, 123", city="Москва")
+            db.add(cinema)
+            added["cinemas"] = 1
+
+        if db.query(Hall.id).first() is None:
+            halls = [
+                Hall(cinema=cinema, name="Зал №1", hall_number=1, total_seats=100, rows=10, seats_per_row=10),
+                Hall(cinema=cinema, name="Зал №2", hall_number=2, total_seats=80, rows=8, seats_per_row=10),
+            ]
+            db.add_all(halls)
+            added["halls"] = len(halls)
+
+        # Получаем id новых строк без промежуточных commit
+        db.flush()
+
+        if db.query(Session.id).first() is None and movies and halls:
+            sessions = [
+                Session(movie_id=movies[0].id, hall_id=halls[0].id, start_time=datetime(2024, 1, 15, 14, 0), end_time=datetime(2024, 1, 15, 17, 12), date=datetime(2024, 1, 15), base_price=450, available_seats=100),
+                Session(movie_id=movies[1].id, hall_id=halls[1].id, start_time=datetime(2024, 1, 15, 16, 30), end_time=datetime(2024, 1, 15, 18, 40), date=datetime(2024, 1, 15), base_price=400, available_seats=80),
+                Session(movie_id=movies[2].id, hall_id=halls[0].id, start_time=datetime(2024, 1, 15, 19, 0), end_time=datetime(2024, 1, 15, 21, 41), date=datetime(2024, 1, 15), base_price=420, available_seats=100),
+            ]
+            db.add_all(sessions)
+            db.flush()
+            added["sessions"] = len(sessions)
+
+        if db.query(Ticket.id).first() is None and users and sessions:
+            # seat_number - сквозной номер места в зале, seat_row - его ряд (по 10 мест)
+            tickets = [
+                Ticket(user_id=users[0].id, session_id=sessions[0].id, seat_row=1, seat_number=5, price=450, final_price=450, status="booked", booking_reference="REF1", is_paid=True, booking_time=datetime(2024, 1, 15, 10, 30)),
+                Ticket(user_id=users[2].id, session_id=sessions[1].id, seat_row=1, seat_number=3, price=400, final_price=400, status="booked", booking_reference="REF2", is_paid=False, booking_time=datetime(2024, 1, 15, 11, 15)),
+            ]
+            db.add_all(tickets)
+            # Счётчики сеансов должны совпадать с билетами (app/session_counters.py)
+            for ticket, session in zip(tickets, sessions):
+                session.available_seats -= 1
+                session.is_sold_out = session.available_seats <= 0
+                if ticket.is_paid:
+                    session.sold_tickets = 1
+                else:
+                    session.reserved_tickets = 1
+            added["tickets"] = len(tickets)
+
+        db.commit()
+        if added:
+            # Проекция расписания для GET /sessions
+            rebuild(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return added
+
+
+if __name__ == "__main__":
+    result = init_db()
+    if result:
+        print("Добавлены демо данные: " + ", ".join(f"{name}={count}" for name, count in result.items()))
+    else:
+        print("Демо данные уже есть, ничего не добавлено")
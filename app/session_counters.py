@@ -0,0 +1,384 @@
+"""
+Счётчики мест сеанса и их сверка с билетами.
+
+Session.available_seats, sold_tickets, reserved_tickets и is_sold_out -
+денормализованные значения, по которым списки сеансов показывают наличие мест
+без подсчёта билетов. Они должны совпадать с билетами:
+
+    available_seats  = продаваемые места зала (total_seats без заблокированных
+                       в схеме, HallLayout.bookable_count) - билеты сеанса
+    sold_tickets     = оплаченные билеты (is_paid)
+    reserved_tickets = неоплаченные билеты (брони)
+    is_sold_out      = available_seats <= 0
+
+Каждое изменение счётчиков - один условный UPDATE в транзакции вместе с
+изменением билетов: уменьшаемый счётчик меняется, только если его хватает
+(x = x - :count WHERE x >= :count), без чтения значения в Python. Если
+условие не выполнено, счётчик уже разошёлся с билетами: строка не меняется,
+в лог пишется предупреждение, а значения исправит сверка.
+
+Сверка (reconcile_batch / reconcile_batch_async) берёт пачку сеансов по id и
+одним запросом с GROUP BY считает их билеты. Расхождения возвращаются и
+пишутся в лог; при fix=True исправляются условным UPDATE, который применяется,
+только если счётчики не изменились с момента подсчёта - параллельное
+бронирование не затирается, такой сеанс будет исправлен следующим проходом.
+Фоновая задача CounterReconciler проходит все сеансы раз в
+COUNTER_RECONCILE_INTERVAL секунд (0 - не запускается). Первый проход - через
+интервал после старта, а не сразу: полный GROUP BY по билетам в каждом воркере
+одновременно замедлил бы холодный старт и первые бронирования. Паузы
+случайно удлиняются до RECONCILE_JITTER интервала, чтобы проходы воркеров
+расходились во времени. Вручную:
+
+    python -m app.session_counters [--dry-run]
+
+Параметры окружения:
+
+    COUNTER_RECONCILE_INTERVAL=3600  # секунды между проходами сверки
+    COUNTER_RECONCILE_BATCH=200      # сеансов в одной транзакции сверки
+    COUNTER_RECONCILE_ON_START=0     # 1 - первый проход сразу при старте
+"""
+
+import asyncio
+from collections import Counter
+import logging
+import os
+import random
+from typing import Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import bindparam, case, func, select, update
+
+from .hall_layout import hall_layouts
+from .models import Hall, Session, Ticket
+from .schedule import sync_availability, sync_availability_async
+from .write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+COUNTER_RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+COUNTER_RECONCILE_BATCH = int(os.getenv("COUNTER_RECONCILE_BATCH", "200"))
+COUNTER_RECONCILE_ON_START = os.getenv("COUNTER_RECONCILE_ON_START", "0") == "1"
+# Доля интервала, на которую случайно удлиняется пауза между проходами
+RECONCILE_JITTER = 0.1
+
+_sessions = Session.__table__
+_tickets = Ticket.__table__
+_halls = Hall.__table__
+_SESSION_ID = bindparam("session_id")
+_COUNT = bindparam("count")
+_sold = func.coalesce(_sessions.c.sold_tickets, 0)
+_reserved = func.coalesce(_sessions.c.reserved_tickets, 0)
+
+# Бронирование: места списываются, только если их хватает; возвращает остаток
+RESERVE_SEATS = (
+    update(_sessions)
+    .where(_sessions.c.id == _SESSION_ID, _sessions.c.available_seats >= _COUNT)
+    .values(
+        available_seats=_sessions.c.available_seats - _COUNT,
+        reserved_tickets=_reserved + _COUNT,
+        is_sold_out=_sessions.c.available_seats - _COUNT <= 0,
+    )
+    .returning(_sessions.c.available_seats)
+)
+# Отмена неоплаченных билетов (в том числе снятие истёкших броней)
+RELEASE_RESERVED = (
+    update(_sessions)
+    .where(_sessions.c.id == _SESSION_ID, _reserved >= _COUNT)
+    .values(
+        available_seats=_sessions.c.available_seats + _COUNT,
+        reserved_tickets=_reserved - _COUNT,
+        is_sold_out=False,
+    )
+)
+# Отмена оплаченных билетов
+RELEASE_SOLD = (
+    update(_sessions)
+    .where(_sessions.c.id == _SESSION_ID, _sold >= _COUNT)
+    .values(
+        available_seats=_sessions.c.available_seats + _COUNT,
+        sold_tickets=_sold - _COUNT,
+        is_sold_out=False,
+    )
+)
+# Оплата брони и её отмена
+MARK_SOLD = (
+    update(_sessions)
+    .where(_sessions.c.id == _SESSION_ID, _reserved >= _COUNT)
+    .values(reserved_tickets=_reserved - _COUNT, sold_tickets=_sold + _COUNT)
+)
+MARK_UNSOLD = (
+    update(_sessions)
+    .where(_sessions.c.id == _SESSION_ID, _sold >= _COUNT)
+    .values(sold_tickets=_sold - _COUNT, reserved_tickets=_reserved + _COUNT)
+)
+
+# Пачка сеансов по id: отдельным подзапросом, чтобы GROUP BY считал только её
+_BATCH_IDS = (
+    select(_sessions.c.id)
+    .where(_sessions.c.id > bindparam("after"))
+    .order_by(_sessions.c.id)
+    .limit(bindparam("batch"))
+)
+# Счётчики пачки сеансов и их значения по билетам - один запрос с GROUP BY
+COUNTERS_BY_SESSION = (
+    select(
+        _sessions.c.id,
+        _sessions.c.available_seats,
+        _sold,
+        _reserved,
+        _sessions.c.is_sold_out,
+        _halls.c.id,
+        func.count(_tickets.c.id),
+        func.coalesce(func.sum(case((_tickets.c.is_paid, 1), else_=0)), 0),
+    )
+    .select_from(
+        _sessions
+        .join(_halls, _halls.c.id == _sessions.c.hall_id)
+        .outerjoin(_tickets, _tickets.c.session_id == _sessions.c.id)
+    )
+    .where(_sessions.c.id.in_(_BATCH_IDS.scalar_subquery()))
+    .group_by(_sessions.c.id, _halls.c.id)
+    .order_by(_sessions.c.id)
+)
+# Исправление, только если счётчики не изменились после подсчёта (executemany)
+FIX_COUNTERS = (
+    update(_sessions)
+    .where(
+        _sessions.c.id == _SESSION_ID,
+        _sessions.c.available_seats == bindparam("old_available"),
+        _sold == bindparam("old_sold"),
+        _reserved == bindparam("old_reserved"),
+    )
+    .values(
+        available_seats=bindparam("new_available"),
+        sold_tickets=bindparam("new_sold"),
+        reserved_tickets=bindparam("new_reserved"),
+        is_sold_out=bindparam("new_sold_out"),
+    )
+)
+
+
+class SessionCounters(NamedTuple):
+    available_seats: int
+    sold_tickets: int
+    reserved_tickets: int
+    is_sold_out: bool
+
+
+class CounterDrift(NamedTuple):
+    session_id: int
+    stored: SessionCounters
+    actual: SessionCounters
+
+    def as_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            **{field: {"stored": stored, "actual": actual}
+               for field, stored, actual in zip(SessionCounters._fields, self.stored, self.actual)
+               if stored != actual},
+        }
+
+
+class ReconcileBatch(NamedTuple):
+    last_session_id: int
+    checked: int
+    drift: List[CounterDrift]
+    fixed: int
+
+
+def _release_params(released: Iterable[Tuple[int, bool]]):
+    """(session_id, is_paid) отменённых билетов -> параметры RELEASE_RESERVED и RELEASE_SOLD"""
+    counts = Counter((session_id, bool(is_paid)) for session_id, is_paid in released)
+    unpaid = [{"session_id": sid, "count": count} for (sid, paid), count in counts.items() if not paid]
+    paid = [{"session_id": sid, "count": count} for (sid, paid), count in counts.items() if paid]
+    return unpaid, paid
+
+
+def _check_rowcount(result, expected: int, action: str):
+    # rowcount executemany может быть неизвестен (-1)
+    if 0 <= result.rowcount < expected:
+        logger.warning("Счётчики мест разошлись с билетами (%s): обновлено %s сеансов из %s",
+                       action, result.rowcount, expected)
+
+
+def release_seats(db, released: Iterable[Tuple[int, bool]]):
+    """Вернуть места отменённых билетов в счётчики (синхронная Session, без commit)"""
+    released = list(released)
+    for statement, params in zip((RELEASE_RESERVED, RELEASE_SOLD), _release_params(released)):
+        if params:
+            _check_rowcount(db.execute(statement, params), len(params), "отмена билетов")
+    sync_availability(db, [session_id for session_id, _ in released])
+
+
+async def release_seats_async(db, released: Iterable[Tuple[int, bool]]):
+    """Вернуть места отменённых билетов в счётчики (AsyncSession, без commit)"""
+    released = list(released)
+    for statement, params in zip((RELEASE_RESERVED, RELEASE_SOLD), _release_params(released)):
+        if params:
+            _check_rowcount(await db.execute(statement, params), len(params), "отмена билетов")
+    await sync_availability_async(db, [session_id for session_id, _ in released])
+
+
+def mark_sold(db, session_id: int, count: int = 1, paid: bool = True):
+    """Перенести билеты между reserved_tickets и sold_tickets (синхронная Session, без commit)"""
+    statement = MARK_SOLD if paid else MARK_UNSOLD
+    result = db.execute(statement, {"session_id": session_id, "count": count})
+    _check_rowcount(result, 1, "оплата" if paid else "отмена оплаты")
+
+
+async def mark_sold_async(db, session_id: int, count: int = 1, paid: bool = True):
+    """Перенести билеты между reserved_tickets и sold_tickets (AsyncSession, без commit)"""
+    statement = MARK_SOLD if paid else MARK_UNSOLD
+    result = await db.execute(statement, {"session_id": session_id, "count": count})
+    _check_rowcount(result, 1, "оплата" if paid else "отмена оплаты")
+
+
+def _drift(rows, bookable: dict) -> List[CounterDrift]:
+    """Расхождения пачки; bookable - продаваемые места по id зала"""
+    drift = []
+    for session_id, available, sold, reserved, sold_out, hall_id, tickets, paid in rows:
+        actual_available = bookable[hall_id] - tickets
+        stored = SessionCounters(available, sold, reserved, bool(sold_out))
+        actual = SessionCounters(actual_available, paid, tickets - paid, actual_available <= 0)
+        if stored != actual:
+            drift.append(CounterDrift(session_id, stored, actual))
+    return drift
+
+
+def _fix_params(drift: List[CounterDrift]) -> List[dict]:
+    return [{
+        "session_id": item.session_id,
+        "old_available": item.stored.available_seats,
+        "old_sold": item.stored.sold_tickets,
+        "old_reserved": item.stored.reserved_tickets,
+        "new_available": item.actual.available_seats,
+        "new_sold": item.actual.sold_tickets,
+        "new_reserved": item.actual.reserved_tickets,
+        "new_sold_out": item.actual.is_sold_out,
+    } for item in drift]
+
+
+def _report(drift: List[CounterDrift], fixed: int):
+    for item in drift:
+        logger.warning("Счётчики сеанса разошлись с билетами", extra=item.as_dict())
+    if drift:
+        logger.info("Сверка счётчиков", extra={"drift": len(drift), "fixed": fixed})
+
+
+def reconcile_batch(db, after: int = 0, batch: int = COUNTER_RECONCILE_BATCH, fix: bool = True) -> ReconcileBatch:
+    """Сверить сеансы с id > after (не больше batch) одной транзакцией (синхронная Session)"""
+    rows = db.execute(COUNTERS_BY_SESSION, {"after": after, "batch": batch}).all()
+    # Схемы залов кэшируются: обычно без запросов
+    bookable = {hall_id: hall_layouts.get(db, hall_id).bookable_count for hall_id in {row[5] for row in rows}}
+    drift = _drift(rows, bookable)
+    fixed = 0
+    if drift and fix:
+        fixed = db.execute(FIX_COUNTERS, _fix_params(drift)).rowcount
+        sync_availability(db, [item.session_id for item in drift])
+    db.commit()
+    _report(drift, fixed)
+    return ReconcileBatch(rows[-1][0] if rows else after, len(rows), drift, fixed)
+
+
+async def reconcile_batch_async(db, after: int = 0, batch: int = COUNTER_RECONCILE_BATCH,
+                                fix: bool = True) -> ReconcileBatch:
+    """Сверить сеансы с id > after (не больше batch) одной транзакцией (AsyncSession)"""
+    rows = (await db.execute(COUNTERS_BY_SESSION, {"after": after, "batch": batch})).all()
+    bookable = {hall_id: (await hall_layouts.get_async(db, hall_id)).bookable_count
+                for hall_id in {row[5] for row in rows}}
+    drift = _drift(rows, bookable)
+    fixed = 0
+    if drift and fix:
+        fixed = (await db.execute(FIX_COUNTERS, _fix_params(drift))).rowcount
+        await sync_availability_async(db, [item.session_id for item in drift])
+    await db.commit()
+    _report(drift, fixed)
+    return ReconcileBatch(rows[-1][0] if rows else after, len(rows), drift, fixed)
+
+
+def reconcile_all(db, batch: int = COUNTER_RECONCILE_BATCH, fix: bool = True) -> List[ReconcileBatch]:
+    """Сверить все сеансы пачками (синхронная Session)"""
+    results, after = [], 0
+    while True:
+        result = reconcile_batch(db, after, batch, fix)
+        results.append(result)
+        if result.checked < batch:
+            return results
+        after = result.last_session_id
+
+
+class CounterReconciler:
+    """Фоновая сверка счётчиков всех сеансов"""
+
+    def __init__(self, interval: float = COUNTER_RECONCILE_INTERVAL, batch: int = COUNTER_RECONCILE_BATCH,
+                 on_start: bool = COUNTER_RECONCILE_ON_START):
+        self.interval = interval
+        self.batch = batch
+        self.on_start = on_start
+        self._task = None
+
+    async def reconcile(self, fix: bool = True) -> List[CounterDrift]:
+        """Один проход по всем сеансам; пачки - через очередь записи"""
+        drift, after = [], 0
+        while True:
+            result = await write_queue.submit(
+                lambda db, after=after: reconcile_batch_async(db, after, self.batch, fix))
+            drift.extend(result.drift)
+            if result.checked < self.batch:
+                return drift
+            after = result.last_session_id
+
+    def _pause(self) -> float:
+        return self.interval * random.uniform(1.0, 1.0 + RECONCILE_JITTER)
+
+    async def _run(self):
+        if not self.on_start:
+            await asyncio.sleep(self._pause())
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка сверки счётчиков мест")
+            await asyncio.sleep(self._pause())
+
+    def start(self):
+        # Задача привязана к текущему event loop
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="counter-reconciler")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+counter_reconciler = CounterReconciler()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Сверка счётчиков мест сеансов с билетами")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать расхождения")
+    parser.add_argument("--batch", type=int, default=COUNTER_RECONCILE_BATCH)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        results = reconcile_all(db, args.batch, fix=not args.dry_run)
+    finally:
+        db.close()
+    for result in results:
+        for item in result.drift:
+            print(json.dumps(item.as_dict(), ensure_ascii=False))
+    print(f"Сеансов: {sum(r.checked for r in results)}, расхождений: {sum(len(r.drift) for r in results)}, "
+          f"исправлено: {sum(r.fixed for r in results)}")
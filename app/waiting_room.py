@@ -0,0 +1,321 @@
+"""
+Виртуальная очередь на бронирование (старт продаж премьеры).
+
+Одновременных транзакций бронирования не больше WAITING_ROOM_SESSION_SLOTS
+на сеанс и WAITING_ROOM_CINEMA_SLOTS на кинотеатр. Слот занимается на время
+транзакции (booking_slot) и освобождается после неё.
+
+- Пока очереди нет и слоты свободны, бронирование проходит сразу, без
+  пропуска: при обычной нагрузке очередь незаметна.
+- Иначе бронирование получает 429, клиент встаёт в очередь сеанса
+  (POST /sessions/{id}/waiting-room) и опрашивает позицию и оценку ожидания
+  (GET /sessions/{id}/waiting-room/{waiter_id}). Очередь - FIFO: освободившийся
+  слот кинотеатра получает самый ранний из ожидающих его сеансов.
+- Допущенный получает пропуск (token): слот закреплён за ним
+  WAITING_ROOM_TOKEN_TTL секунд, бронирование с заголовком X-Admission-Token
+  проходит без очереди. Неиспользованный пропуск истекает и слот переходит
+  следующему; ожидающий, который не опрашивал очередь дольше
+  WAITING_ROOM_POLL_TIMEOUT секунд, из неё удаляется.
+
+Очередь живёт в памяти процесса (как app/idempotency.py): при нескольких
+воркерах лимиты действуют на каждый воркер. Истёкшие пропуска и ожидающие
+снимает фоновая задача раз в секунду (start / stop).
+
+Параметры окружения:
+
+    WAITING_ROOM_SESSION_SLOTS=50   # транзакций бронирования на сеанс, 0 - без ограничения
+    WAITING_ROOM_CINEMA_SLOTS=200   # транзакций бронирования на кинотеатр, 0 - без ограничения
+    WAITING_ROOM_TOKEN_TTL=30       # секунды на использование пропуска
+    WAITING_ROOM_POLL_TIMEOUT=30    # секунды без опроса до удаления из очереди
+    WAITING_ROOM_MAX_QUEUE=10000    # ожидающих на сеанс
+"""
+
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+import itertools
+import logging
+import os
+import secrets
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+WAITING_ROOM_SESSION_SLOTS = int(os.getenv("WAITING_ROOM_SESSION_SLOTS", "50"))
+WAITING_ROOM_CINEMA_SLOTS = int(os.getenv("WAITING_ROOM_CINEMA_SLOTS", "200"))
+WAITING_ROOM_TOKEN_TTL = float(os.getenv("WAITING_ROOM_TOKEN_TTL", "30"))
+WAITING_ROOM_POLL_TIMEOUT = float(os.getenv("WAITING_ROOM_POLL_TIMEOUT", "30"))
+WAITING_ROOM_MAX_QUEUE = int(os.getenv("WAITING_ROOM_MAX_QUEUE", "10000"))
+
+ADMISSION_HEADER = "X-Admission-Token"
+# Интервал фонового снятия истёкших пропусков и ожидающих
+SWEEP_INTERVAL = 1.0
+# Начальная оценка времени слота и вес нового замера в скользящем среднем
+INITIAL_SLOT_SECONDS = 0.5
+SLOT_TIME_WEIGHT = 0.1
+
+
+class Admission:
+    """Занятый слот: пропуск из очереди или прямой вход"""
+
+    __slots__ = ("token", "session_id", "cinema_id", "issued_at", "expires_at", "in_use")
+
+    def __init__(self, session_id: int, cinema_id: int, token: str = None, ttl: float = 0):
+        self.token = token
+        self.session_id = session_id
+        self.cinema_id = cinema_id
+        self.issued_at = time.monotonic()
+        self.expires_at = self.issued_at + ttl
+        self.in_use = token is None
+
+
+class Waiter:
+    """Место в очереди сеанса"""
+
+    __slots__ = ("id", "seq", "session_id", "cinema_id", "joined_at", "last_seen", "admission", "dropped")
+
+    def __init__(self, waiter_id: str, seq: int, session_id: int, cinema_id: int):
+        self.id = waiter_id
+        self.seq = seq
+        self.session_id = session_id
+        self.cinema_id = cinema_id
+        self.joined_at = self.last_seen = time.monotonic()
+        self.admission = None
+        self.dropped = False
+
+
+class SessionQueue:
+    """FIFO ожидающих одного сеанса; ушедшие удаляются лениво, при выходе в голову"""
+
+    __slots__ = ("waiters", "next_seq", "head_seq")
+
+    def __init__(self):
+        self.waiters = deque()
+        self.next_seq = 0
+        self.head_seq = 0
+
+    def head(self) -> Optional[Waiter]:
+        while self.waiters and self.waiters[0].dropped:
+            self.pop()
+        return self.waiters[0] if self.waiters else None
+
+    def pop(self) -> Waiter:
+        waiter = self.waiters.popleft()
+        self.head_seq = waiter.seq + 1
+        return waiter
+
+
+class WaitingRoom:
+    """Слоты бронирования по сеансам и кинотеатрам и очереди ожидающих"""
+
+    def __init__(self, session_slots: int = WAITING_ROOM_SESSION_SLOTS, cinema_slots: int = WAITING_ROOM_CINEMA_SLOTS,
+                 token_ttl: float = WAITING_ROOM_TOKEN_TTL, poll_timeout: float = WAITING_ROOM_POLL_TIMEOUT,
+                 max_queue: int = WAITING_ROOM_MAX_QUEUE):
+        self.session_slots = session_slots
+        self.cinema_slots = cinema_slots
+        self.token_ttl = token_ttl
+        self.poll_timeout = poll_timeout
+        self.max_queue = max_queue
+        self._session_active = Counter()
+        self._cinema_active = Counter()
+        self._queues = {}
+        self._cinema_sessions = {}
+        self._waiters = {}
+        self._tokens = {}
+        self._ids = itertools.count(1)
+        self.slot_seconds = INITIAL_SLOT_SECONDS
+        self.admitted = self.rejected = self.expired = 0
+        self._task = None
+
+    def _has_slot(self, session_id: int, cinema_id: int) -> bool:
+        return ((not self.session_slots or self._session_active[session_id] < self.session_slots)
+                and (not self.cinema_slots or self._cinema_active[cinema_id] < self.cinema_slots))
+
+    def _queued(self, session_id: int, cinema_id: int) -> bool:
+        """Есть ли ожидающие, которые должны пройти раньше нового запроса"""
+        return any(self._queues[sid].head() for sid in self._cinema_sessions.get(cinema_id, ()))
+
+    def _take(self, session_id: int, cinema_id: int, token: str = None) -> Admission:
+        self._session_active[session_id] += 1
+        self._cinema_active[cinema_id] += 1
+        admission = Admission(session_id, cinema_id, token, self.token_ttl)
+        if token is not None:
+            self._tokens[token] = admission
+        return admission
+
+    def _free(self, admission: Admission):
+        self._session_active[admission.session_id] -= 1
+        if self._session_active[admission.session_id] <= 0:
+            del self._session_active[admission.session_id]
+        self._cinema_active[admission.cinema_id] -= 1
+        if self._cinema_active[admission.cinema_id] <= 0:
+            del self._cinema_active[admission.cinema_id]
+        if admission.token is not None:
+            self._tokens.pop(admission.token, None)
+
+    def _admit(self, cinema_id: int):
+        """Раздать свободные слоты кинотеатра ожидающим, самым ранним первыми"""
+        session_ids = self._cinema_sessions.get(cinema_id)
+        while session_ids:
+            heads = [self._queues[sid].head() for sid in session_ids if self._has_slot(sid, cinema_id)]
+            heads = [waiter for waiter in heads if waiter is not None]
+            if not heads:
+                break
+            waiter = min(heads, key=lambda waiter: waiter.joined_at)
+            self._queues[waiter.session_id].pop()
+            waiter.admission = self._take(waiter.session_id, cinema_id, secrets.token_urlsafe(16))
+            self.admitted += 1
+        self._cleanup(cinema_id)
+
+    def _cleanup(self, cinema_id: int):
+        session_ids = self._cinema_sessions.get(cinema_id, set())
+        for session_id in [sid for sid in session_ids if self._queues[sid].head() is None]:
+            session_ids.discard(session_id)
+            del self._queues[session_id]
+        if not session_ids:
+            self._cinema_sessions.pop(cinema_id, None)
+
+    def expire(self, now: float = None):
+        """Снять неиспользованные истёкшие пропуска и ожидающих, которые перестали опрашивать"""
+        now = now or time.monotonic()
+        cinemas = set()
+        for admission in [a for a in self._tokens.values() if not a.in_use and a.expires_at <= now]:
+            self._free(admission)
+            self.expired += 1
+            cinemas.add(admission.cinema_id)
+        for waiter in list(self._waiters.values()):
+            if waiter.admission is not None:
+                # Пропуск использован или истёк - ожидающий больше не нужен
+                if waiter.admission.token not in self._tokens:
+                    del self._waiters[waiter.id]
+            elif now - waiter.last_seen > self.poll_timeout:
+                del self._waiters[waiter.id]
+                waiter.dropped = True
+                cinemas.add(waiter.cinema_id)
+        for cinema_id in cinemas:
+            self._admit(cinema_id)
+
+    def try_enter(self, session_id: int, cinema_id: int) -> Optional[Admission]:
+        """Прямой вход без очереди: только если никто не ждёт и слот свободен"""
+        if self._queued(session_id, cinema_id) or not self._has_slot(session_id, cinema_id):
+            return None
+        return self._take(session_id, cinema_id)
+
+    def claim(self, token: str, session_id: int) -> Optional[Admission]:
+        """Использовать пропуск на бронирование сеанса; None - пропуск недействителен"""
+        admission = self._tokens.get(token)
+        if admission is None or admission.in_use or admission.session_id != session_id:
+            return None
+        if admission.expires_at <= time.monotonic():
+            return None
+        admission.in_use = True
+        return admission
+
+    def release(self, admission: Admission):
+        """Освободить слот после транзакции и допустить следующих"""
+        elapsed = time.monotonic() - admission.issued_at
+        self.slot_seconds += SLOT_TIME_WEIGHT * (elapsed - self.slot_seconds)
+        self._free(admission)
+        self._admit(admission.cinema_id)
+
+    def join(self, session_id: int, cinema_id: int) -> Waiter:
+        """Встать в очередь сеанса; при свободном слоте пропуск выдаётся сразу"""
+        queue = self._queues.get(session_id)
+        if queue is None:
+            queue = self._queues[session_id] = SessionQueue()
+        if len(queue.waiters) >= self.max_queue:
+            raise HTTPException(status_code=503, detail="Очередь на сеанс переполнена, попробуйте позже",
+                                headers={"Retry-After": "30"})
+        waiter = Waiter(f"w{next(self._ids)}{secrets.token_hex(4)}", queue.next_seq, session_id, cinema_id)
+        queue.next_seq += 1
+        queue.waiters.append(waiter)
+        self._waiters[waiter.id] = waiter
+        self._cinema_sessions.setdefault(cinema_id, set()).add(session_id)
+        self._admit(cinema_id)
+        return waiter
+
+    def status(self, waiter_id: str, session_id: int) -> Optional[dict]:
+        """Позиция и оценка ожидания, после допуска - пропуск; None - ожидающего нет"""
+        waiter = self._waiters.get(waiter_id)
+        if waiter is None or waiter.session_id != session_id:
+            return None
+        waiter.last_seen = time.monotonic()
+        if waiter.admission is not None:
+            return {
+                "waiter_id": waiter.id,
+                "status": "admitted",
+                "token": waiter.admission.token,
+                "token_expires_in": round(max(0.0, waiter.admission.expires_at - time.monotonic()), 1),
+            }
+        queue = self._queues.get(session_id)
+        position = waiter.seq - queue.head_seq + 1 if queue is not None else 1
+        slots = self.session_slots or self.cinema_slots or 1
+        eta = position * self.slot_seconds / slots
+        return {
+            "waiter_id": waiter.id,
+            "status": "waiting",
+            "position": position,
+            "eta_seconds": round(eta, 1),
+            # Ближе к голове очереди опрашивать чаще
+            "poll_after": round(min(5.0, max(0.2, eta / 2)), 1),
+        }
+
+    @asynccontextmanager
+    async def booking_slot(self, session_id: int, cinema_id: int, token: str = None):
+        """Слот на транзакцию бронирования: по пропуску или напрямую, иначе 429"""
+        admission = self.claim(token, session_id) if token else None
+        if admission is None:
+            admission = self.try_enter(session_id, cinema_id)
+        if admission is None:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail={"message": "Много покупателей, встаньте в очередь",
+                        "waiting_room": f"/sessions/{session_id}/waiting-room"},
+                headers={"Retry-After": "1"},
+            )
+        try:
+            yield admission
+        finally:
+            self.release(admission)
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self._session_active),
+            "active_slots": sum(self._cinema_active.values()),
+            "waiting": len(self._waiters),
+            "tokens": len(self._tokens),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "slot_seconds": round(self.slot_seconds, 3),
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                self.expire()
+            except Exception:
+                logger.exception("Ошибка обслуживания очереди бронирования")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+    def start(self):
+        # Задача привязана к текущему event loop
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="waiting-room")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+waiting_room = WaitingRoom()
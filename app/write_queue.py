@@ -0,0 +1,99 @@
+"""
+Очередь записи с единственным писателем.
+
+В режиме высокой конкуренции SQLite все бронирования выполняются по очереди
+одной фоновой задачей на отдельном соединении (см. create_sqlite_writer_engine).
+Читающие запросы идут через общий пул и в WAL режиме не ждут писателя.
+Для остальных СУБД задания выполняются сразу в новой сессии.
+"""
+
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import SQLITE_HIGH_CONCURRENCY, WriterSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueue:
+    """Последовательное выполнение заданий записи одной фоновой задачей"""
+
+    def __init__(self, session_factory, enabled: bool = True, maxsize: int = 10000):
+        self._session_factory = session_factory
+        self.enabled = enabled
+        self._maxsize = maxsize
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, job: WriteJob) -> T:
+        """
+        Выполнить задание записи и вернуть его результат.
+
+        job получает собственную AsyncSession писателя и сам делает commit;
+        незакоммиченные изменения откатываются при закрытии сессии.
+        """
+        if not self.enabled:
+            return await self._run(job)
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        # Контекст отправителя: статистика SQL запросов и т.п. относятся к его запросу
+        await self._queue.put((job, future, contextvars.copy_context()))
+        return await future
+
+    def _ensure_worker(self):
+        # Очередь создаётся лениво - она привязана к текущему event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+            self._worker = asyncio.create_task(self._work(), name="sqlite-writer")
+
+    async def _run(self, job: WriteJob):
+        async with self._session_factory() as db:
+            return await job(db)
+
+    async def _work(self):
+        while True:
+            job, future, context = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    result = await context.run(asyncio.ensure_future, self._run(job))
+                    if not future.cancelled():
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                self._queue.task_done()
+
+    @property
+    def pending(self) -> int:
+        """Количество заданий в очереди"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def stop(self):
+        """Дождаться выполнения поставленных заданий и остановить писателя"""
+        if self._worker is None:
+            return
+        if not self._worker.done():
+            await self._queue.join()
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+
+
+write_queue = WriteQueue(WriterSessionLocal, enabled=SQLITE_HIGH_CONCURRENCY)
@@ -0,0 +1,110 @@
+"""
+Бенчмарк: синхронная сессия внутри async-эндпоинта против AsyncSession.
+
+"До" - копия старых обработчиков /movies и /sessions, которые вызывают
+синхронный SessionLocal из async def и блокируют event loop на время запроса.
+"После" - текущие эндпоинты приложения на AsyncSession.
+
+Сетевая задержка БД (как у PostgreSQL на отдельном хосте) эмулируется через
+событие do_execute: синхронный драйвер ждёт через time.sleep (блокируя поток),
+асинхронный - через asyncio.sleep.
+
+При параллелизме выше pool_size + max_overflow старый вариант зависает до
+pool_timeout: соединения возвращаются в пул только после того, как
+освободится заблокированный event loop.
+
+Запуск:
+    python -m benchmarks.bench_async_db --requests 400 --concurrency 10 --latency-ms 2
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import (
+    use_temp_database, create_schema, seed_minimal, run_load, print_table,
+)
+
+
+def install_latency(latency_s: float):
+    """Добавить искусственную задержку перед каждым SQL запросом"""
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+    from app.database import engine, async_engine
+
+    @event.listens_for(engine, "do_execute")
+    def sync_latency(cursor, statement, parameters, context):
+        time.sleep(latency_s)
+
+    @event.listens_for(async_engine.sync_engine, "do_execute")
+    def async_latency(cursor, statement, parameters, context):
+        await_only(asyncio.sleep(latency_s))
+
+
+def mount_legacy_routes(app):
+    """Старые обработчики: синхронная сессия в async def"""
+    from fastapi import Depends
+    from app.database import get_db
+    from app.models import Movie, Hall, Session
+
+    @app.get("/_bench/legacy/movies")
+    async def legacy_movies(db=Depends(get_db)):
+        movies = db.query(Movie).all()
+        return [{
+            "id": movie.id,
+            "title": movie.title,
+            "duration": movie.duration_minutes,
+            "rating": movie.rating,
+            "genre": movie.genre.value
+        } for movie in movies]
+
+    @app.get("/_bench/legacy/sessions")
+    async def legacy_sessions(db=Depends(get_db)):
+        sessions = db.query(Session).all()
+        result = []
+        for session in sessions:
+            movie = db.query(Movie).filter(Movie.id == session.movie_id).first()
+            hall = db.query(Hall).filter(Hall.id == session.hall_id).first()
+            result.append({
+                "id": session.id,
+                "movie": {"title": movie.title},
+                "hall": {"name": hall.name, "capacity": hall.total_seats},
+                "available_seats": session.available_seats
+            })
+        return result
+
+
+async def main(args):
+    from app.main import app
+
+    create_schema()
+    seed_minimal(movies=20, halls=5, sessions=args.sessions)
+    install_latency(args.latency_ms / 1000.0)
+    mount_legacy_routes(app)
+
+    scenarios = [
+        ("movies (sync, before)", "/_bench/legacy/movies"),
+        ("movies (async, after)", "/movies"),
+        ("sessions (sync, before)", "/_bench/legacy/sessions"),
+        ("sessions (async, after)", "/sessions"),
+    ]
+    rows = []
+    for name, url in scenarios:
+        async def request(client, i, url=url):
+            return await client.get(url)
+        result = await run_load(app, request, total=args.requests, concurrency=args.concurrency)
+        rows.append({"name": name, **result})
+
+    print(f"latency={args.latency_ms}ms concurrency={args.concurrency} requests={args.requests}")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--sessions", type=int, default=5, help="Сеансов в базе (N+1 в /sessions)")
+    args = parser.parse_args()
+    use_temp_database("async_db")
+    asyncio.run(main(args))
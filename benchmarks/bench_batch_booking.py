@@ -0,0 +1,85 @@
+"""
+Бенчмарк группового бронирования: несколько POST /tickets против одного
+POST /tickets/batch.
+
+Каждая группа - --seats мест на каждом из --sessions сеансов (как заказ школы
+на несколько показов). Для обоих вариантов измеряется время группы и число
+SQL запросов (заголовок X-DB-Query-Count).
+
+Запуск:
+    python -m benchmarks.bench_batch_booking --groups 50 --sessions 5 --seats 10
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, percentile, print_table
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+
+
+async def run_variant(app, name: str, groups, batch: bool) -> dict:
+    import httpx
+
+    latencies, queries = [], 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for group in groups:
+            started = time.perf_counter()
+            if batch:
+                responses = [await client.post("/tickets/batch", json={"bookings": group}, headers=HEADERS)]
+            else:
+                responses = [await client.post("/tickets", json=booking, headers=HEADERS) for booking in group]
+            latencies.append(time.perf_counter() - started)
+            for response in responses:
+                response.raise_for_status()
+                queries += int(response.headers["x-db-query-count"])
+    ms = [value * 1000 for value in latencies]
+    return {
+        "name": name,
+        "groups": len(groups),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "queries_per_group": round(queries / len(groups), 1),
+    }
+
+
+def make_groups(count: int, sessions: int, seats: int, first_session: int):
+    """Группы на разных сеансах, места 1..seats"""
+    groups = []
+    for index in range(count):
+        start = first_session + index * sessions
+        groups.append([
+            {"session_id": session_id, "seat_numbers": list(range(1, seats + 1))}
+            for session_id in range(start, start + sessions)
+        ])
+    return groups
+
+
+async def main(args):
+    create_schema()
+    seed_minimal(users=1, sessions=2 * args.groups * args.sessions)
+
+    from app.main import app
+    from app.write_queue import write_queue
+
+    per_variant = args.groups * args.sessions
+    rows = [
+        await run_variant(app, "POST /tickets x N", make_groups(args.groups, args.sessions, args.seats, 1), False),
+        await run_variant(app, "POST /tickets/batch",
+                          make_groups(args.groups, args.sessions, args.seats, per_variant + 1), True),
+    ]
+    await write_queue.stop()
+    print(f"groups={args.groups} sessions/group={args.sessions} seats/session={args.seats}")
+    print_table(rows, columns=("name", "groups", "mean_ms", "p95_ms", "queries_per_group"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=5, help="Сеансов в группе")
+    parser.add_argument("--seats", type=int, default=10, help="Мест на сеанс (до 100)")
+    args = parser.parse_args()
+    use_temp_database("batch_booking")
+    asyncio.run(main(args))
@@ -0,0 +1,165 @@
+"""
+Бенчмарк подбора лучших мест (app/best_available.py).
+
+- finder: время find_best_seats на залах --seats мест при разной заполненности
+  против наивного перебора всех окон ряда по номерам мест;
+- endpoint: POST /sessions/{id}/best-available без брони (rps, задержки);
+- hold: подбор с бронью, пока в зале есть места рядом. Проверяется, что ни
+  одно место не продано дважды.
+
+Залы IMAX-подобные: 30 мест в ряду с двумя проходами, VIP ряды в середине.
+
+Запуск:
+    python -m benchmarks.bench_best_available --seats 500 1500 3000 --count 4
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, run_load, collect_load, print_table
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+SEATS_PER_ROW = 30
+
+
+def imax_seat_map(capacity: int) -> str:
+    """Ряды по 30 мест с проходами 6 | 18 | 6, средняя треть рядов - VIP"""
+    rows, rest = divmod(capacity, SEATS_PER_ROW)
+    lines = []
+    for row in range(rows):
+        cell = "V" if rows // 3 <= row < 2 * rows // 3 else "S"
+        lines.append(cell * 6 + "." + cell * 18 + "." + cell * 6)
+    if rest:
+        lines.append("S" * rest)
+    return json.dumps({"rows": lines})
+
+
+def naive_best_seats(layout, seat_map, count: int):
+    """Перебор всех окон каждого ряда с проверкой каждого места"""
+    center_row = (layout.row_count + 1) / 2
+    best = None
+    for row in range(1, layout.row_count + 1):
+        seats = list(layout.row_seats(row))
+        row_center = (seats[0] + seats[-1]) / 2
+        for index in range(len(seats) - count + 1):
+            window = seats[index:index + count]
+            if layout.column_of[window[-1]] - layout.column_of[window[0]] != count - 1:
+                continue
+            if any(seat_map.is_taken(seat) or not layout.is_bookable(seat) for seat in window):
+                continue
+            score = (abs(row - center_row), abs(window[0] + (count - 1) / 2 - row_center))
+            if best is None or score < best[0]:
+                best = (score, window)
+    return best[1] if best else None
+
+
+def finder_timings(capacity: int, occupancy: float, count: int, iterations: int, seed: int = 42) -> dict:
+    """Микросекунды на вызов: find_best_seats против наивного перебора"""
+    from app.best_available import find_best_seats
+    from app.hall_layout import HallLayout
+    from app.seat_inventory import SeatMap
+
+    rng = random.Random(seed)
+    layout = HallLayout.from_seat_map(0, None, imax_seat_map(capacity))
+    sold = rng.sample(range(1, capacity + 1), int(capacity * occupancy))
+    seat_map = SeatMap.from_rows(capacity, ((seat, False) for seat in sold))
+
+    timings = {}
+    for name, finder in (("finder_us", lambda: find_best_seats(layout, seat_map, count, "vip")),
+                         ("naive_us", lambda: naive_best_seats(layout, seat_map, count))):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            finder()
+        timings[name] = round((time.perf_counter() - started) / iterations * 1_000_000, 1)
+    return {"seats": capacity, "occupancy": occupancy, **timings}
+
+
+def seed_imax_halls(capacities):
+    """Первые залы seed_minimal превращаются в залы IMAX нужной вместимости"""
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models import Hall, Session
+
+    db = SessionLocal()
+    try:
+        for hall_id, capacity in enumerate(capacities, start=1):
+            db.execute(update(Hall).where(Hall.id == hall_id).values(
+                total_seats=capacity, rows=-(-capacity // SEATS_PER_ROW), seats_per_row=SEATS_PER_ROW,
+                seat_map=imax_seat_map(capacity)))
+            db.execute(update(Session).where(Session.hall_id == hall_id).values(available_seats=capacity))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def main(args):
+    rows = [finder_timings(capacity, occupancy, args.count, args.iterations)
+            for capacity in args.seats for occupancy in (0.0, 0.5, 0.9)]
+    print(f"find_best_seats count={args.count} seat_type=vip")
+    print_table(rows, columns=("seats", "occupancy", "finder_us", "naive_us"))
+
+    create_schema()
+    # Сеанс i идёт в зале i (залов столько же, сколько вместимостей)
+    seed_minimal(users=1, halls=len(args.seats), sessions=len(args.seats))
+    seed_imax_halls(args.seats)
+
+    from sqlalchemy import func, select
+    from app.main import app
+    from app.database import SessionLocal
+    from app.models import Ticket
+    from app.write_queue import write_queue
+
+    rows = []
+    for session_id, capacity in enumerate(args.seats, start=1):
+        async def lookup(client, i, session_id=session_id):
+            return await client.post(f"/sessions/{session_id}/best-available",
+                                     json={"count": args.count, "seat_type": "vip"})
+
+        rows.append({"name": "endpoint", "seats": capacity,
+                     **await run_load(app, lookup, args.requests, args.concurrency)})
+
+        async def hold(client, i, session_id=session_id):
+            return await client.post(f"/sessions/{session_id}/best-available",
+                                     json={"count": args.count, "hold": True}, headers=HEADERS)
+
+        # Бронирований больше, чем помещается в зал: лишние получают 409
+        total = capacity // args.count + args.concurrency
+        latencies, statuses, elapsed = await collect_load(app, hold, total, args.concurrency)
+        rows.append({"name": "hold", "seats": capacity, "requests": len(latencies),
+                     "rps": round(len(latencies) / elapsed, 1), "held": statuses[200], "conflicts": statuses[409],
+                     "errors": sum(count for status, count in statuses.items() if status not in (200, 409))})
+    await write_queue.stop()
+
+    db = SessionLocal()
+    try:
+        double_sold = db.execute(
+            select(func.count()).select_from(
+                select(Ticket.session_id, Ticket.seat_number)
+                .group_by(Ticket.session_id, Ticket.seat_number)
+                .having(func.count() > 1)
+                .subquery())
+        ).scalar()
+    finally:
+        db.close()
+
+    print(f"\nrequests={args.requests} concurrency={args.concurrency} count={args.count}")
+    print_table(rows, columns=("name", "seats", "requests", "rps", "p50_ms", "p95_ms", "p99_ms",
+                               "held", "conflicts", "errors"))
+    print(f"double_sold={double_sold}")
+    if double_sold:
+        raise SystemExit("Одно место продано дважды")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, nargs="+", default=[500, 1500, 3000], help="Вместимость залов")
+    parser.add_argument("--count", type=int, default=4, help="Мест рядом")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200, help="Вызовов на замер find_best_seats")
+    args = parser.parse_args()
+    use_temp_database("best_available")
+    asyncio.run(main(args))
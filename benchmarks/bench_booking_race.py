@@ -0,0 +1,159 @@
+"""
+Стресс-тест гонки бронирований: тысячи параллельных POST /tickets на один сеанс.
+
+Несколько процессов (как воркеры uvicorn) бронируют случайные группы по
+1-4 места одного сеанса, так что запросы постоянно конкурируют за одни и те же
+места. После прогона по базе проверяются инварианты:
+
+- ни одно место не продано дважды;
+- число билетов равно числу мест в успешных (200) ответах;
+- available_seats + билеты = вместимость зала, reserved_tickets = билеты.
+
+Конфликты отвечают 409, "database is locked" и прочие сбои попадают в errors.
+Режимы: журнал по умолчанию (транзакции процессов конкурируют напрямую) и
+WAL + единственный писатель (DB_SQLITE_HIGH_CONCURRENCY).
+
+Запуск:
+    python -m benchmarks.bench_booking_race --processes 4 --requests 1000 --concurrency 50 --seats 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ROOT_DIR, use_temp_database, collect_load, summarize, print_table
+
+
+def seed(seats: int, users: int):
+    """Один сеанс в зале на seats мест и пользователи user0..userN"""
+    from sqlalchemy import update
+    from benchmarks.common import create_schema, seed_minimal
+    from app.database import SessionLocal
+    from app.models import Hall, Session
+
+    create_schema()
+    seed_minimal(movies=1, halls=1, sessions=1, users=users)
+    db = SessionLocal()
+    try:
+        db.execute(update(Hall).values(total_seats=seats, rows=-(-seats // 50), seats_per_row=50))
+        db.execute(update(Session).values(available_seats=seats))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def worker_main(args):
+    """Нагрузка одного процесса; результат - JSON в файл args.output"""
+    from app.main import app
+
+    rng = random.Random(args.process_index)
+    headers = {"Authorization": f"Bearer demo_token_user{args.process_index}"}
+    booked = []
+
+    async def request(client, i):
+        seats = rng.sample(range(1, args.seats + 1), rng.randint(1, 4))
+        response = await client.post("/tickets", json={"session_id": 1, "seat_numbers": seats}, headers=headers)
+        if response.status_code == 200:
+            booked.extend(seats)
+        return response
+
+    latencies, statuses, elapsed = await collect_load(app, request, args.requests, args.concurrency)
+    with open(args.output, "w") as f:
+        json.dump({"latencies": latencies, "statuses": dict(statuses), "elapsed": elapsed, "booked": booked}, f)
+
+
+def check_database(url: str, session_id: int = 1) -> dict:
+    """Инварианты сеанса session_id после прогона"""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        tickets, distinct_seats = conn.execute(
+            text("SELECT COUNT(*), COUNT(DISTINCT seat_number) FROM tickets WHERE session_id = :session_id"),
+            {"session_id": session_id},
+        ).one()
+        available, reserved, capacity = conn.execute(text(
+            "SELECT s.available_seats, s.reserved_tickets, h.total_seats "
+            "FROM sessions s JOIN halls h ON h.id = s.hall_id WHERE s.id = :session_id"
+        ), {"session_id": session_id}).one()
+    engine.dispose()
+    return {
+        "tickets": tickets,
+        "double_sold": tickets - distinct_seats,
+        "counter_drift": capacity - available - tickets,
+        "reserved_drift": reserved - tickets,
+    }
+
+
+def run_mode(args, base_url: str, high_concurrency: bool) -> dict:
+    env = dict(os.environ)
+    env["DB_SQLITE_HIGH_CONCURRENCY"] = "1" if high_concurrency else "0"
+    env["DATABASE_URL"] = base_url.replace(".db", f"_{int(high_concurrency)}.db")
+
+    code = f"from benchmarks.bench_booking_race import seed\nseed({args.seats}, {args.processes})\n"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, check=True)
+
+    outputs = [f"{env['DATABASE_URL'][len('sqlite:///'):]}.worker{p}.json" for p in range(args.processes)]
+    started = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_booking_race", "--worker",
+             "--process-index", str(p), "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+             "--seats", str(args.seats), "--output", outputs[p]],
+            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        for p in range(args.processes)
+    ]
+    latencies, statuses, booked = [], {}, []
+    for proc, output in zip(procs, outputs):
+        proc.wait()
+        with open(output) as f:
+            data = json.load(f)
+        latencies.extend(data["latencies"])
+        booked.extend(data["booked"])
+        for status, count in data["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status not in ("200", "409"))
+    result = summarize(latencies, elapsed, errors)
+    result["statuses"] = statuses
+    result.update(check_database(env["DATABASE_URL"]))
+    result["response_drift"] = result["tickets"] - len(booked)
+    return result
+
+
+def main(args):
+    use_temp_database("booking_race")
+    base_url = os.environ["DATABASE_URL"]
+    rows = []
+    for name, mode in (("default journal", False), ("WAL + single writer", True)):
+        rows.append({"name": name, **run_mode(args, base_url, mode)})
+    print(f"processes={args.processes} requests/process={args.requests} "
+          f"concurrency={args.concurrency} seats={args.seats}")
+    print_table(rows, columns=("name", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "statuses", "tickets",
+                               "double_sold", "counter_drift", "reserved_drift", "response_drift"))
+    if any(row["double_sold"] or row["counter_drift"] or row["reserved_drift"] or row["response_drift"]
+           for row in rows):
+        sys.exit("Нарушены инварианты бронирования")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=1000, help="Бронирований на процесс")
+    parser.add_argument("--concurrency", type=int, default=50, help="Параллельных запросов в процессе")
+    parser.add_argument("--seats", type=int, default=2000, help="Вместимость зала")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--process-index", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(worker_main(args))
+    else:
+        main(args)
@@ -0,0 +1,170 @@
+"""
+Бенчмарк проверки билетов на входе в зал (app/checkin.py).
+
+Сеанс на --tickets оплаченных билетов, --scanners сканеров одновременно
+проверяют все билеты, --duplicates доля билетов сканируется повторно.
+
+- direct: на каждое сканирование SELECT по booking_reference и условный
+  UPDATE с commit через очередь записи;
+- index: CheckinService.scan по индексу в памяти, отметки пишутся пачками
+  (время записи хвоста - flush_ms);
+- endpoint: POST /sessions/{id}/check-in с проверкой сотрудника.
+
+Проверяется, что повторы отклонены ровно все и в БД отмечен каждый билет один раз.
+
+Запуск:
+    python -m benchmarks.bench_checkin --tickets 3000 --scanners 20 --duplicates 0.05
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+import random
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, percentile, run_load, print_table
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+
+
+def seed(sessions: int, tickets: int):
+    """Сеансы через 10 минут в зале на tickets мест, все места проданы и оплачены"""
+    from sqlalchemy import insert, update
+    from app.database import SessionLocal
+    from app.models import Hall, Session, Ticket, User, UserRole
+
+    create_schema()
+    seed_minimal(movies=1, halls=1, sessions=sessions, users=1)
+    start = datetime.utcnow() + timedelta(minutes=10)
+    db = SessionLocal()
+    try:
+        db.execute(update(User).values(role=UserRole.MANAGER))
+        db.execute(update(Hall).values(total_seats=tickets, rows=-(-tickets // 50), seats_per_row=50))
+        db.execute(update(Session).values(start_time=start, end_time=start + timedelta(hours=2), available_seats=0,
+                                          sold_tickets=tickets, reserved_tickets=0, is_sold_out=True))
+        for session_id in range(1, sessions + 1):
+            db.execute(insert(Ticket), [
+                {"session_id": session_id, "user_id": 1, "seat_row": seat // 50 + 1, "seat_number": seat,
+                 "price": 400, "final_price": 400, "booking_reference": f"S{session_id}T{seat:06d}",
+                 "status": "paid", "is_paid": True}
+                for seat in range(1, tickets + 1)
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def scan_order(session_id: int, tickets: int, duplicates: float, seed: int = 42) -> list:
+    references = [f"S{session_id}T{seat:06d}" for seat in range(1, tickets + 1)]
+    rng = random.Random(seed)
+    order = references + rng.sample(references, int(tickets * duplicates))
+    rng.shuffle(order)
+    return order
+
+
+async def direct_scan(session_id: int, reference: str) -> int:
+    """Проверка и отметка прохода в БД на каждое сканирование"""
+    from app.checkin import MARK_USED, TICKET_BY_REFERENCE
+    from app.write_queue import write_queue
+
+    async def job(db):
+        row = (await db.execute(TICKET_BY_REFERENCE, {"reference": reference})).first()
+        if row is None or row.session_id != session_id:
+            return 404
+        marked = (await db.execute(MARK_USED, {"ticket_id": row.id, "scanned_at": datetime.utcnow()})).rowcount
+        await db.commit()
+        return 200 if marked else 409
+
+    return await write_queue.submit(job)
+
+
+async def indexed_scan(session_id: int, reference: str) -> int:
+    from fastapi import HTTPException
+    from app.checkin import checkin
+
+    try:
+        await checkin.scan(session_id, reference)
+        return 200
+    except HTTPException as exc:
+        return exc.status_code
+
+
+async def run_scanners(scan, session_id: int, order: list, scanners: int) -> dict:
+    latencies, statuses = [], Counter()
+    queue = iter(order)
+
+    async def scanner():
+        for reference in queue:
+            started = time.perf_counter()
+            statuses[await scan(session_id, reference)] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(scanner() for _ in range(scanners)))
+    elapsed = time.perf_counter() - started
+    ms = [value * 1000 for value in latencies]
+    return {"scans": len(order), "rps": round(len(order) / elapsed, 1),
+            "p50_ms": round(percentile(ms, 50), 3), "p99_ms": round(percentile(ms, 99), 3),
+            "admitted": statuses[200], "rejected": statuses[409]}
+
+
+def used_tickets(session_id: int) -> int:
+    from sqlalchemy import func, select
+    from app.database import SessionLocal
+    from app.models import Ticket
+
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).where(Ticket.session_id == session_id, Ticket.used_time.isnot(None)))
+    finally:
+        db.close()
+
+
+async def main(args):
+    seed(3, args.tickets)
+
+    from app.main import app
+    from app.checkin import checkin
+    from app.write_queue import write_queue
+
+    rows = []
+    rows.append({"name": "direct", **await run_scanners(
+        direct_scan, 1, scan_order(1, args.tickets, args.duplicates), args.scanners)})
+
+    started = time.perf_counter()
+    preloaded = await checkin.preload()
+    preload_ms = (time.perf_counter() - started) * 1000
+    row = await run_scanners(indexed_scan, 2, scan_order(2, args.tickets, args.duplicates), args.scanners)
+    started = time.perf_counter()
+    await checkin.flush()
+    rows.append({"name": "index", **row, "flush_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    order = scan_order(3, args.tickets, args.duplicates)
+
+    async def scan_request(client, i):
+        return await client.post("/sessions/3/check-in", json={"booking_reference": order[i]}, headers=HEADERS)
+
+    rows.append({"name": "endpoint", "scans": len(order),
+                 **await run_load(app, scan_request, len(order), args.scanners, ok_statuses=(200, 409))})
+    await checkin.flush()
+    await write_queue.stop()
+
+    print(f"tickets={args.tickets} scanners={args.scanners} duplicates={args.duplicates} "
+          f"preload: {preloaded} sessions in {preload_ms:.1f} ms")
+    print_table(rows, columns=("name", "scans", "rps", "p50_ms", "p99_ms", "admitted", "rejected", "errors", "flush_ms"))
+    for session_id, row in enumerate(rows, start=1):
+        used = used_tickets(session_id)
+        if used != args.tickets or row.get("admitted", args.tickets) != args.tickets:
+            raise SystemExit(f"Сеанс {session_id}: отмечено в БД {used}, пропущено {row.get('admitted')}")
+    print("every ticket admitted once and marked used in the database")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=3000, help="Билетов на сеанс")
+    parser.add_argument("--scanners", type=int, default=20, help="Одновременных сканеров")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Доля повторных сканирований")
+    args = parser.parse_args()
+    use_temp_database("checkin")
+    asyncio.run(main(args))
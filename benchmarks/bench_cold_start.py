@@ -0,0 +1,100 @@
+"""
+Бенчмарк холодного старта stable_api.py.
+
+Запускает сервер несколько раз на свободном порту и измеряет время от запуска
+процесса до первого успешного ответа GET /health и GET /movies. Сравниваются
+обычный старт (без работы со схемой и данными) и старт с SEED_DEMO_DATA=1.
+
+Запуск:
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import ROOT_DIR, use_temp_database, create_schema, seed_minimal, print_table
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> bool:
+    """Опрашивать url до первого ответа 200"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def measure(env: dict, timeout: float) -> dict:
+    """Один запуск сервера: секунды до первого ответа /health и /movies"""
+    port = free_port()
+    env = {**env, "API_HOST": "127.0.0.1", "API_PORT": str(port)}
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, "stable_api.py")],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        health_ok = wait_for(f"{base}/health", deadline)
+        health = time.perf_counter() - started
+        movies_ok = health_ok and wait_for(f"{base}/movies", deadline)
+        movies = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+    if not movies_ok:
+        raise RuntimeError(f"Сервер не ответил за {timeout} с")
+    return {"health": health, "movies": movies}
+
+
+def run_scenario(name: str, env: dict, runs: int, timeout: float) -> dict:
+    results = [measure(env, timeout) for _ in range(runs)]
+    health = [r["health"] * 1000 for r in results]
+    movies = [r["movies"] * 1000 for r in results]
+    return {
+        "name": name,
+        "runs": runs,
+        "health_min_ms": round(min(health), 1),
+        "health_median_ms": round(statistics.median(health), 1),
+        "movies_min_ms": round(min(movies), 1),
+        "movies_median_ms": round(statistics.median(movies), 1),
+    }
+
+
+def main(args):
+    use_temp_database("cold_start")
+    create_schema()
+    seed_minimal()
+
+    env = dict(os.environ)
+    env.pop("SEED_DEMO_DATA", None)
+    rows = [run_scenario("default", env, args.runs, args.timeout)]
+    if not args.skip_seed:
+        rows.append(run_scenario("SEED_DEMO_DATA=1", {**env, "SEED_DEMO_DATA": "1"}, args.runs, args.timeout))
+    print_table(rows, columns=("name", "runs", "health_min_ms", "health_median_ms", "movies_min_ms", "movies_median_ms"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Максимальное время старта, секунды")
+    parser.add_argument("--skip-seed", action="store_true", help="Не запускать сценарий SEED_DEMO_DATA=1")
+    main(parser.parse_args())
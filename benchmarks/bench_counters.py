@@ -0,0 +1,103 @@
+"""
+Бенчмарк сверки счётчиков мест сеансов (app/session_counters.py).
+
+База заполняется генератором (app/datagen.py, счётчики согласованы с
+билетами), затем:
+
+- clean: проход сверки без расхождений;
+- drift: у --drift случайных сеансов счётчики портятся, проход с исправлением
+  должен найти ровно их, повторный проход - ни одного;
+- страница списка сеансов (--page сеансов): наличие мест из счётчиков против
+  подсчёта билетов JOIN + GROUP BY на каждый запрос.
+
+Запуск:
+    python -m benchmarks.bench_counters --tickets 1000000 --drift 500
+"""
+
+import argparse
+from dataclasses import replace
+import random
+import time
+
+from benchmarks.common import use_temp_database, create_schema, print_table
+
+
+def timed(fn, repeat: int = 1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main(args):
+    create_schema()
+    from sqlalchemy import func, select, update
+    from app import datagen
+    from app.database import SessionLocal
+    from app.models import Session, Ticket
+    from app.session_counters import reconcile_all
+
+    settings = replace(datagen.PRESETS["small"], tickets=args.tickets, days=args.days, reviews=0)
+    generated = datagen.generate(settings)
+    print(f"sessions={generated['sessions']} tickets={generated['tickets']} batch={args.batch}")
+
+    db = SessionLocal()
+    try:
+        rows = []
+
+        def reconcile(fix: bool):
+            return reconcile_all(db, args.batch, fix=fix)
+
+        def summary(name, results, ms):
+            rows.append({"name": name, "sessions": sum(r.checked for r in results),
+                         "drift": sum(len(r.drift) for r in results),
+                         "fixed": sum(r.fixed for r in results), "ms": round(ms, 1)})
+
+        results, ms = timed(lambda: reconcile(False))
+        summary("clean", results, ms)
+
+        session_ids = db.scalars(select(Session.id)).all()
+        broken = set(random.Random(args.seed).sample(session_ids, min(args.drift, len(session_ids))))
+        db.execute(update(Session).where(Session.id.in_(broken)).values(
+            available_seats=Session.available_seats + 1, reserved_tickets=func.coalesce(Session.reserved_tickets, 0) + 2))
+        db.commit()
+        results, ms = timed(lambda: reconcile(True))
+        summary("drift + fix", results, ms)
+        found = {item.session_id for result in results for item in result.drift}
+        results, ms = timed(lambda: reconcile(False))
+        summary("after fix", results, ms)
+        print_table(rows, columns=("name", "sessions", "drift", "fixed", "ms"))
+
+        page_ids = sorted(session_ids)[:args.page]
+        counters = select(Session.id, Session.available_seats, Session.is_sold_out).where(Session.id.in_(page_ids))
+        counted = (
+            select(Session.id, func.count(Ticket.id))
+            .outerjoin(Ticket, Ticket.session_id == Session.id)
+            .where(Session.id.in_(page_ids))
+            .group_by(Session.id)
+        )
+        _, counters_ms = timed(lambda: db.execute(counters).all(), args.repeat)
+        _, counted_ms = timed(lambda: db.execute(counted).all(), args.repeat)
+        print()
+        print_table([{"name": "counters", "page": len(page_ids), "ms": round(counters_ms, 3)},
+                     {"name": "count tickets", "page": len(page_ids), "ms": round(counted_ms, 3)}],
+                    columns=("name", "page", "ms"))
+    finally:
+        db.close()
+
+    if found != broken or rows[-1]["drift"]:
+        raise SystemExit("Сверка нашла не те сеансы или не исправила расхождения")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=30, help="Дней расписания генератора")
+    parser.add_argument("--drift", type=int, default=500, help="Сеансов с испорченными счётчиками")
+    parser.add_argument("--batch", type=int, default=200, help="Сеансов в транзакции сверки")
+    parser.add_argument("--page", type=int, default=100, help="Сеансов на странице списка")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    use_temp_database("counters")
+    main(args)
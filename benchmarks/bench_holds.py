@@ -0,0 +1,135 @@
+"""
+Бенчмарк снятия истёкших временных броней.
+
+В базе --tickets обычных билетов и --holds временных броней, из которых
+--expired уже истекли. Замеряется полный проход HoldSweeper.sweep() (пачки по
+--batch) и один запрос выбора пачки с частичным индексом и без него
+(NOT INDEXED - полный просмотр таблицы билетов). После прохода проверяется,
+что счётчики сеансов сошлись с билетами.
+
+Запуск:
+    python -m benchmarks.bench_holds --tickets 500000 --holds 50000 --expired 25000
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import time
+
+from benchmarks.common import use_temp_database, create_schema, print_table
+
+SEATS_PER_SESSION = 1000
+
+
+def seed(tickets: int, holds: int, expired: int):
+    """Сеансы по 1000 мест: сначала обычные билеты, затем брони"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import User, Movie, Cinema, Hall, Session, Ticket, UserRole, MovieGenre
+
+    total = tickets + holds
+    sessions = -(-total // SEATS_PER_SESSION)
+    now = datetime.utcnow()
+    start = datetime(2024, 1, 15, 19, 0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [{"username": "bench", "email": "bench@cinema.com", "hashed_password": "x",
+                                   "first_name": "Bench", "last_name": "User", "role": UserRole.CUSTOMER}])
+        db.execute(insert(Movie), [{"title": "Фильм", "duration_minutes": 120, "genre": MovieGenre.DRAMA}])
+        db.execute(insert(Cinema), [{"name": "Cinema Paradise", "address": "ул. Примерная, 123", "city": "Москва"}])
+        db.execute(insert(Hall), [{"cinema_id": 1, "name": "Зал", "hall_number": 1, "total_seats": SEATS_PER_SESSION,
+                                   "rows": 20, "seats_per_row": 50}])
+        rows = []
+        for index in range(total):
+            session_id, seat = divmod(index, SEATS_PER_SESSION)
+            row = {"session_id": session_id + 1, "user_id": 1, "seat_row": seat // 50 + 1, "seat_number": seat + 1,
+                   "price": 400, "final_price": 400, "booking_reference": f"H{index:012d}",
+                   "status": "booked", "hold_expires_at": None}
+            if index >= tickets:
+                hold = index - tickets
+                row["status"] = "reserved"
+                row["hold_expires_at"] = now - timedelta(seconds=hold + 1) if hold < expired \
+                    else now + timedelta(minutes=15)
+            rows.append(row)
+        booked = [0] * sessions
+        holds_by_session = [0] * sessions
+        for row in rows:
+            if row["hold_expires_at"] is None:
+                booked[row["session_id"] - 1] += 1
+            else:
+                holds_by_session[row["session_id"] - 1] += 1
+        db.execute(insert(Session), [
+            {"id": i + 1, "movie_id": 1, "hall_id": 1, "start_time": start, "end_time": start, "date": start,
+             "base_price": 400, "available_seats": SEATS_PER_SESSION - booked[i] - holds_by_session[i],
+             "reserved_tickets": booked[i] + holds_by_session[i]}
+            for i in range(sessions)
+        ])
+        for offset in range(0, len(rows), 50000):
+            db.execute(insert(Ticket), rows[offset:offset + 50000])
+        db.commit()
+    finally:
+        db.close()
+
+
+def select_timings(iterations: int, batch: int) -> dict:
+    """Выбор пачки истёкших броней: частичный индекс против полного просмотра"""
+    from sqlalchemy import text
+    from app.database import engine
+
+    query = ("SELECT id FROM tickets {hint} WHERE hold_expires_at IS NOT NULL AND hold_expires_at <= :now "
+             "AND status = 'reserved' ORDER BY hold_expires_at LIMIT :batch")
+    params = {"now": datetime.utcnow(), "batch": batch}
+    result = {}
+    with engine.connect() as conn:
+        for name, hint in (("select_index_ms", ""), ("select_scan_ms", "NOT INDEXED")):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                conn.execute(text(query.format(hint=hint)), params).all()
+            result[name] = round((time.perf_counter() - started) / iterations * 1000, 3)
+    return result
+
+
+def counters_drift() -> int:
+    """Сеансы, у которых available_seats + билеты != вместимость"""
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM sessions s WHERE s.available_seats + "
+            "(SELECT COUNT(*) FROM tickets t WHERE t.session_id = s.id) != :seats"
+        ), {"seats": SEATS_PER_SESSION}).scalar()
+
+
+async def main(args):
+    create_schema()
+    seed(args.tickets, args.holds, args.expired)
+
+    from app.holds import HoldSweeper
+    from app.write_queue import write_queue
+
+    row = {"tickets": args.tickets, "holds": args.holds, "expired": args.expired, "batch": args.batch}
+    row.update(select_timings(args.iterations, args.batch))
+
+    sweeper = HoldSweeper(interval=0, batch=args.batch)
+    started = time.perf_counter()
+    released = await sweeper.sweep()
+    elapsed = time.perf_counter() - started
+    await write_queue.stop()
+
+    row.update(released=released, sweep_s=round(elapsed, 3),
+               holds_per_s=round(released / elapsed) if elapsed else 0, counter_drift=counters_drift())
+    print_table([row], columns=("tickets", "holds", "expired", "batch", "select_index_ms", "select_scan_ms",
+                                "released", "sweep_s", "holds_per_s", "counter_drift"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200000, help="Обычных билетов")
+    parser.add_argument("--holds", type=int, default=30000, help="Временных броней")
+    parser.add_argument("--expired", type=int, default=20000, help="Из них истёкших")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=20, help="Повторов запроса выбора пачки")
+    args = parser.parse_args()
+    use_temp_database("holds")
+    asyncio.run(main(args))
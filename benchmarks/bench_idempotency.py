@@ -0,0 +1,77 @@
+"""
+Бенчмарк ключей идемпотентности на POST /tickets.
+
+- first: первые запросы с новыми ключами (полный путь бронирования);
+- replay: повторы тех же запросов (ответ из хранилища, без SQL);
+- duplicates: --keys ключей, каждый отправлен --duplicates раз одновременно,
+  как ретраи мобильного клиента. Проверяется, что билетов создано ровно по
+  одному бронированию на ключ.
+
+Запуск:
+    python -m benchmarks.bench_idempotency --requests 300 --keys 100 --duplicates 5
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, run_load, collect_load, print_table
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+
+
+def booking(i: int) -> dict:
+    # Сеансы по 100 мест, одно место на запрос
+    return {"session_id": i // 100 + 1, "seat_numbers": [i % 100 + 1]}
+
+
+async def main(args):
+    create_schema()
+    seed_minimal(users=1, sessions=(args.requests + args.keys) // 100 + 1)
+
+    from sqlalchemy import func, select
+    from app.main import app
+    from app.database import SessionLocal
+    from app.models import Ticket
+    from app.write_queue import write_queue
+
+    async def first(client, i):
+        return await client.post("/tickets", json=booking(i), headers={**HEADERS, "Idempotency-Key": f"k{i}"})
+
+    rows = [
+        {"name": "first", **await run_load(app, first, args.requests, args.concurrency)},
+        {"name": "replay", **await run_load(app, first, args.requests, args.concurrency)},
+    ]
+
+    async def duplicate(client, i):
+        key = args.requests + i // args.duplicates
+        return await client.post("/tickets", json=booking(key), headers={**HEADERS, "Idempotency-Key": f"k{key}"})
+
+    latencies, statuses, elapsed = await collect_load(
+        app, duplicate, args.keys * args.duplicates, args.keys * args.duplicates)
+    await write_queue.stop()
+
+    db = SessionLocal()
+    try:
+        tickets = db.execute(select(func.count(Ticket.id))).scalar()
+    finally:
+        db.close()
+    rows.append({"name": "duplicates", "requests": len(latencies), "rps": round(len(latencies) / elapsed, 1),
+                 "errors": sum(count for status, count in statuses.items() if status != 200)})
+
+    print(f"requests={args.requests} keys={args.keys} duplicates={args.duplicates}")
+    print_table(rows, columns=("name", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "errors"))
+    expected = args.requests + args.keys
+    print(f"tickets={tickets} expected={expected}")
+    if tickets != expected:
+        raise SystemExit("Повторы с одним ключом создали лишние билеты")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--keys", type=int, default=100, help="Ключей в проверке дубликатов")
+    parser.add_argument("--duplicates", type=int, default=5, help="Одновременных повторов на ключ")
+    args = parser.parse_args()
+    use_temp_database("idempotency")
+    asyncio.run(main(args))
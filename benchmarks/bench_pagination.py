@@ -0,0 +1,140 @@
+"""
+Бенчмарк курсорной пагинации (app/pagination.py) на списке билетов.
+
+База заполняется генератором (app/datagen.py, по умолчанию 1 млн билетов).
+
+- offset: прежний GET /tickets/ - OFFSET страницы и COUNT на каждый запрос;
+- cursor: GET /tickets/?cursor=... - страница той же глубины по курсору
+  (booking_time, id), total в режиме --count.
+
+Для глубин --depths - время страницы; у offset оно растёт с глубиной, у
+cursor - нет. Затем одна глубокая страница во всех режимах count: exact
+считает таблицу на каждый запрос, cached - раз в PAGINATION_COUNT_TTL,
+estimate - не дальше PAGINATION_COUNT_CAP строк, none - без COUNT.
+
+Запуск:
+    python -m benchmarks.bench_pagination --tickets 1000000
+"""
+
+import argparse
+import asyncio
+from dataclasses import replace
+import time
+
+from benchmarks.common import use_temp_database, create_schema, print_table
+
+
+def offset_page(db, skip: int, limit: int) -> int:
+    """Прежний список: COUNT и страница через OFFSET; возвращает число строк"""
+    from sqlalchemy import func, select
+    from app.models import Ticket
+
+    db.scalar(select(func.count()).select_from(Ticket))
+    query = select(Ticket).order_by(Ticket.booking_time.desc(), Ticket.id.desc()).offset(skip).limit(limit)
+    rows = db.execute(query).scalars().all()
+    db.expunge_all()
+    return len(rows)
+
+
+def timed_offset(depth: int, limit: int, repeat: int) -> dict:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows = offset_page(db, depth, limit)
+        ms = (time.perf_counter() - started) / repeat * 1000
+    finally:
+        db.close()
+    return {"depth": depth, "impl": "offset", "count": "exact", "rows": rows, "ms": round(ms, 1)}
+
+
+def cursor_at(depth: int):
+    """Курсор страницы, которая начинается со строки depth (как после depth / limit переходов)"""
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models import Ticket
+    from app.queries import TICKETS_KEYSET
+
+    if depth == 0:
+        return None
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            select(Ticket.booking_time, Ticket.id).order_by(*TICKETS_KEYSET.order_by()).offset(depth - 1).limit(1)
+        ).one()
+        return TICKETS_KEYSET.encode(row)
+    finally:
+        db.close()
+
+
+def make_admin() -> dict:
+    """Сделать первого пользователя администратором (список билетов - только админу); его заголовки"""
+    from sqlalchemy import select, update
+    from app.database import SessionLocal
+    from app.models import User, UserRole
+
+    db = SessionLocal()
+    try:
+        admin = db.scalar(select(User).order_by(User.id).limit(1))
+        db.execute(update(User).where(User.id == admin.id).values(role=UserRole.ADMIN))
+        db.commit()
+        return {"Authorization": f"Bearer demo_token_{admin.username}"}
+    finally:
+        db.close()
+
+
+async def timed_cursor(client, headers: dict, depth: int, cursor, limit: int, count: str, repeat: int) -> dict:
+    params = {"limit": limit, "count": count}
+    if cursor:
+        params["cursor"] = cursor
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = await client.get("/tickets/", params=params, headers=headers)
+        response.raise_for_status()
+    ms = (time.perf_counter() - started) / repeat * 1000
+    body = response.json()
+    total = body["total"] if body["total_exact"] or body["total"] is None else f"{body['total']}+"
+    return {"depth": depth, "impl": "cursor", "count": count, "rows": len(body["tickets"]), "total": total,
+            "ms": round(ms, 1)}
+
+
+async def main(args):
+    import httpx
+    from app import datagen
+
+    create_schema()
+    settings = replace(datagen.PRESETS["small"], tickets=args.tickets, days=args.days, reviews=0)
+    generated = datagen.generate(settings)
+    print(f"tickets={generated['tickets']} limit={args.limit}")
+
+    from app.main import app
+
+    admin = make_admin()
+    rows = []
+    cursors = {depth: cursor_at(depth) for depth in args.depths}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for depth in args.depths:
+            rows.append(timed_offset(depth, args.limit, args.repeat))
+            rows.append(await timed_cursor(client, admin, depth, cursors[depth], args.limit, args.count,
+                                           args.repeat))
+        deepest = max(args.depths)
+        for count in ("exact", "cached", "estimate", "none"):
+            rows.append(await timed_cursor(client, admin, deepest, cursors[deepest], args.limit, count, args.repeat))
+
+    print_table(rows, columns=("depth", "impl", "count", "rows", "total", "ms"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=150, help="Дней расписания (вместимость под --tickets)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 10_000, 100_000, 500_000, 900_000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--count", default="cached", help="Режим total у cursor в замере по глубинам")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    use_temp_database("pagination")
+    asyncio.run(main(args))
@@ -0,0 +1,117 @@
+"""
+Микробенчмарк частых выборок: db.query().filter(), select() на каждый вызов,
+lambda_stmt и готовые операторы с bindparam из app/queries.py.
+
+Для каждого варианта измеряется среднее время на вызов:
+- build: только построение оператора и ключа кэша компиляции (без БД);
+- execute: полный вызов с выполнением запроса к SQLite.
+
+Разница build показывает накладные расходы Python, которые снимает кэширование
+операторов; execute - вклад этой разницы в реальный запрос.
+
+Запуск:
+    python -m benchmarks.bench_queries --iterations 20000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, print_table
+
+
+def timed(func, iterations: int) -> float:
+    """Среднее время вызова, микросекунды"""
+    for i in range(min(1000, iterations)):
+        func(i)
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(args):
+    use_temp_database("queries")
+    create_schema()
+    seed_minimal(users=100, sessions=100)
+
+    from sqlalchemy import lambda_stmt, select
+    from app import queries
+    from app.database import SessionLocal, engine
+    from app.models import User, Session
+
+    db = SessionLocal()
+    dialect = engine.dialect
+    names = [f"user{i}" for i in range(100)]
+
+    def user_lambda(username):
+        return lambda_stmt(lambda: select(User).where(User.username == username))
+
+    def session_lambda(session_id):
+        return lambda_stmt(lambda: select(Session).where(Session.id == session_id))
+
+    def cache_key(stmt):
+        # То же, что делает Connection.execute перед поиском в кэше компиляции
+        return stmt._generate_cache_key()
+
+    cases = [
+        ("user by username", {
+            "query().filter()": (
+                lambda i: cache_key(db.query(User).filter(User.username == names[i % 100]).limit(1).statement),
+                lambda i: db.query(User).filter(User.username == names[i % 100]).first(),
+            ),
+            "select() per call": (
+                lambda i: cache_key(select(User).where(User.username == names[i % 100])),
+                lambda i: db.execute(select(User).where(User.username == names[i % 100])).scalars().first(),
+            ),
+            "lambda_stmt": (
+                lambda i: cache_key(user_lambda(names[i % 100])),
+                lambda i: db.execute(user_lambda(names[i % 100])).scalars().first(),
+            ),
+            "app.queries": (
+                lambda i: cache_key(queries.USER_BY_USERNAME),
+                lambda i: queries.get_user_by_username(db, names[i % 100]),
+            ),
+        }),
+        ("session by id", {
+            "query().filter()": (
+                lambda i: cache_key(db.query(Session).filter(Session.id == i % 100 + 1).limit(1).statement),
+                lambda i: db.query(Session).filter(Session.id == i % 100 + 1).first(),
+            ),
+            "select() per call": (
+                lambda i: cache_key(select(Session).where(Session.id == i % 100 + 1)),
+                lambda i: db.execute(select(Session).where(Session.id == i % 100 + 1)).scalars().first(),
+            ),
+            "lambda_stmt": (
+                lambda i: cache_key(session_lambda(i % 100 + 1)),
+                lambda i: db.execute(session_lambda(i % 100 + 1)).scalars().first(),
+            ),
+            "app.queries": (
+                lambda i: cache_key(queries.SESSION_BY_ID),
+                lambda i: queries.get_session(db, i % 100 + 1),
+            ),
+        }),
+    ]
+
+    rows = []
+    try:
+        for lookup, variants in cases:
+            for name, (build, execute) in variants.items():
+                rows.append({
+                    "lookup": lookup,
+                    "variant": name,
+                    "build_us": round(timed(build, args.iterations), 2),
+                    "execute_us": round(timed(execute, args.iterations), 2),
+                })
+                # Объекты не копятся в identity map между вариантами
+                db.expunge_all()
+    finally:
+        db.close()
+
+    print(f"iterations={args.iterations} dialect={dialect.name}")
+    print_table(rows, columns=("lookup", "variant", "build_us", "execute_us"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
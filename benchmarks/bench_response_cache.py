@@ -0,0 +1,79 @@
+"""
+Бенчмарк кэша ответов каталога (app/response_cache.py).
+
+Списки каталога и расписания без кэша (RESPONSE_CACHE_TTL=0) и с кэшем:
+rps и задержки на --requests запросах с --concurrency одновременными
+клиентами. Для кэша - доля попаданий и счётчики после прогона; revalidate -
+клиент с сохранённым ETag (If-None-Match), ответы 304 без тела.
+
+Запуск:
+    python -m benchmarks.bench_response_cache --movies 200 --sessions 2000 --requests 2000
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, run_load, print_table
+
+ENDPOINTS = (
+    ("/movies", "GET /movies"),
+    ("/movies/?limit=100", "GET /movies/"),
+    ("/cinemas/", "GET /cinemas/"),
+    ("/cinemas/1/halls", "GET /cinemas/1/halls"),
+    ("/sessions/?limit=100", "GET /sessions/"),
+    ("/sessions", "GET /sessions"),
+)
+
+
+async def client_etag(app, url: str) -> str:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return (await client.get(url)).headers["etag"]
+
+
+async def main(args):
+    create_schema()
+    seed_minimal(movies=args.movies, sessions=args.sessions, users=1)
+
+    from app.main import app
+    from app.response_cache import response_cache
+
+    ttl = response_cache.ttl
+    rows = []
+    for url, name in ENDPOINTS:
+        async def get(client, i, url=url):
+            return await client.get(url)
+
+        # /sessions без кэша - N+1 на каждый сеанс, запросов меньше
+        total = args.requests if url != "/sessions" else max(args.requests // 20, args.concurrency)
+        response_cache.ttl = 0
+        rows.append({"name": name, "cache": "off", **await run_load(app, get, total, args.concurrency)})
+        response_cache.ttl = ttl
+        response_cache.clear()
+        before = response_cache.stats()
+        row = await run_load(app, get, args.requests, args.concurrency)
+        hits = response_cache.stats()["hits"] - before["hits"]
+        rows.append({"name": name, "cache": "on", **row, "hit_ratio": round(hits / args.requests, 3)})
+
+        async def get(client, i, url=url, etag=(await client_etag(app, url))):
+            return await client.get(url, headers={"If-None-Match": etag})
+
+        rows.append({"name": name, "cache": "revalidate",
+                     **await run_load(app, get, args.requests, args.concurrency, ok_statuses=(304,))})
+
+    print(f"movies={args.movies} sessions={args.sessions} concurrency={args.concurrency}")
+    print_table(rows, columns=("name", "cache", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "hit_ratio"))
+    print(response_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    use_temp_database("response_cache")
+    asyncio.run(main(args))
@@ -0,0 +1,136 @@
+"""
+Бенчмарк проекции расписания (app/schedule.py).
+
+- n+1: прежний GET /sessions - все сеансы и запрос фильма и зала на каждый;
+- projection: GET /sessions из schedule_entries одним запросом;
+- day: GET /sessions?date=... - расписание одного дня по индексу.
+
+Кэш ответов выключен (RESPONSE_CACHE_TTL=0), замеряется сама выборка. После
+замера --bookings бронирований и отмен части из них проверяется, что
+проекция совпадает с JOIN сеансов, фильмов и залов.
+
+Запуск:
+    python -m benchmarks.bench_schedule --sessions 5000 --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, run_load, print_table, summarize
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+
+
+async def n_plus_one(db) -> list:
+    """GET /sessions до проекции"""
+    from sqlalchemy import select
+    from app.models import Session
+    from app.queries import get_hall_async, get_movie_async
+
+    sessions = (await db.execute(select(Session))).scalars().all()
+    result = []
+    for session in sessions:
+        movie = await get_movie_async(db, session.movie_id)
+        hall = await get_hall_async(db, session.hall_id)
+        result.append({
+            "id": session.id,
+            "movie_id": session.movie_id,
+            "movie": {"title": movie.title},
+            "start_time": session.start_time.isoformat(),
+            "price": float(session.base_price),
+            "hall_id": session.hall_id,
+            "hall": {"name": hall.name, "capacity": hall.total_seats},
+            "available_seats": session.available_seats
+        })
+    return result
+
+
+def mismatches() -> int:
+    """Сеансы, строки которых в проекции расходятся с JOIN исходных таблиц или отсутствуют"""
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models import ScheduleEntry
+    from app.schedule import SOURCE, _COLUMNS
+
+    db = SessionLocal()
+    try:
+        # day из JOIN - строка date(), в проекции - date
+        expected = {row[0]: (*row[:2], str(row[2]), *row[3:]) for row in db.execute(SOURCE).all()}
+        projected = select(*(getattr(ScheduleEntry, name) for name in _COLUMNS))
+        actual = {row[0]: (*row[:2], str(row[2]), *row[3:]) for row in db.execute(projected).all()}
+        return sum(1 for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key))
+    finally:
+        db.close()
+
+
+async def baseline(runs: int) -> dict:
+    from app.database import AsyncSessionLocal
+
+    latencies = []
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for _ in range(runs):
+            call_started = time.perf_counter()
+            await n_plus_one(db)
+            db.expunge_all()
+            latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    create_schema()
+    seed_minimal(movies=args.movies, halls=args.halls, sessions=args.sessions, users=1)
+
+    from app.main import app
+
+    async def get_all(client, i):
+        return await client.get("/sessions")
+
+    async def get_day(client, i):
+        return await client.get("/sessions", params={"date": f"2024-01-{15 + i % 10}"})
+
+    rows = [{"name": "n+1", **await baseline(args.baseline)}]
+    rows.append({"name": "projection", **await run_load(app, get_all, args.requests, args.concurrency)})
+    rows.append({"name": "day", **await run_load(app, get_day, args.requests * 10, args.concurrency)})
+
+    rng = random.Random(42)
+    bookings = [(rng.randint(1, args.sessions), seat) for seat in range(1, args.bookings + 1)]
+
+    async def book(client, i):
+        session_id, seat = bookings[i]
+        return await client.post("/tickets", json={"session_id": session_id, "seat_numbers": [seat % 100 + 1]},
+                                 headers=HEADERS)
+
+    booked = await run_load(app, book, len(bookings), args.concurrency, ok_statuses=(200, 409))
+
+    async def cancel(client, i):
+        return await client.delete(f"/tickets/{i * 2 + 1}", headers=HEADERS)
+
+    cancelled = await run_load(app, cancel, args.bookings // 4, args.concurrency, ok_statuses=(200, 404))
+
+    print(f"sessions={args.sessions} halls={args.halls} concurrency={args.concurrency}")
+    print_table(rows, columns=("name", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "errors"))
+    print(f"bookings: {booked['requests']} (errors {booked['errors']}), "
+          f"cancels: {cancelled['requests']} (errors {cancelled['errors']})")
+    diff = mismatches()
+    if diff:
+        raise SystemExit(f"Проекция расходится с JOIN: {diff} сеансов")
+    print("projection matches sessions JOIN movies JOIN halls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--halls", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--baseline", type=int, default=5, help="Прогонов прежнего N+1 (медленный)")
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    use_temp_database("schedule")
+    os.environ["RESPONSE_CACHE_TTL"] = "0"
+    asyncio.run(main(args))
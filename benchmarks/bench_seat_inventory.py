@@ -0,0 +1,141 @@
+"""
+Бенчмарк доступности мест: старый эндпоинт против карты мест в памяти.
+
+"До" - копия прежнего GET /sessions/{id}/available-seats: все билеты через
+relationship session.tickets и проверка `seat not in occupied_seats` по списку
+(O(мест x билетов)). "После" - текущий эндпоинт на app/seat_inventory.py.
+Отдельно сравнивается проверка мест при бронировании: SQL запрос с IN против
+битовой карты.
+
+Залы большие, заполнены на --occupancy.
+
+Запуск:
+    python -m benchmarks.bench_seat_inventory --seats 500 2000 5000 --requests 200
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import use_temp_database, create_schema, run_load, print_table
+
+
+def seed_halls(capacities, occupancy: float, seed: int = 42):
+    """Один сеанс на зал каждой вместимости, места заняты случайно"""
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import User, Movie, Cinema, Hall, Session, Ticket, UserRole, MovieGenre
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 15, 19, 0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [{"username": "bench", "email": "bench@cinema.com", "hashed_password": "x",
+                                   "first_name": "Bench", "last_name": "User", "role": UserRole.CUSTOMER}])
+        db.execute(insert(Movie), [{"title": "Фильм", "duration_minutes": 120, "genre": MovieGenre.DRAMA}])
+        db.execute(insert(Cinema), [{"name": "Cinema Paradise", "address": "ул. Примерная, 123", "city": "Москва"}])
+        for index, capacity in enumerate(capacities, start=1):
+            seats_per_row = 50
+            db.execute(insert(Hall), [{"id": index, "cinema_id": 1, "name": f"Зал {capacity}", "hall_number": index,
+                                       "total_seats": capacity, "rows": -(-capacity // seats_per_row),
+                                       "seats_per_row": seats_per_row}])
+            sold = rng.sample(range(1, capacity + 1), int(capacity * occupancy))
+            db.execute(insert(Session), [{"id": index, "movie_id": 1, "hall_id": index, "start_time": start,
+                                          "end_time": start, "date": start, "base_price": 400,
+                                          "available_seats": capacity - len(sold)}])
+            db.execute(insert(Ticket), [
+                {"session_id": index, "user_id": 1, "seat_row": (seat - 1) // seats_per_row + 1, "seat_number": seat,
+                 "price": 400, "final_price": 400, "booking_reference": f"S{index}-{seat}", "status": "booked"}
+                for seat in sold
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def mount_legacy_routes(app):
+    """Прежний обработчик доступных мест"""
+    from fastapi import Depends, HTTPException
+    from app.database import get_db
+    from app.models import Session
+
+    @app.get("/_bench/legacy/sessions/{session_id}/available-seats")
+    async def legacy_available_seats(session_id: int, db=Depends(get_db)):
+        session = db.query(Session).filter(Session.id == session_id).first()
+        if session is None:
+            raise HTTPException(status_code=404, detail="Сеанс не найден")
+        occupied_seats = [ticket.seat_number for ticket in session.tickets]
+        total_seats = session.hall.total_seats
+        available_seats = [seat for seat in range(1, total_seats + 1)
+                           if seat not in occupied_seats]
+        return {
+            "session_id": session_id,
+            "total_seats": total_seats,
+            "available_seats": available_seats,
+            "occupied_seats": occupied_seats,
+            "available_count": len(available_seats)
+        }
+
+
+def seat_check_timings(session_id: int, iterations: int) -> dict:
+    """Проверка 4 мест: SQL запрос против карты в памяти, микросекунды на вызов"""
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models import Ticket
+    from app.seat_inventory import seat_inventory
+
+    seats = [1, 2, 3, 4]
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            db.execute(select(Ticket.seat_number).filter(
+                Ticket.session_id == session_id, Ticket.seat_number.in_(seats))).scalars().all()
+        sql = (time.perf_counter() - started) / iterations * 1_000_000
+
+        seat_map = seat_inventory.get(db, session_id)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            seat_map.taken_among(seats)
+        bitmap = (time.perf_counter() - started) / iterations * 1_000_000
+    finally:
+        db.close()
+    return {"check_sql_us": round(sql, 2), "check_bitmap_us": round(bitmap, 3)}
+
+
+async def main(args):
+    create_schema()
+    seed_halls(args.seats, args.occupancy)
+
+    from app.main import app
+    mount_legacy_routes(app)
+
+    rows = []
+    for session_id, capacity in enumerate(args.seats, start=1):
+        for name, prefix in (("legacy", "/_bench/legacy"), ("seat_inventory", "")):
+            path = f"{prefix}/sessions/{session_id}/available-seats"
+
+            async def request(client, i, path=path):
+                return await client.get(path)
+
+            result = await run_load(app, request, args.requests, args.concurrency)
+            rows.append({"name": name, "seats": capacity, **result})
+        rows[-1].update(seat_check_timings(session_id, args.check_iterations))
+
+    print(f"occupancy={args.occupancy} requests={args.requests} concurrency={args.concurrency}")
+    print_table(rows, columns=("name", "seats", "rps", "p50_ms", "p95_ms", "p99_ms", "errors",
+                               "check_sql_us", "check_bitmap_us"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, nargs="+", default=[500, 2000, 5000], help="Вместимость залов")
+    parser.add_argument("--occupancy", type=float, default=0.7)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--check-iterations", type=int, default=2000)
+    args = parser.parse_args()
+    use_temp_database("seat_inventory")
+    asyncio.run(main(args))
@@ -0,0 +1,123 @@
+"""
+Стресс-бенчмарк SQLite: смешанная нагрузка чтения и бронирований.
+
+Несколько процессов (как воркеры uvicorn) работают с одним файлом базы:
+каждый гоняет GET /movies, GET /sessions и POST /tickets на свои места.
+Сравниваются режимы DB_SQLITE_HIGH_CONCURRENCY=0 (журнал по умолчанию,
+транзакции без BEGIN IMMEDIATE) и =1 (WAL + pragma + единственный писатель).
+
+Ошибки "database is locked" превращаются в ответы 500 и попадают в колонку errors.
+
+Запуск:
+    python -m benchmarks.bench_sqlite_concurrency --processes 4 --requests 300 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import (
+    ROOT_DIR, use_temp_database, create_schema, seed_minimal, collect_load, summarize, print_table,
+)
+
+SEATS_PER_SESSION = 100
+BOOKING_EVERY = 3  # каждый третий запрос - бронирование
+
+
+def sessions_per_process(requests: int) -> int:
+    bookings = requests // BOOKING_EVERY + 1
+    return bookings // SEATS_PER_SESSION + 1
+
+
+async def worker_main(args):
+    """Нагрузка одного процесса; результат - JSON в файл args.output"""
+    from app.main import app
+
+    per_process = sessions_per_process(args.requests)
+    headers = {"Authorization": f"Bearer demo_token_user{args.process_index}"}
+
+    async def request(client, i):
+        if i % BOOKING_EVERY == 0:
+            booking = i // BOOKING_EVERY
+            session_id = args.process_index * per_process + booking // SEATS_PER_SESSION + 1
+            seat = booking % SEATS_PER_SESSION + 1
+            return await client.post("/tickets", json={"session_id": session_id, "seat_numbers": [seat]}, headers=headers)
+        if i % 2:
+            return await client.get("/movies")
+        return await client.get("/sessions")
+
+    latencies, statuses, elapsed = await collect_load(app, request, args.requests, args.concurrency)
+    with open(args.output, "w") as f:
+        json.dump({"latencies": latencies, "statuses": dict(statuses), "elapsed": elapsed}, f)
+
+
+def run_mode(args, base_url: str, high_concurrency: bool) -> dict:
+    env = dict(os.environ)
+    env["DB_SQLITE_HIGH_CONCURRENCY"] = "1" if high_concurrency else "0"
+    # Отдельный файл базы на каждый режим: WAL сохраняется в файле
+    env["DATABASE_URL"] = base_url.replace(".db", f"_{int(high_concurrency)}.db")
+
+    # Схема и данные - в родительском процессе, один раз на режим
+    code = (
+        "from benchmarks.common import create_schema, seed_minimal\n"
+        f"create_schema(); seed_minimal(movies=10, halls=5, users={args.processes}, "
+        f"sessions={args.processes * sessions_per_process(args.requests)})\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, check=True)
+
+    # Вывод воркеров не читаем через pipe: заполненный буфер блокирует
+    # процесс на print() посреди транзакции и искажает замер
+    outputs = [f"{env['DATABASE_URL'][len('sqlite:///'):]}.worker{p}.json" for p in range(args.processes)]
+    started = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_sqlite_concurrency", "--worker",
+             "--process-index", str(p), "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+             "--output", outputs[p]],
+            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        for p in range(args.processes)
+    ]
+    latencies, statuses = [], {}
+    for proc, output in zip(procs, outputs):
+        proc.wait()
+        with open(output) as f:
+            data = json.load(f)
+        latencies.extend(data["latencies"])
+        for status, count in data["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    result = summarize(latencies, elapsed, errors)
+    result["statuses"] = statuses
+    return result
+
+
+def main(args):
+    use_temp_database("sqlite_concurrency")
+    base_url = os.environ["DATABASE_URL"]
+    rows = []
+    for name, mode in (("default journal", False), ("WAL + single writer", True)):
+        rows.append({"name": name, **run_mode(args, base_url, mode)})
+    print(f"processes={args.processes} requests/process={args.requests} concurrency={args.concurrency}")
+    print_table(rows, columns=("name", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "statuses"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=300, help="Запросов на процесс")
+    parser.add_argument("--concurrency", type=int, default=20, help="Параллельных запросов в процессе")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--process-index", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(worker_main(args))
+    else:
+        main(args)
@@ -0,0 +1,136 @@
+"""
+Бенчмарк списков билетов: GET /tickets/my и GET /admin/tickets.
+
+База заполняется генератором (app/datagen.py, по умолчанию 1 млн билетов).
+
+- n+1: прежняя реализация - билеты, затем сеанс, фильм, зал (и владелец в
+  админском списке) отдельным запросом на каждый билет;
+- join: текущие эндпоинты - одна строка на билет одного запроса с JOIN.
+
+Для каждого варианта - строк в ответе, SQL запросов (для эндпоинтов - из
+X-DB-Query-Count) и время. У n+1 число запросов и время растут с размером
+страницы, у join запросов два (пользователь и список) при любом размере.
+
+Запуск:
+    python -m benchmarks.bench_ticket_listing --tickets 1000000
+"""
+
+import argparse
+import asyncio
+from dataclasses import replace
+import time
+
+from benchmarks.common import use_temp_database, create_schema, print_table
+
+
+async def n_plus_one(db, user_id=None, skip: int = 0, limit: int = None) -> int:
+    """Прежние /tickets/my (user_id) и /admin/tickets: запросы на каждый билет; возвращает число запросов"""
+    from sqlalchemy import select
+    from app.models import Ticket
+    from app.queries import get_hall_async, get_movie_async, get_session_async, get_user_async
+
+    query = select(Ticket).order_by(Ticket.booking_time.desc(), Ticket.id.desc()).offset(skip).limit(limit)
+    if user_id is not None:
+        query = query.where(Ticket.user_id == user_id)
+    tickets = (await db.execute(query)).scalars().all()
+    for ticket in tickets:
+        session = await get_session_async(db, ticket.session_id)
+        await get_movie_async(db, session.movie_id)
+        await get_hall_async(db, session.hall_id)
+        if user_id is None:
+            await get_user_async(db, ticket.user_id)
+    db.expunge_all()
+    return 1 + len(tickets) * (3 if user_id is not None else 4)
+
+
+async def timed_n_plus_one(name: str, repeat: int, **kwargs) -> dict:
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            queries = await n_plus_one(db, **kwargs)
+        ms = (time.perf_counter() - started) / repeat * 1000
+    rows = (queries - 1) // (3 if kwargs.get("user_id") is not None else 4)
+    return {"name": name, "impl": "n+1", "rows": rows, "queries": queries, "ms": round(ms, 1)}
+
+
+async def timed_endpoint(client, name: str, url: str, headers: dict, repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+    ms = (time.perf_counter() - started) / repeat * 1000
+    return {"name": name, "impl": "join", "rows": len(response.json()),
+            "queries": int(response.headers["x-db-query-count"]), "ms": round(ms, 1)}
+
+
+def prepare(args) -> dict:
+    """Сгенерировать данные; админ - первый пользователь, в /tickets/my - пользователь с наибольшим числом билетов"""
+    from sqlalchemy import func, select, update
+    from app import datagen
+    from app.database import SessionLocal
+    from app.models import Ticket, User, UserRole
+
+    create_schema()
+    settings = replace(datagen.PRESETS["small"], tickets=args.tickets, days=args.days, reviews=0)
+    generated = datagen.generate(settings)
+    db = SessionLocal()
+    try:
+        admin = db.scalar(select(User).order_by(User.id).limit(1))
+        db.execute(update(User).where(User.id == admin.id).values(role=UserRole.ADMIN))
+        db.commit()
+        user_id, count = db.execute(
+            select(Ticket.user_id, func.count()).group_by(Ticket.user_id).order_by(func.count().desc()).limit(1)
+        ).one()
+        session_id = db.scalar(select(Ticket.session_id).limit(1))
+        return {
+            "generated": generated, "admin": admin.username, "user_id": user_id, "user_tickets": count,
+            "username": db.scalar(select(User.username).where(User.id == user_id)), "session_id": session_id,
+        }
+    finally:
+        db.close()
+
+
+async def main(args):
+    import httpx
+
+    context = prepare(args)
+    print(f"tickets={context['generated']['tickets']} sessions={context['generated']['sessions']} "
+          f"heaviest user: {context['username']} ({context['user_tickets']} tickets)")
+
+    from app.main import app
+
+    admin = {"Authorization": f"Bearer demo_token_{context['admin']}"}
+    user = {"Authorization": f"Bearer demo_token_{context['username']}"}
+    rows = [await timed_n_plus_one("my", args.repeat, user_id=context["user_id"])]
+    for limit in args.pages:
+        rows.append(await timed_n_plus_one(f"admin limit={limit}", args.repeat, limit=limit))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        rows.append(await timed_endpoint(client, "my", "/tickets/my", user, args.repeat))
+        for limit in args.pages:
+            rows.append(await timed_endpoint(client, f"admin limit={limit}", f"/admin/tickets?limit={limit}",
+                                             admin, args.repeat))
+        for name, query in (
+            ("admin skip=100000", "skip=100000&limit=100"),
+            ("admin status=paid", "status=paid&limit=100"),
+            ("admin session_id", f"session_id={context['session_id']}&limit=100"),
+            ("admin date", f"date={args.date}&limit=100"),
+        ):
+            rows.append(await timed_endpoint(client, name, f"/admin/tickets?{query}", admin, args.repeat))
+
+    print_table(rows, columns=("name", "impl", "rows", "queries", "ms"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=150, help="Дней расписания (вместимость под --tickets)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="Размеры страниц админа")
+    parser.add_argument("--date", default="2024-03-01", help="День сеанса для фильтра date")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    use_temp_database("ticket_listing")
+    asyncio.run(main(args))
@@ -0,0 +1,166 @@
+"""
+Нагрузочный тест виртуальной очереди бронирования (app/waiting_room.py).
+
+Старт продаж: --buyers покупателей бронируют по месту на один сеанс.
+Обычный трафик - --concurrency одновременных покупателей, пик - в
+--multiplier раз больше. Покупатель отправляет POST /tickets; на 429 встаёт в
+очередь, опрашивает её (poll_after из ответа) и бронирует с пропуском
+X-Admission-Token.
+
+Сценарии: обычный трафик и пик без очереди (слоты не ограничены) и пик с
+очередью (--slots транзакций на сеанс). Для каждого:
+
+- booking_p50/p99 - задержка POST /tickets, дошедших до транзакции (без 429);
+- buyer_p50/p99 - время покупателя от первого запроса до билета, с очередью;
+- errors - ответы 5xx ("database is locked" и т.п.), queued - покупатели,
+  прошедшие через очередь.
+
+После прогона проверяется, что билетов ровно столько, сколько покупателей
+получили 200, и ни одно место не продано дважды.
+
+Режим журнала SQLite: --journal default - транзакции конкурируют напрямую
+(блокировки видны как ошибки), --journal wal - WAL и очередь единственного
+писателя.
+
+Запуск:
+    python -m benchmarks.bench_waiting_room --buyers 1000 --concurrency 10 --multiplier 10 --slots 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal, percentile, print_table
+
+HEADERS = {"Authorization": "Bearer demo_token_user0"}
+
+
+def seed(sessions: int, seats: int):
+    """Сеанс на каждый сценарий, залы по seats мест"""
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models import Hall, Session
+
+    create_schema()
+    seed_minimal(movies=1, halls=1, sessions=sessions, users=1)
+    db = SessionLocal()
+    try:
+        db.execute(update(Hall).values(total_seats=seats, rows=-(-seats // 50), seats_per_row=50))
+        db.execute(update(Session).values(available_seats=seats))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_scenario(app, session_id: int, buyers: int, concurrency: int) -> dict:
+    import httpx
+    from collections import Counter
+
+    booking_latencies, buyer_latencies = [], []
+    statuses = Counter()
+    queued = 0
+    counter = iter(range(buyers))
+
+    async def buy(client, i):
+        nonlocal queued
+        started = time.perf_counter()
+        body = {"session_id": session_id, "seat_numbers": [i + 1]}
+        headers = HEADERS
+        while True:
+            sent = time.perf_counter()
+            response = await client.post("/tickets", json=body, headers=headers)
+            if response.status_code != 429:
+                booking_latencies.append(time.perf_counter() - sent)
+                break
+            # Очередь: встать, опрашивать до пропуска, бронировать с ним
+            queued += 1
+            status = (await client.post(f"/sessions/{session_id}/waiting-room")).json()
+            while status["status"] != "admitted":
+                await asyncio.sleep(status["poll_after"])
+                status = (await client.get(f"/sessions/{session_id}/waiting-room/{status['waiter_id']}")).json()
+            headers = {**HEADERS, "X-Admission-Token": status["token"]}
+        statuses[response.status_code] += 1
+        buyer_latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker():
+            for i in counter:
+                await buy(client, i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    booking_ms = [value * 1000 for value in booking_latencies]
+    buyer_ms = [value * 1000 for value in buyer_latencies]
+    return {
+        "buyers": buyers,
+        "concurrency": concurrency,
+        "rps": round(buyers / elapsed, 1),
+        "booking_p50": round(percentile(booking_ms, 50), 1),
+        "booking_p99": round(percentile(booking_ms, 99), 1),
+        "buyer_p50": round(percentile(buyer_ms, 50), 1),
+        "buyer_p99": round(percentile(buyer_ms, 99), 1),
+        "ok": statuses[200],
+        "errors": sum(count for status, count in statuses.items() if status >= 500),
+        "queued": queued,
+    }
+
+
+def check_database(scenarios: int) -> list:
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(
+            "SELECT session_id, COUNT(*), COUNT(DISTINCT seat_number) FROM tickets GROUP BY session_id"
+        ))]
+
+
+async def main(args):
+    scenarios = (
+        ("normal, no queue", args.concurrency, 0),
+        (f"x{args.multiplier}, no queue", args.concurrency * args.multiplier, 0),
+        (f"x{args.multiplier}, waiting room", args.concurrency * args.multiplier, args.slots),
+    )
+    seed(len(scenarios), args.buyers)
+
+    from app.main import app
+    from app.waiting_room import waiting_room
+    from app.write_queue import write_queue
+
+    waiting_room.start()
+    rows = []
+    for session_id, (name, concurrency, slots) in enumerate(scenarios, start=1):
+        # 0 - слоты не ограничены, очередь не используется
+        waiting_room.session_slots = slots
+        waiting_room.cinema_slots = slots
+        rows.append({"name": name, "slots": slots or "-",
+                     **await run_scenario(app, session_id, args.buyers, concurrency)})
+    await waiting_room.stop()
+    await write_queue.stop()
+
+    print(f"journal={args.journal} buyers={args.buyers}")
+    print_table(rows, columns=("name", "concurrency", "slots", "rps", "booking_p50", "booking_p99",
+                               "buyer_p50", "buyer_p99", "ok", "errors", "queued"))
+    counts = check_database(len(scenarios))
+    oks = {session_id: row["ok"] for session_id, row in enumerate(rows, start=1)}
+    for session_id, tickets, distinct in counts:
+        if tickets != distinct or tickets != oks[session_id]:
+            raise SystemExit(f"Сеанс {session_id}: билетов {tickets}, мест {distinct}, ответов 200 {oks[session_id]}")
+    print("tickets match responses, no double-sold seats")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных покупателей при обычном трафике")
+    parser.add_argument("--multiplier", type=int, default=10, help="Во сколько раз пик больше обычного трафика")
+    parser.add_argument("--slots", type=int, default=4, help="Транзакций бронирования на сеанс в очереди")
+    parser.add_argument("--journal", choices=("default", "wal"), default="default")
+    args = parser.parse_args()
+    use_temp_database("waiting_room")
+    os.environ["DB_SQLITE_HIGH_CONCURRENCY"] = "1" if args.journal == "wal" else "0"
+    asyncio.run(main(args))
@@ -0,0 +1,150 @@
+"""
+Общие утилиты для бенчмарков Cinema Paradise.
+
+Бенчмарки запускают FastAPI приложение внутри процесса (httpx + ASGITransport)
+против временной SQLite базы, поэтому модуль настраивает DATABASE_URL
+до импорта пакета app.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def use_temp_database(name: str = "bench") -> str:
+    """Направить приложение на временную SQLite базу (вызывать до импорта app)"""
+    db_dir = tempfile.mkdtemp(prefix="cinema_bench_")
+    db_path = os.path.join(db_dir, f"{name}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    # Профиль bench: без вывода SQL и с большим пулом соединений
+    os.environ.setdefault("ENVIRONMENT", "bench")
+    # Лог на каждый запрос не должен влиять на замер
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return db_path
+
+
+def create_schema():
+    """Создать таблицы во временной базе"""
+    from app.database import Base, engine
+    from app import models  # noqa: F401 - регистрация моделей в metadata
+    Base.metadata.create_all(bind=engine)
+
+
+def seed_minimal(movies: int = 20, halls: int = 5, sessions: int = 200, users: int = 50):
+    """Небольшой набор данных для бенчмарков отдельных эндпоинтов"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import User, Movie, Cinema, Hall, Session, UserRole, MovieGenre
+    from app.schedule import rebuild
+
+    genres = list(MovieGenre)
+    start = datetime(2024, 1, 15, 10, 0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@cinema.com", "hashed_password": "user123",
+             "first_name": "Bench", "last_name": f"User{i}", "role": UserRole.CUSTOMER}
+            for i in range(users)
+        ])
+        db.execute(insert(Movie), [
+            {"title": f"Фильм {i}", "duration_minutes": 90 + i % 60, "rating": 5 + i % 5,
+             "genre": genres[i % len(genres)]}
+            for i in range(movies)
+        ])
+        db.execute(insert(Cinema), [{"name": "Cinema Paradise", "address": "ул. Примерная, 123", "city": "Москва"}])
+        db.execute(insert(Hall), [
+            {"cinema_id": 1, "name": f"Зал №{i + 1}", "hall_number": i + 1, "total_seats": 100,
+             "rows": 10, "seats_per_row": 10}
+            for i in range(halls)
+        ])
+        db.execute(insert(Session), [
+            {"movie_id": i % movies + 1, "hall_id": i % halls + 1,
+             "start_time": start + timedelta(hours=3 * i), "end_time": start + timedelta(hours=3 * i + 2),
+             "date": start + timedelta(hours=3 * i), "base_price": 400, "available_seats": 100}
+            for i in range(sessions)
+        ])
+        db.commit()
+        rebuild(db)
+    finally:
+        db.close()
+
+
+def percentile(values, pct: float) -> float:
+    """Перцентиль с линейной интерполяцией"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(latencies, elapsed: float, errors: int = 0) -> dict:
+    """Сводка по замеру: пропускная способность и перцентили задержки (мс)"""
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+async def collect_load(app, make_request, total: int, concurrency: int):
+    """
+    Прогнать total запросов с заданной степенью параллелизма.
+
+    make_request(client, i) - корутина, возвращающая httpx.Response.
+    Возвращает (задержки в секундах, Counter статусов, общее время).
+    """
+    import httpx
+    from collections import Counter
+
+    latencies = []
+    statuses = Counter()
+    counter = iter(range(total))
+
+    # Ошибки приложения превращаются в ответ 500, а не в исключение клиента
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                response = await make_request(client, i)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, statuses, elapsed
+
+
+async def run_load(app, make_request, total: int, concurrency: int, ok_statuses=(200,)) -> dict:
+    """Прогнать нагрузку и вернуть сводку (см. collect_load)"""
+    latencies, statuses, elapsed = await collect_load(app, make_request, total, concurrency)
+    errors = sum(count for status, count in statuses.items() if status not in ok_statuses)
+    return summarize(latencies, elapsed, errors)
+
+
+def print_table(rows, columns=("name", "rps", "p50_ms", "p95_ms", "p99_ms", "errors")):
+    """Вывести результаты в виде простой таблицы"""
+    widths = [max(len(str(column)), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(columns, widths)))
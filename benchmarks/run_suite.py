@@ -0,0 +1,215 @@
+"""
+Набор бенчмарков горячих эндпоинтов API.
+
+Приложение запускается внутри процесса (httpx + ASGITransport) против временной
+SQLite базы, заполненной демо данными (app/seed.py) и детерминированным
+генератором (app/datagen.py). Для каждого сценария считаются пропускная
+способность и перцентили p50/p95/p99, результат пишется в JSON вместе с
+коммитом и параметрами данных, чтобы сравнивать прогоны между коммитами.
+
+Запуск:
+    python -m benchmarks.run_suite
+    python -m benchmarks.run_suite --only movies sessions --requests 500
+    python -m benchmarks.run_suite --compare benchmarks/results/suite-<commit>.json
+"""
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from typing import Callable
+
+from benchmarks.common import ROOT_DIR, use_temp_database, create_schema, run_load, print_table
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+@dataclass
+class Scenario:
+    name: str
+    # make(context) -> корутина make_request(client, i) для collect_load
+    make: Callable
+    # Доля от --requests: тяжёлые эндпоинты (N+1, полные выборки) гоняются реже
+    weight: float = 1.0
+
+
+def _auth(username: str) -> dict:
+    return {"Authorization": f"Bearer demo_token_{username}"}
+
+
+def _get(path_for, headers_for=lambda i: {}):
+    def make(context):
+        async def request(client, i):
+            return await client.get(path_for(context, i), headers=headers_for(i))
+        return request
+    return make
+
+
+def _book(context):
+    seats = context["free_seats"]
+
+    async def request(client, i):
+        session_id, seat = seats[i % len(seats)]
+        user = context["users"][i % len(context["users"])]
+        return await client.post("/tickets", json={"session_id": session_id, "seat_numbers": [seat]}, headers=_auth(user))
+    return request
+
+
+def _my_tickets(context):
+    async def request(client, i):
+        return await client.get("/tickets/my", headers=_auth(context["users"][i % len(context["users"])]))
+    return request
+
+
+SCENARIOS = [
+    Scenario("movies", _get(lambda c, i: "/movies")),
+    Scenario("sessions", _get(lambda c, i: "/sessions"), weight=0.05),
+    Scenario("available_seats", _get(lambda c, i: f"/sessions/{c['session_ids'][i % len(c['session_ids'])]}/available-seats")),
+    Scenario("book_ticket", _book),
+    Scenario("my_tickets", _my_tickets, weight=0.25),
+    Scenario("admin_tickets", _get(lambda c, i: "/admin/tickets", lambda i: _auth("admin")), weight=0.02),
+    Scenario("movie_reviews", _get(lambda c, i: f"/reviews/movie/{c['movie_ids'][i % len(c['movie_ids'])]}")),
+    Scenario("ticket_statistics", _get(lambda c, i: "/tickets/statistics/", lambda i: _auth("admin")), weight=0.1),
+]
+
+
+def suite_data_settings(args):
+    """Объём данных: по умолчанию три дня расписания трёх кинотеатров"""
+    from app.datagen import PRESETS
+    if args.scale:
+        settings = PRESETS[args.scale]
+    else:
+        settings = replace(PRESETS["small"], cinemas=3, days=3, users=1_000, tickets=3_000, reviews=20_000)
+    return replace(settings, seed=args.seed)
+
+
+def prepare_database(settings) -> dict:
+    """Схема, демо данные и сгенерированный объём; возвращает параметры сценариев"""
+    from sqlalchemy import select
+    from app import datagen
+    from app.database import SessionLocal
+    from app.models import Hall, Movie, Session, Ticket, User
+    from app.seed import init_db
+
+    create_schema()
+    init_db()
+    datagen.generate(settings)
+
+    rng = random.Random(settings.seed)
+    db = SessionLocal()
+    try:
+        users = db.scalars(select(User.username).filter(User.username.like("guest%"))).all()
+        movie_ids = db.scalars(select(Movie.id)).all()
+        sessions = db.execute(
+            select(Session.id, Hall.total_seats).join(Hall, Hall.id == Session.hall_id).order_by(Session.id)
+        ).all()
+        taken = set(db.execute(select(Ticket.session_id, Ticket.seat_number)).tuples().all())
+    finally:
+        db.close()
+
+    # Свободные места для бронирований, перемешанные детерминированно
+    free_seats = [(sid, seat) for sid, capacity in sessions[-200:] for seat in range(1, capacity + 1)
+                  if (sid, seat) not in taken]
+    rng.shuffle(free_seats)
+    session_ids = [sid for sid, _ in sessions]
+    rng.shuffle(session_ids)
+    rng.shuffle(users)
+    return {"users": users, "movie_ids": movie_ids, "session_ids": session_ids, "free_seats": free_seats}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_suite(args, context) -> list:
+    from app.main import app
+
+    selected = [s for s in SCENARIOS if not args.only or s.name in args.only]
+    rows = []
+    for scenario in selected:
+        make_request = scenario.make(context)
+        total = max(args.min_requests, int(args.requests * scenario.weight))
+        if args.warmup:
+            await run_load(app, make_request, args.warmup, 1)
+            if scenario.name == "book_ticket":
+                # Прогрев уже занял первые места, основной замер берёт следующие
+                context["free_seats"] = context["free_seats"][args.warmup:]
+                make_request = scenario.make(context)
+        result = await run_load(app, make_request, total, args.concurrency)
+        rows.append({"name": scenario.name, **result})
+        print(f"{scenario.name}: {result['rps']} rps, p95 {result['p95_ms']} мс", file=sys.stderr)
+    return rows
+
+
+def compare(rows: list, baseline_path: str):
+    """Сравнение с предыдущим результатом: отношение rps и p95"""
+    with open(baseline_path) as f:
+        baseline = {row["name"]: row for row in json.load(f)["results"]}
+    table = []
+    for row in rows:
+        old = baseline.get(row["name"])
+        if not old:
+            continue
+        table.append({
+            "name": row["name"],
+            "rps_old": old["rps"],
+            "rps_new": row["rps"],
+            "rps_ratio": round(row["rps"] / old["rps"], 2) if old["rps"] else "",
+            "p95_old": old["p95_ms"],
+            "p95_new": row["p95_ms"],
+            "p95_ratio": round(row["p95_ms"] / old["p95_ms"], 2) if old["p95_ms"] else "",
+        })
+    print(f"\nСравнение с {baseline_path}:")
+    print_table(table, columns=("name", "rps_old", "rps_new", "rps_ratio", "p95_old", "p95_new", "p95_ratio"))
+
+
+def main(args):
+    use_temp_database("suite")
+    settings = suite_data_settings(args)
+    context = prepare_database(settings)
+    rows = asyncio.run(run_suite(args, context))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "data": {key: (value.isoformat() if isinstance(value, datetime) else value) for key, value in asdict(settings).items()},
+        "results": rows,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"commit={commit} concurrency={args.concurrency}")
+    print_table(rows, columns=("name", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "errors"))
+    print(f"Результаты: {output}")
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на сценарий (с учётом веса)")
+    parser.add_argument("--min-requests", type=int, default=5, help="Минимум запросов для тяжёлых сценариев")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=3, help="Запросов прогрева на сценарий")
+    parser.add_argument("--only", nargs="+", choices=[s.name for s in SCENARIOS], help="Запустить только эти сценарии")
+    parser.add_argument("--scale", choices=("small", "medium", "large"), help="Набор данных app.datagen вместо встроенного")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Файл результатов (по умолчанию benchmarks/results/suite-<commit>.json)")
+    parser.add_argument("--compare", help="Предыдущий файл результатов для сравнения")
+    main(parser.parse_args())
@@ -39,14 +39,19 @@ api.interceptors.response.use(
 window.api = {
     // Внутренние методы
     async _request(method, url, data = null, options = {}) {
+        const response = await this._send(method, url, data, options);
+        return response.data;
+    },
+
+    // Полный ответ axios (нужны заголовки, например X-Next-Cursor)
+    async _send(method, url, data = null, options = {}) {
         try {
-            const response = await api({
+            return await api({
                 method,
                 url,
                 data,
                 ...options
             });
-            return response.data;
         } catch (error) {
             console.error(`API Error [${method} ${url}]:`, error);
             
@@ -119,22 +124,38 @@ window.api = {
         return await this._request('GET', '/auth/me');
     },
 
-    // Movies
-    async getMovies(skip = 0, limit = 100) {
-        return await this._request('GET', `/movies?skip=${skip}&limit=${limit}`);
+    // Все страницы курсорного списка: ответ {<key>: [...], next_cursor}
+    async _listAll(url, key) {
+        const items = [];
+        let cursor = null;
+        do {
+            const params = { limit: 100 };
+            if (cursor) {
+                params.cursor = cursor;
+            }
+            const page = await this._request('GET', url, null, { params });
+            items.push(...page[key]);
+            cursor = page.next_cursor;
+        } while (cursor);
+        return items;
+    },
+
+    // Movies (каталог целиком, без страниц)
+    async getMovies() {
+        return await this._request('GET', '/movies');
     },
 
     async getMovie(movieId) {
         return await this._request('GET', `/movies/${movieId}`);
     },
 
-    // Sessions
-    async getSessions(skip = 0, limit = 100) {
-        return await this._request('GET', `/sessions?skip=${skip}&limit=${limit}`);
+    // Sessions (расписание целиком, без страниц)
+    async getSessions() {
+        return await this._request('GET', '/sessions');
     },
 
     async getCinemas() {
-        return this._request('GET', '/cinemas?skip=0&limit=100');
+        return this._listAll('/cinemas/', 'cinemas');
     },
 
     // Tickets
@@ -151,8 +172,16 @@ window.api = {
     },
 
     // Admin endpoints
-    async getAllTickets() {
-        return this._request('GET', '/admin/tickets?skip=0&limit=100');
+    // Страница билетов; курсор следующей - заголовок X-Next-Cursor (nextCursor)
+    async getAllTickets(cursor = null, limit = 100) {
+        const params = { limit };
+        if (cursor) {
+            params.cursor = cursor;
+        }
+        const response = await this._send('GET', '/admin/tickets', null, { params });
+        const tickets = response.data;
+        tickets.nextCursor = response.headers['x-next-cursor'] || null;
+        return tickets;
     },
 
     async getAllUsers() {
@@ -0,0 +1,251 @@
+"""Начальная схема: таблицы в том виде, в котором их создавал create_all
+
+Существующие базы, созданные через create_all, помечаются этой ревизией:
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 11:31:27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cinemas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.Text(), nullable=False),
+    sa.Column('city', sa.String(length=100), nullable=False),
+    sa.Column('postal_code', sa.String(length=20), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('website', sa.String(length=500), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('opening_time', sa.Time(), nullable=True),
+    sa.Column('closing_time', sa.Time(), nullable=True),
+    sa.Column('facilities', sa.Text(), nullable=True),
+    sa.Column('parking_available', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cinemas', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cinemas_id'), ['id'], unique=False)
+
+    op.create_table('movies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('original_title', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('synopsis', sa.Text(), nullable=True),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('genre', sa.Enum('ACTION', 'COMEDY', 'DRAMA', 'HORROR', 'ROMANCE', 'SCI_FI', 'THRILLER', 'DOCUMENTARY', 'ANIMATION', 'FANTASY', name='moviegenre'), nullable=False),
+    sa.Column('director', sa.String(length=255), nullable=True),
+    sa.Column('producer', sa.String(length=255), nullable=True),
+    sa.Column('writer', sa.String(length=255), nullable=True),
+    sa.Column('cast', sa.Text(), nullable=True),
+    sa.Column('release_year', sa.Integer(), nullable=True),
+    sa.Column('release_date', sa.DateTime(), nullable=True),
+    sa.Column('country', sa.String(length=100), nullable=True),
+    sa.Column('language', sa.String(length=50), nullable=True),
+    sa.Column('age_rating', sa.String(length=10), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('imdb_rating', sa.Float(), nullable=True),
+    sa.Column('budget', sa.DECIMAL(precision=15, scale=2), nullable=True),
+    sa.Column('box_office', sa.DECIMAL(precision=15, scale=2), nullable=True),
+    sa.Column('poster_url', sa.String(length=500), nullable=True),
+    sa.Column('trailer_url', sa.String(length=500), nullable=True),
+    sa.Column('backdrop_url', sa.String(length=500), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_featured', sa.Boolean(), nullable=True),
+    sa.Column('awards', sa.Text(), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movies_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movies_title'), ['title'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=False),
+    sa.Column('last_name', sa.String(length=100), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('date_of_birth', sa.DateTime(), nullable=True),
+    sa.Column('role', sa.Enum('ADMIN', 'MANAGER', 'CUSTOMER', name='userrole'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('avatar_url', sa.String(length=500), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('postal_code', sa.String(length=20), nullable=True),
+    sa.Column('loyalty_points', sa.Integer(), nullable=True),
+    sa.Column('total_spent', sa.DECIMAL(precision=10, scale=2), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('last_login', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+    op.create_table('halls',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cinema_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('hall_number', sa.Integer(), nullable=False),
+    sa.Column('total_seats', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('seats_per_row', sa.Integer(), nullable=False),
+    sa.Column('screen_type', sa.String(length=50), nullable=True),
+    sa.Column('sound_system', sa.String(length=50), nullable=True),
+    sa.Column('accessibility', sa.Boolean(), nullable=True),
+    sa.Column('vip_seats', sa.Integer(), nullable=True),
+    sa.Column('premium_seats', sa.Integer(), nullable=True),
+    sa.Column('standard_seats', sa.Integer(), nullable=True),
+    sa.Column('seat_map', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cinema_id'], ['cinemas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('halls', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_halls_id'), ['id'], unique=False)
+
+    op.create_table('reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('is_spoiler', sa.Boolean(), nullable=True),
+    sa.Column('is_verified_purchase', sa.Boolean(), nullable=True),
+    sa.Column('helpful_votes', sa.Integer(), nullable=True),
+    sa.Column('unhelpful_votes', sa.Integer(), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reviews_id'), ['id'], unique=False)
+
+    op.create_table('sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('hall_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('base_price', sa.DECIMAL(precision=8, scale=2), nullable=False),
+    sa.Column('vip_price', sa.DECIMAL(precision=8, scale=2), nullable=True),
+    sa.Column('premium_price', sa.DECIMAL(precision=8, scale=2), nullable=True),
+    sa.Column('available_seats', sa.Integer(), nullable=False),
+    sa.Column('sold_tickets', sa.Integer(), nullable=True),
+    sa.Column('reserved_tickets', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_sold_out', sa.Boolean(), nullable=True),
+    sa.Column('language', sa.String(length=50), nullable=True),
+    sa.Column('subtitles', sa.String(length=50), nullable=True),
+    sa.Column('format_3d', sa.Boolean(), nullable=True),
+    sa.Column('format_imax', sa.Boolean(), nullable=True),
+    sa.Column('early_bird_discount', sa.Float(), nullable=True),
+    sa.Column('late_show_surcharge', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['hall_id'], ['halls.id'], ),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sessions_date'), ['date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sessions_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sessions_start_time'), ['start_time'], unique=False)
+
+    op.create_table('tickets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('seat_row', sa.Integer(), nullable=False),
+    sa.Column('seat_number', sa.Integer(), nullable=False),
+    sa.Column('seat_type', sa.String(length=20), nullable=True),
+    sa.Column('price', sa.DECIMAL(precision=8, scale=2), nullable=False),
+    sa.Column('discount_applied', sa.DECIMAL(precision=8, scale=2), nullable=True),
+    sa.Column('final_price', sa.DECIMAL(precision=8, scale=2), nullable=False),
+    sa.Column('booking_reference', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('payment_transaction_id', sa.String(length=255), nullable=True),
+    sa.Column('qr_code', sa.String(length=500), nullable=True),
+    sa.Column('is_paid', sa.Boolean(), nullable=True),
+    sa.Column('booking_time', sa.DateTime(), nullable=True),
+    sa.Column('payment_time', sa.DateTime(), nullable=True),
+    sa.Column('cancellation_time', sa.DateTime(), nullable=True),
+    sa.Column('used_time', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tickets_booking_reference'), ['booking_reference'], unique=True)
+        batch_op.create_index(batch_op.f('ix_tickets_id'), ['id'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tickets_id'))
+        batch_op.drop_index(batch_op.f('ix_tickets_booking_reference'))
+
+    op.drop_table('tickets')
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sessions_start_time'))
+        batch_op.drop_index(batch_op.f('ix_sessions_id'))
+        batch_op.drop_index(batch_op.f('ix_sessions_date'))
+
+    op.drop_table('sessions')
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reviews_id'))
+
+    op.drop_table('reviews')
+    with op.batch_alter_table('halls', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_halls_id'))
+
+    op.drop_table('halls')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movies_title'))
+        batch_op.drop_index(batch_op.f('ix_movies_id'))
+
+    op.drop_table('movies')
+    with op.batch_alter_table('cinemas', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cinemas_id'))
+
+    op.drop_table('cinemas')
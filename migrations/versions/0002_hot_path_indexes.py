@@ -0,0 +1,52 @@
+"""Индексы для горячих запросов бронирования и листингов
+
+Уникальный индекс uq_tickets_session_seat запрещает продажу одного места
+дважды. Если в базе уже есть дубли, их нужно устранить до миграции.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:31:38
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('halls', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_halls_cinema_id'), ['cinema_id'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_movie_approved_created', ['movie_id', 'is_approved', 'created_at'], unique=False)
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.create_index('ix_sessions_hall_start', ['hall_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_sessions_movie_start', ['movie_id', 'start_time'], unique=False)
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_tickets_user_booking_time', ['user_id', 'booking_time'], unique=False)
+        batch_op.create_index('uq_tickets_session_seat', ['session_id', 'seat_number'], unique=True)
+
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index('uq_tickets_session_seat')
+        batch_op.drop_index('ix_tickets_user_booking_time')
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_sessions_movie_start')
+        batch_op.drop_index('ix_sessions_hall_start')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_movie_approved_created')
+
+    with op.batch_alter_table('halls', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_halls_cinema_id'))
+
@@ -0,0 +1,35 @@
+"""Временные брони мест: срок брони билета
+
+Билет со status=reserved и hold_expires_at - временная бронь, которую
+снимает фоновая задача app/holds.py. Частичный индекс содержит только такие
+билеты, поэтому поиск истёкших броней не читает всю таблицу билетов.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:24:10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hold_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(
+            'ix_tickets_hold_expires_at', ['hold_expires_at'], unique=False,
+            sqlite_where=sa.text('hold_expires_at IS NOT NULL'),
+            postgresql_where=sa.text('hold_expires_at IS NOT NULL'),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_tickets_hold_expires_at')
+        batch_op.drop_column('hold_expires_at')
@@ -0,0 +1,68 @@
+"""Проекция расписания для чтения: schedule_entries
+
+Сеанс вместе с названием фильма, залом, ценой и наличием мест, чтобы
+расписание дня отдавалось одним индексным запросом без JOIN и N+1.
+Таблица заполняется из существующих сеансов; дальше её поддерживает
+app/schedule.py (перестроить вручную: python -m app.schedule --rebuild).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:05:12
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('schedule_entries',
+    sa.Column('session_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cinema_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('movie_title', sa.String(length=255), nullable=False),
+    sa.Column('hall_id', sa.Integer(), nullable=False),
+    sa.Column('hall_name', sa.String(length=100), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('base_price', sa.DECIMAL(precision=8, scale=2), nullable=False),
+    sa.Column('vip_price', sa.DECIMAL(precision=8, scale=2), nullable=True),
+    sa.Column('premium_price', sa.DECIMAL(precision=8, scale=2), nullable=True),
+    sa.Column('available_seats', sa.Integer(), nullable=False),
+    sa.Column('is_sold_out', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('language', sa.String(length=50), nullable=True),
+    sa.Column('format_3d', sa.Boolean(), nullable=True),
+    sa.Column('format_imax', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    with op.batch_alter_table('schedule_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_schedule_day_cinema_start', ['day', 'cinema_id', 'start_time'], unique=False)
+
+    op.execute("""
+        INSERT INTO schedule_entries (
+            session_id, cinema_id, day, start_time, end_time, movie_id, movie_title, hall_id, hall_name,
+            capacity, base_price, vip_price, premium_price, available_seats, is_sold_out, is_active,
+            language, format_3d, format_imax
+        )
+        SELECT s.id, h.cinema_id, date(s.start_time), s.start_time, s.end_time, s.movie_id, m.title, s.hall_id, h.name,
+               h.total_seats, s.base_price, s.vip_price, s.premium_price, s.available_seats, s.is_sold_out, s.is_active,
+               s.language, s.format_3d, s.format_imax
+        FROM sessions s
+        JOIN movies m ON m.id = s.movie_id
+        JOIN halls h ON h.id = s.hall_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('schedule_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedule_day_cinema_start')
+
+    op.drop_table('schedule_entries')
@@ -0,0 +1,30 @@
+"""Индексы админского списка билетов
+
+Страница GET /admin/tickets (новые первыми, при фильтре по статусу - новые
+билеты статуса) читается по индексу без сортировки всей таблицы.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:40:26
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_tickets_booking_time', ['booking_time'], unique=False)
+        batch_op.create_index('ix_tickets_status_booking_time', ['status', 'booking_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_tickets_status_booking_time')
+        batch_op.drop_index('ix_tickets_booking_time')
@@ -0,0 +1,40 @@
+"""Колонки ключей курсорной пагинации - NOT NULL
+
+Списки билетов и отзывов листаются по курсору (app/pagination.py) по
+booking_time, created_at и helpful_votes. Сравнение кортежей с NULL не
+выполняется, и такие строки молча выпадали бы из страниц, поэтому пустые
+значения заполняются, а колонки становятся NOT NULL (индексы ключей
+остаются пригодными, в отличие от COALESCE в ключе).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:05:12
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE tickets SET booking_time = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE booking_time IS NULL")
+    op.execute("UPDATE reviews SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE reviews SET helpful_votes = 0 WHERE helpful_votes IS NULL")
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column('booking_time', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('helpful_votes', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.alter_column('helpful_votes', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column('booking_time', existing_type=sa.DateTime(), nullable=True)
@@ -12,10 +12,14 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 def main():
+    # Адрес и порт можно переопределить (например, для бенчмарка холодного старта)
+    host = os.getenv("API_HOST", "0.0.0.0")
+    port = int(os.getenv("API_PORT", "8000"))
+
     print("🎬 Cinema Paradise API - Стабильный режим")
     print("=" * 50)
     print("✅ Без auto-reload")
-    print("✅ Стабильная работа на localhost:8000")
+    print(f"✅ Стабильная работа на localhost:{port}")
     print("=" * 50)
     
     # Импортируем приложение из модулей app
@@ -24,8 +28,8 @@ def main():
     # Запускаем без auto-reload
     uvicorn.run(
         app,
-        host="0.0.0.0",
-        port=8000,
+        host=host,
+        port=port,
         reload=False,  # Отключаем auto-reload
         log_level="info"
     )
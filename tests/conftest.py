@@ -0,0 +1,61 @@
+"""
+Общие фикстуры тестов.
+
+Тесты, как и бенчмарки, вызывают приложение внутри процесса (httpx +
+ASGITransport) на временной SQLite базе; DATABASE_URL задаётся здесь, до
+первого импорта пакета app.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.common import use_temp_database, create_schema, seed_minimal
+
+use_temp_database("tests")
+
+ADMIN_HEADERS = {"Authorization": "Bearer demo_token_user0"}
+USERS = 50
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Схема и небольшой набор данных; user0 - администратор, у фильма 1 есть отзывы"""
+    from sqlalchemy import insert, update
+    from app.database import SessionLocal
+    from app.models import Review, User, UserRole
+
+    create_schema()
+    seed_minimal(movies=3, halls=2, sessions=10, users=USERS)
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.username == "user0").values(role=UserRole.ADMIN))
+        db.execute(insert(Review), [
+            {"movie_id": 1, "user_id": i % USERS + 1, "rating": 7, "title": f"Отзыв {i}", "content": "..."}
+            for i in range(30)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def run_app():
+    """
+    Выполнить coro(client) с клиентом приложения.
+
+    Приложение работает в той же задаче, поэтому query_budget видит его запросы.
+    Цикл asyncio один на все тесты: пулы async соединений привязаны к нему.
+    """
+    from app.main import app
+
+    loop = asyncio.new_event_loop()
+
+    async def run(coro):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await coro(client)
+
+    yield lambda coro: loop.run_until_complete(run(coro))
+    loop.close()
@@ -0,0 +1,71 @@
+"""
+Гонка бронирований одного места (benchmarks/bench_booking_race.py в малом масштабе).
+
+Параллельные POST /tickets разных пользователей на одно место: место получает
+ровно один запрос, остальные - 409, счётчики сеанса совпадают с билетами.
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.bench_booking_race import check_database
+
+from .conftest import USERS
+
+SESSION_ID = 10
+SEAT = 7
+REQUESTS = 30
+
+
+def test_concurrent_booking_of_one_seat(run_app):
+    from app.database import SessionLocal
+    from app.session_counters import reconcile_all
+
+    async def race(client):
+        return await asyncio.gather(*(
+            client.post("/tickets", json={"session_id": SESSION_ID, "seat_numbers": [SEAT]},
+                        headers={"Authorization": f"Bearer demo_token_user{i % USERS}"})
+            for i in range(REQUESTS)
+        ))
+
+    statuses = sorted(response.status_code for response in run_app(race))
+    assert statuses == [200] + [409] * (REQUESTS - 1)
+
+    result = check_database(os.environ["DATABASE_URL"], SESSION_ID)
+    assert result == {"tickets": 1, "double_sold": 0, "counter_drift": 0, "reserved_drift": 0}
+
+    db = SessionLocal()
+    try:
+        assert all(not batch.drift for batch in reconcile_all(db, fix=False))
+    finally:
+        db.close()
+
+
+def test_router_booking_uses_layout(run_app):
+    """POST /tickets/ (routers/tickets.py): ряд и цена по схеме зала, повтор места - 409"""
+    async def book(client):
+        body = {"session_id": 9, "seat_row": 9, "seat_number": 15, "price": 1}
+        headers = {"Authorization": "Bearer demo_token_user1"}
+        return [await client.post("/tickets/", json=body, headers=headers) for _ in range(2)]
+
+    created, repeated = run_app(book)
+    assert created.status_code == 200, created.text
+    assert created.json()["seat_row"] == 2
+    assert created.json()["booking_reference"]
+    assert repeated.status_code == 409
+
+
+@pytest.mark.parametrize("seat_numbers", [["a"], 5, "12", [True], [1.5], [[1]], {"1": 1}])
+def test_invalid_seat_numbers(run_app, seat_numbers):
+    """Номера мест не списком целых чисел - 400 и в одиночном, и в групповом бронировании"""
+    async def book(client):
+        headers = {"Authorization": "Bearer demo_token_user1"}
+        single = await client.post("/tickets", json={"session_id": 8, "seat_numbers": seat_numbers}, headers=headers)
+        batch = await client.post("/tickets/batch", json={"bookings": [{"session_id": 8, "seat_numbers": seat_numbers}]},
+                                  headers=headers)
+        return single, batch
+
+    for response in run_app(book):
+        assert response.status_code == 400, response.text
@@ -0,0 +1,60 @@
+"""
+Проверка билетов на входе в зал (app/checkin.py).
+"""
+
+from app.checkin import checkin
+
+from .conftest import ADMIN_HEADERS
+
+SESSION_ID = 9
+HEADERS = {"Authorization": "Bearer demo_token_user6"}
+
+
+def test_scan_results_and_flush(run_app):
+    """Оплаченный проходит один раз; неоплаченный, отменённый, чужой сеанс - отказ; отметка пишется в БД"""
+    from sqlalchemy import select
+    from app.database import SessionLocal
+    from app.models import Ticket
+
+    async def scenario(client):
+        booked = (await client.post("/tickets", json={"session_id": SESSION_ID, "seat_numbers": [41, 42, 43]},
+                                    headers=HEADERS)).json()
+        paid_id, unpaid_id, cancelled_id = booked["ticket_ids"]
+        paid, unpaid, cancelled = booked["booking_references"]
+        assert (await client.patch(f"/tickets/{paid_id}/pay", headers=HEADERS)).status_code == 200
+        # Индекс сеанса загружен до отмены: отменённый билет должен из него уйти
+        loaded = (await client.get(f"/sessions/{SESSION_ID}/check-in", headers=ADMIN_HEADERS)).json()
+        assert (await client.delete(f"/tickets/{cancelled_id}", headers=HEADERS)).status_code == 200
+
+        async def scan(reference, session_id=SESSION_ID, headers=ADMIN_HEADERS):
+            return await client.post(f"/sessions/{session_id}/check-in", json={"booking_reference": reference},
+                                     headers=headers)
+
+        results = {
+            "customer": await scan(paid, headers=HEADERS),
+            "admitted": await scan(paid.lower()),
+            "already_used": await scan(paid),
+            "not_paid": await scan(unpaid),
+            "cancelled": await scan(cancelled),
+            "wrong_session": await scan(unpaid, session_id=SESSION_ID - 1),
+        }
+        flushed = await checkin.flush()
+        return loaded, results, flushed, paid_id
+
+    loaded, results, flushed, paid_id = run_app(scenario)
+    assert loaded["tickets"] >= 3
+    assert results["customer"].status_code == 403
+    assert results["admitted"].status_code == 200
+    assert results["admitted"].json()["result"] == "admitted"
+    expected = {"already_used": 409, "not_paid": 402, "cancelled": 404, "wrong_session": 409}
+    for result, status in expected.items():
+        assert results[result].status_code == status, results[result].text
+    assert results["cancelled"].json()["detail"]["result"] == "not_found"
+    assert results["wrong_session"].json()["detail"]["result"] == "wrong_session"
+    assert flushed == 1
+
+    db = SessionLocal()
+    try:
+        assert db.scalar(select(Ticket.used_time).where(Ticket.id == paid_id)) is not None
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+"""
+Временные брони мест (app/holds.py).
+"""
+
+from datetime import datetime, timedelta
+
+from app.holds import hold_sweeper
+
+HEADERS = {"Authorization": "Bearer demo_token_user5"}
+SESSION_ID = 4
+
+
+def test_hold_pay_and_expiry(run_app):
+    """Бронь оплачивается до срока; истёкшую снимает sweeper, оплата после - 409"""
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models import Ticket
+
+    async def hold(client):
+        response = await client.post("/tickets/hold", json={"session_id": SESSION_ID, "seat_numbers": [1, 2],
+                                                            "hold_minutes": 5}, headers=HEADERS)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    held = run_app(hold)
+    paid_id, expired_id = held["ticket_ids"]
+    assert held["hold_expires_at"]
+
+    db = SessionLocal()
+    try:
+        db.execute(update(Ticket).where(Ticket.id == expired_id)
+                   .values(hold_expires_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.commit()
+    finally:
+        db.close()
+
+    async def pay_and_sweep(client):
+        paid = await client.patch(f"/tickets/{paid_id}/pay", headers=HEADERS)
+        late = await client.patch(f"/tickets/{expired_id}/pay", headers=HEADERS)
+        released = await hold_sweeper.sweep()
+        session = (await client.get(f"/sessions/{SESSION_ID}")).json()
+        seats = (await client.get(f"/sessions/{SESSION_ID}/available-seats")).json()
+        return paid, late, released, session, seats
+
+    paid, late, released, session, seats = run_app(pay_and_sweep)
+    assert paid.status_code == 200, paid.text
+    assert paid.json()["status"] == "paid"
+    assert late.status_code == 409
+    assert released == 1
+    assert (session["available_seats"], session["sold_tickets"], session["reserved_tickets"]) == (99, 1, 0)
+    assert seats["occupied_seats"] == [1]
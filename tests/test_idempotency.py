@@ -0,0 +1,66 @@
+"""
+Ключи идемпотентности бронирования (app/idempotency.py).
+"""
+
+from app.waiting_room import ADMISSION_HEADER, waiting_room
+
+HEADERS = {"Authorization": "Bearer demo_token_user2"}
+
+
+def session_tickets(session_id: int) -> int:
+    """Число билетов сеанса в БД (GET /sessions/{id} кэшируется на RESPONSE_CACHE_LIVE_TTL)"""
+    from sqlalchemy import func, select
+    from app.database import SessionLocal
+    from app.models import Ticket
+
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).where(Ticket.session_id == session_id))
+    finally:
+        db.close()
+
+
+def test_waiting_room_429_is_not_replayed(run_app, monkeypatch):
+    """429 очереди не сохраняется: повтор с пропуском и тем же ключом бронирует"""
+    monkeypatch.setattr(waiting_room, "session_slots", 1)
+    headers = {**HEADERS, "Idempotency-Key": "waiting-room-retry"}
+    body = {"session_id": 7, "seat_numbers": [11]}
+
+    async def book(client):
+        # Единственный слот сеанса занят другим бронированием
+        admission = waiting_room.try_enter(7, 1)
+        rejected = await client.post("/tickets", json=body, headers=headers)
+        waiting_room.release(admission)
+
+        waiter = (await client.post("/sessions/7/waiting-room", headers=HEADERS)).json()
+        admitted = await client.post("/tickets", json=body, headers={**headers, ADMISSION_HEADER: waiter["token"]})
+        return rejected, waiter, admitted
+
+    rejected, waiter, admitted = run_app(book)
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "1"
+    assert waiter["status"] == "admitted"
+    assert admitted.status_code == 200, admitted.text
+    assert "idempotent-replayed" not in admitted.headers
+
+
+def test_replay_and_key_reuse(run_app):
+    """Повтор с тем же ключом - сохранённый ответ без нового билета; другое тело - 422"""
+    headers = {**HEADERS, "Idempotency-Key": "replay"}
+    body = {"session_id": 7, "seat_numbers": [21]}
+
+    async def book(client):
+        before = session_tickets(7)
+        first = await client.post("/tickets", json=body, headers=headers)
+        replayed = await client.post("/tickets", json=body, headers=headers)
+        reused = await client.post("/tickets", json={**body, "seat_numbers": [22]}, headers=headers)
+        return first, replayed, reused, session_tickets(7) - before
+
+    first, replayed, reused, booked = run_app(book)
+    assert first.status_code == 200, first.text
+    assert "idempotent-replayed" not in first.headers
+    assert replayed.status_code == 200
+    assert replayed.headers["idempotent-replayed"] == "true"
+    assert replayed.json() == first.json()
+    assert reused.status_code == 422
+    assert booked == 1
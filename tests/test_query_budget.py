@@ -0,0 +1,40 @@
+"""
+Бюджеты SQL запросов частых списков (app/query_stats.py).
+
+Страница заведомо больше данных: N+1 по строкам сразу превысит бюджет.
+"""
+
+import pytest
+
+from app.query_stats import query_budget
+
+from .conftest import ADMIN_HEADERS
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tickets(run_app):
+    """Билеты разных пользователей на нескольких сеансах"""
+    async def book(client):
+        for i in range(20):
+            response = await client.post("/tickets", json={"session_id": i % 3 + 1, "seat_numbers": [i + 1]},
+                                         headers={"Authorization": f"Bearer demo_token_user{i}"})
+            assert response.status_code == 200, response.text
+
+    run_app(book)
+
+
+@pytest.mark.parametrize("url, headers, budget", [
+    ("/sessions", {}, 1),
+    ("/sessions/?limit=100", {}, 2),
+    ("/reviews/movie/1?limit=100", {}, 4),
+    ("/tickets/?limit=100", ADMIN_HEADERS, 3),
+])
+def test_list_query_budget(run_app, url, headers, budget):
+    async def get(client):
+        with query_budget(budget):
+            response = await client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    body = run_app(get)
+    assert body
@@ -0,0 +1,33 @@
+"""
+Кэш ответов каталога и условный GET (app/response_cache.py).
+"""
+
+from app.query_stats import query_budget
+
+from .conftest import ADMIN_HEADERS
+
+
+def test_cache_etag_and_invalidation(run_app):
+    """Повтор - из кэша без SQL, совпавший ETag - 304, изменение фильма сбрасывает кэш"""
+    async def scenario(client):
+        first = await client.get("/movies/2")
+        with query_budget(0):
+            cached = await client.get("/movies/2")
+            not_modified = await client.get("/movies/2", headers={"If-None-Match": first.headers["etag"]})
+        updated = await client.put("/movies/2", json={"title": "Фильм 2 (режиссёрская версия)"},
+                                   headers=ADMIN_HEADERS)
+        fresh = await client.get("/movies/2", headers={"If-None-Match": first.headers["etag"]})
+        return first, cached, not_modified, updated, fresh
+
+    first, cached, not_modified, updated, fresh = run_app(scenario)
+    assert first.status_code == 200
+    assert cached.headers["x-cache"] == "HIT"
+    assert cached.headers["etag"] == first.headers["etag"]
+    assert cached.json() == first.json()
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert updated.status_code == 200, updated.text
+    assert fresh.status_code == 200
+    assert fresh.headers["x-cache"] == "MISS"
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert fresh.json()["title"] == "Фильм 2 (режиссёрская версия)"
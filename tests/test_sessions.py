@@ -0,0 +1,49 @@
+"""
+Изменение сеансов (app/routers/sessions.py).
+"""
+
+import json
+
+from .conftest import ADMIN_HEADERS
+
+
+def test_hall_change_recounts_seats(run_app):
+    """Смена зала: счётчик по продаваемым местам нового зала, карта мест - по новой схеме"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import Hall
+    from app.session_counters import reconcile_all
+
+    db = SessionLocal()
+    try:
+        # 2 ряда по 10 мест, места 9-10 первого ряда не продаются
+        hall_id = db.execute(insert(Hall).returning(Hall.id), [{
+            "cinema_id": 1, "name": "Малый зал", "hall_number": 99, "total_seats": 20, "rows": 2,
+            "seats_per_row": 10, "seat_map": json.dumps({"rows": ["SSSSSSSSXX", "SSSSSSSSSS"]}),
+        }]).scalar()
+        db.commit()
+    finally:
+        db.close()
+
+    async def move(client):
+        booked = await client.post("/tickets", json={"session_id": 5, "seat_numbers": [1, 2]},
+                                   headers={"Authorization": "Bearer demo_token_user4"})
+        assert booked.status_code == 200, booked.text
+        # Прогрев карты мест старого зала
+        await client.get("/sessions/5/available-seats")
+        updated = await client.put("/sessions/5", json={"hall_id": hall_id}, headers=ADMIN_HEADERS)
+        seats = await client.get("/sessions/5/available-seats")
+        return updated, seats
+
+    updated, seats = run_app(move)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["available_seats"] == 16
+    assert seats.json()["total_seats"] == 20
+    assert seats.json()["blocked_seats"] == [9, 10]
+    assert seats.json()["available_count"] == 16
+
+    db = SessionLocal()
+    try:
+        assert all(not batch.drift for batch in reconcile_all(db, fix=False))
+    finally:
+        db.close()
@@ -0,0 +1,25 @@
+"""
+Администраторские списки билетов (app/routers/tickets.py).
+"""
+
+from .conftest import ADMIN_HEADERS
+
+
+def test_customer_filters(run_app):
+    """Фильтры по клиенту - по имени и email пользователя билета"""
+    async def book_and_list(client):
+        response = await client.post("/tickets", json={"session_id": 6, "seat_numbers": [1]},
+                                     headers={"Authorization": "Bearer demo_token_user3"})
+        assert response.status_code == 200, response.text
+        return [await client.get(url, headers=ADMIN_HEADERS) for url in (
+            "/tickets/?customer_name=bench user3&session_id=6",
+            "/tickets/?customer_email=user3@&session_id=6",
+            "/tickets/customer/user3@cinema.com",
+        )]
+
+    by_name, by_email, customer = run_app(book_and_list)
+    for response in (by_name, by_email, customer):
+        assert response.status_code == 200, response.text
+    assert [ticket["user_id"] for ticket in by_name.json()["tickets"]] == [4]
+    assert [ticket["user_id"] for ticket in by_email.json()["tickets"]] == [4]
+    assert {ticket["user_id"] for ticket in customer.json()} == {4}
@@ -0,0 +1,45 @@
+"""
+Виртуальная очередь на бронирование (app/waiting_room.py).
+"""
+
+from app.waiting_room import ADMISSION_HEADER, waiting_room
+
+SESSION_ID = 8
+
+
+def headers(i: int) -> dict:
+    return {"Authorization": f"Bearer demo_token_user{10 + i}"}
+
+
+def test_queue_admission_in_order(run_app, monkeypatch):
+    """Занятый слот: очередь FIFO, бронирование без пропуска - 429, пропуск действует только на свой сеанс"""
+    monkeypatch.setattr(waiting_room, "session_slots", 1)
+
+    async def scenario(client):
+        admission = waiting_room.try_enter(SESSION_ID, 1)
+        first = (await client.post(f"/sessions/{SESSION_ID}/waiting-room", headers=headers(1))).json()
+        second = (await client.post(f"/sessions/{SESSION_ID}/waiting-room", headers=headers(2))).json()
+        waiting = [first, second]
+        # Слот освободился, но первым его получает ожидающий из очереди
+        waiting_room.release(admission)
+        direct = await client.post("/tickets", json={"session_id": SESSION_ID, "seat_numbers": [30]},
+                                   headers=headers(3))
+        polled = [(await client.get(f"/sessions/{SESSION_ID}/waiting-room/{waiter['waiter_id']}")).json()
+                  for waiter in waiting]
+        token = polled[0]["token"]
+        wrong_session = await client.post("/tickets", json={"session_id": SESSION_ID - 1, "seat_numbers": [30]},
+                                          headers={**headers(1), ADMISSION_HEADER: token})
+        admitted = await client.post("/tickets", json={"session_id": SESSION_ID, "seat_numbers": [30]},
+                                     headers={**headers(1), ADMISSION_HEADER: token})
+        # После бронирования первого слот переходит второму
+        after = (await client.get(f"/sessions/{SESSION_ID}/waiting-room/{second['waiter_id']}")).json()
+        return waiting, direct, polled, wrong_session, admitted, after
+
+    waiting, direct, polled, wrong_session, admitted, after = run_app(scenario)
+    assert [waiter["position"] for waiter in waiting] == [1, 2]
+    assert direct.status_code == 429
+    assert polled[0]["status"] == "admitted"
+    assert polled[1] == {**polled[1], "status": "waiting", "position": 1}
+    assert wrong_session.status_code == 429
+    assert admitted.status_code == 200, admitted.text
+    assert after["status"] == "admitted"